@@ -0,0 +1,82 @@
+"""
+Agrupamento de microdados por códigos inteiros: os valores de cada dimensão viram
+códigos 0..k-1, a combinação das dimensões vira um único índice (a posição em um array
+multidimensional achatado) e as contagens e somas de cada grupo saem de np.bincount.
+Evita os group-bys do pandas sobre chaves de objeto, cujo custo cresce com o número de
+combinações (por exemplo, 14 faixas de renda x 8 níveis de escolaridade x 27 UFs).
+"""
+import numpy as np
+import pandas as pd
+
+# Limite de combinações de dimensões (tamanho dos arrays de contagem)
+MAX_GRUPOS = 10_000_000
+
+
+def codificar(serie):
+    """
+    Converte uma coluna em códigos inteiros.
+
+    Args:
+    - serie (pd.Series): Coluna categórica (códigos e categorias reaproveitados) ou não.
+
+    Returns:
+    - tuple: Códigos (np.ndarray, -1 nos nulos) e categorias (pd.Index, em ordem).
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    return pd.factorize(serie, sort=True)
+
+
+def agrupar_por(data, dimensoes, medidas=(), nulos=False):
+    """
+    Conta as linhas e soma as medidas por combinação das dimensões.
+
+    Args:
+    - data (pd.DataFrame): Microdados (já filtrados).
+    - dimensoes (list of str): Colunas do agrupamento.
+    - medidas (list of str): Colunas numéricas somadas (nulos ignorados).
+    - nulos (bool): Se True, os nulos de cada dimensão formam um grupo próprio (NaN);
+      caso contrário, as linhas com alguma dimensão nula são descartadas, como no groupby.
+
+    Returns:
+    - pd.DataFrame: Uma linha por grupo não vazio, com as dimensões (categóricas, na ordem
+      das categorias), QTD e, para cada medida, as colunas _N e _SOMA.
+    """
+    codificadas = [codificar(data[dimensao]) for dimensao in dimensoes]
+    tamanhos = [len(categorias) + int(nulos) for _, categorias in codificadas]
+    num_grupos = int(np.prod(tamanhos, dtype=np.int64))
+    if num_grupos > MAX_GRUPOS:
+        raise ValueError(f"Agrupamento com {num_grupos} combinações, acima do limite de {MAX_GRUPOS}.")
+
+    # Índice achatado de cada linha; nulos viram o último código da dimensão ou, quando
+    # descartados, vão para um grupo extra (num_grupos) que não entra no resultado. Sem
+    # máscaras booleanas sobre as linhas, que custam mais que as próprias contagens.
+    indice = np.zeros(len(data), dtype=np.int64)
+    descartadas = np.zeros(len(data), dtype=bool)
+    for (codigos, categorias), tamanho in zip(codificadas, tamanhos):
+        codigos = codigos.astype(np.int64)
+        if nulos:
+            codigos = np.where(codigos < 0, len(categorias), codigos)
+        else:
+            descartadas |= codigos < 0
+        indice = indice * tamanho + codigos
+    if not nulos:
+        indice[descartadas] = num_grupos
+
+    colunas = {"QTD": np.bincount(indice, minlength=num_grupos + 1)}
+    for medida in medidas:
+        valores = data[medida].to_numpy(dtype=np.float64, na_value=np.nan)
+        presentes = ~np.isnan(valores)
+        # Notas ausentes pesam zero na contagem e na soma
+        colunas[f"{medida}_N"] = np.bincount(indice, weights=presentes, minlength=num_grupos + 1).astype(np.int64)
+        colunas[f"{medida}_SOMA"] = np.bincount(indice, weights=np.where(presentes, valores, 0.0), minlength=num_grupos + 1)
+
+    # Só os grupos não vazios, com os códigos de volta aos valores de cada dimensão
+    grupos = np.flatnonzero(colunas["QTD"][:num_grupos])
+    posicoes = np.unravel_index(grupos, tamanhos) if tamanhos else []
+    resultado = {}
+    for dimensao, (_, categorias), posicao in zip(dimensoes, codificadas, posicoes):
+        codigos = np.where(posicao < len(categorias), posicao, -1)
+        resultado[dimensao] = pd.Categorical.from_codes(codigos, categories=categorias)
+    resultado.update({coluna: valores[grupos] for coluna, valores in colunas.items()})
+    return pd.DataFrame(resultado)
@@ -0,0 +1,212 @@
+"""
+Amostra estratificada dos microdados (estratos SG_UF_ESC x TP_ESCOLA), usada na prévia
+do dashboard: as agregações são estimadas sobre um cubo da amostra com pesos, em que
+cada célula soma os alunos sorteados multiplicados pelo peso do estrato (população do
+estrato / tamanho da amostra no estrato). As funções de agregação do dashboard se
+aplicam a esse cubo sem mudanças, e os intervalos de confiança são calculados a partir
+das somas e somas de quadrados guardadas nas células.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import abrir_arrow, arquivo_atualizado, salvar_arrow
+from cubo import MEDIDAS, construir_cubo
+from data_loader import iterar_microdados
+
+# Estratos da amostra e tamanho de cada um: FRACAO_AMOSTRA dos alunos do estrato, com
+# ao menos MIN_POR_ESTRATO alunos (ou o estrato inteiro, se for menor)
+ESTRATOS = ["SG_UF_ESC", "TP_ESCOLA"]
+FRACAO_AMOSTRA = 0.02
+MIN_POR_ESTRATO = 200
+SEMENTE_AMOSTRA = 2023
+
+# Quantil da normal para intervalos de 95%
+Z_95 = 1.96
+
+# Marcador do valor nulo da dimensão nos agrupamentos
+NULO = "__nulo__"
+
+
+def _sortear(parte, fracao, min_por_estrato, rng):
+    # Em cada estrato, ordena as linhas por uma chave aleatória e fica com as primeiras
+    estrato = parte.groupby(ESTRATOS, dropna=False, observed=True).ngroup().to_numpy()
+    populacao = np.bincount(estrato)
+    tamanho = np.minimum(populacao, np.maximum(min_por_estrato, np.ceil(populacao * fracao))).astype(np.int64)
+    ordem = np.lexsort((rng.random(len(parte)), estrato))
+    inicio = np.concatenate([[0], np.cumsum(populacao)[:-1]])
+    posicao = np.arange(len(parte)) - inicio[estrato[ordem]]
+    return parte.iloc[np.sort(ordem[posicao < tamanho[estrato[ordem]]])]
+
+
+def _chaves_estrato(tabela):
+    # Estratos como objetos, com None nos nulos (categóricos e Int8 de origens diferentes)
+    chaves = tabela[ESTRATOS].astype(object)
+    return chaves.where(chaves.notna(), None)
+
+
+def construir_amostra(partes, cubo, fracao=FRACAO_AMOSTRA, min_por_estrato=MIN_POR_ESTRATO,
+                      semente=SEMENTE_AMOSTRA):
+    """
+    Sorteia a amostra estratificada e monta o cubo com pesos.
+
+    Cada estrato precisa estar inteiro em uma única parte (vale para o arquivo único e
+    para os datasets particionados por UF e rede).
+
+    Args:
+    - partes (iterable of pd.DataFrame): Microdados, em uma ou mais partes.
+    - cubo (pd.DataFrame): Cubo completo, de onde vem a população de cada estrato.
+    - fracao (float): Fração sorteada de cada estrato.
+    - min_por_estrato (int): Tamanho mínimo da amostra de cada estrato.
+    - semente (int): Semente do sorteio (mesma semente, mesma amostra).
+
+    Returns:
+    - pd.DataFrame: Cubo da amostra, com as colunas do cubo ponderadas e, por célula,
+      PESO, POP_ESTRATO e N_ESTRATO (população e tamanho da amostra do estrato).
+    """
+    rng = np.random.default_rng(semente)
+    cubo_amostra = construir_cubo(pd.concat(
+        [_sortear(parte, fracao, min_por_estrato, rng) for parte in partes], ignore_index=True
+    ))
+
+    # População (do cubo completo) e tamanho da amostra de cada estrato
+    estratos = pd.concat(
+        [
+            cubo.groupby(ESTRATOS, dropna=False, observed=True)["QTD"].sum().rename("POP_ESTRATO"),
+            cubo_amostra.groupby(ESTRATOS, dropna=False, observed=True)["QTD"].sum().rename("N_ESTRATO"),
+        ],
+        axis=1,
+    ).reset_index()
+    estratos = _chaves_estrato(estratos).join(estratos[["POP_ESTRATO", "N_ESTRATO"]])
+    pesos = _chaves_estrato(cubo_amostra).merge(estratos, on=ESTRATOS, how="left")
+    cubo_amostra["POP_ESTRATO"] = pesos["POP_ESTRATO"].to_numpy(dtype=np.float64)
+    cubo_amostra["N_ESTRATO"] = pesos["N_ESTRATO"].to_numpy(dtype=np.float64)
+    cubo_amostra["PESO"] = cubo_amostra["POP_ESTRATO"] / cubo_amostra["N_ESTRATO"]
+
+    # Contagens e somas ponderadas: as agregações passam a estimar os valores da população
+    ponderadas = ["QTD"] + [f"{m}{s}" for m in MEDIDAS for s in ("_N", "_SOMA", "_SOMA_Q")]
+    cubo_amostra[ponderadas] = cubo_amostra[ponderadas].astype(np.float64).mul(cubo_amostra["PESO"], axis=0)
+    return cubo_amostra
+
+
+def _variancia(estratos, soma_z, soma_z2):
+    # Variância do total estimado em amostragem estratificada simples, por grupo (colunas):
+    # sum_h POP_h^2 (1 - n_h/POP_h) s_h^2 / n_h, com s_h^2 a variância amostral de z no
+    # estrato h (linhas)
+    n = estratos["N_ESTRATO"].to_numpy()[:, None]
+    populacao = estratos["POP_ESTRATO"].to_numpy()[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s2 = np.where(n > 1, (soma_z2 - soma_z ** 2 / n) / (n - 1), 0.0)
+    return (populacao ** 2 * (1 - n / populacao) * np.clip(s2, 0.0, None) / n).sum(axis=0)
+
+
+def intervalos_por(cubo_amostra, dimensao, medida=None, proporcao=False, rotulos=None, rotulo_nulo=None):
+    """
+    Calcula a meia-largura do intervalo de confiança de 95% das estimativas por valor de
+    uma dimensão: da quantidade de alunos, da proporção de alunos ou da média de uma
+    medida. Proporções e médias são razões entre totais estimados, com a variância
+    obtida por linearização.
+
+    Args:
+    - cubo_amostra (pd.DataFrame): Células (filtradas) do cubo da amostra.
+    - dimensao (str): Coluna usada no agrupamento.
+    - medida (str): Medida cuja média é estimada (None para contagens e proporções).
+    - proporcao (bool): Se True, o intervalo é o da proporção (entre 0 e 1) de cada valor.
+    - rotulos (dict): Mapeamento opcional de código para descrição, como nas agregações.
+    - rotulo_nulo (str): Rótulo dos nulos (se None, os nulos são descartados).
+
+    Returns:
+    - pd.Series: Meia-largura do intervalo, indexada pelo valor (ou rótulo) da dimensão.
+    """
+    # Somas dos alunos sorteados (sem o peso) por estrato (linhas) e valor da dimensão
+    # (colunas); os nulos viram um marcador, para não serem descartados no agrupamento
+    chaves = {"GRUPO": cubo_amostra[dimensao], **{e: cubo_amostra[e] for e in ESTRATOS}}
+    base = pd.DataFrame({c: v.astype(object).where(v.notna(), NULO) for c, v in chaves.items()})
+    colunas = ["QTD"] if medida is None else [f"{medida}_N", f"{medida}_SOMA", f"{medida}_SOMA_Q"]
+    for coluna in colunas + ["PESO", "POP_ESTRATO", "N_ESTRATO"]:
+        base[coluna] = cubo_amostra[coluna].to_numpy()
+    base[colunas] = base[colunas].div(base["PESO"], axis=0)
+    somas = base.groupby(list(chaves))[colunas].sum().unstack("GRUPO", fill_value=0.0)
+    estratos = base.groupby(ESTRATOS)[["PESO", "POP_ESTRATO", "N_ESTRATO"]].first().reindex(somas.index)
+    peso = estratos["PESO"].to_numpy()[:, None]
+
+    if medida is None:
+        a = somas["QTD"].to_numpy()
+        grupos = somas["QTD"].columns
+        if proporcao:
+            # z = 1{grupo} - p, em que p é a proporção estimada do grupo
+            t = a.sum(axis=1, keepdims=True)
+            total = (peso * t).sum()
+            p = (peso * a).sum(axis=0) / total
+            variancia = _variancia(estratos, a - t * p, a * (1 - 2 * p) + t * p ** 2) / total ** 2
+        else:
+            variancia = _variancia(estratos, a, a)  # z é o indicador do grupo (z = z^2)
+    else:
+        # z = (y - m) 1{grupo}, em que m é a média estimada do grupo
+        c = somas[f"{medida}_N"].to_numpy()
+        s = somas[f"{medida}_SOMA"].to_numpy()
+        q = somas[f"{medida}_SOMA_Q"].to_numpy()
+        grupos = somas[f"{medida}_N"].columns
+        total = (peso * c).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = np.where(total > 0, (peso * s).sum(axis=0) / total, 0.0)
+            variancia = np.where(
+                total > 0, _variancia(estratos, s - m * c, q - 2 * m * s + m ** 2 * c) / total ** 2, np.nan
+            )
+
+    intervalos = pd.Series(
+        Z_95 * np.sqrt(variancia),
+        index=pd.Index([None if valor == NULO else valor for valor in grupos], dtype=object, name=dimensao),
+    )
+    if rotulo_nulo is not None:
+        intervalos.index = intervalos.index.fillna(rotulo_nulo)
+    else:
+        intervalos = intervalos[intervalos.index.notna()]
+    if rotulos is not None:
+        intervalos = intervalos.rename(index=rotulos)
+    return intervalos
+
+
+def caminho_amostra(caminho):
+    """
+    Retorna o arquivo do cubo da amostra de um parquet ou de um diretório particionado.
+    """
+    return f"{os.path.splitext(caminho.rstrip('/'))[0]}.amostra.arrow"
+
+
+def carregar_amostra(dataset):
+    """
+    Abre o cubo da amostra gravado ao lado do parquet, sorteando-o (e tentando gravá-lo)
+    quando não existe ou está desatualizado (mais antigo que o parquet ou que algum
+    arquivo das partições). O sorteio percorre os microdados uma única vez; nas cargas
+    seguintes o arquivo é apenas mapeado em memória.
+
+    Args:
+    - dataset (DatasetEnem): Dataset carregado.
+
+    Returns:
+    - pd.DataFrame: Cubo da amostra (somente leitura).
+    """
+    arquivo = caminho_amostra(dataset.caminho)
+    if arquivo_atualizado(arquivo, dataset.caminho):
+        cubo_amostra = abrir_arrow(arquivo)
+        if cubo_amostra is not None:
+            return cubo_amostra
+
+    cubo_amostra = construir_amostra(iterar_microdados(dataset), dataset.cubo)
+    try:
+        salvar_arrow(cubo_amostra, arquivo)
+    except OSError:
+        pass  # Sem permissão de escrita: a amostra fica apenas em memória
+    return cubo_amostra
+
+
+def tamanho_amostra(cubo_amostra):
+    """
+    Retorna o número de alunos sorteados e a fração que representam da população.
+    """
+    sorteados = (cubo_amostra["QTD"] / cubo_amostra["PESO"]).sum()
+    populacao = cubo_amostra["QTD"].sum()
+    return int(round(sorteados)), sorteados / populacao if populacao else math.nan
@@ -1,18 +1,40 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from data_loader import load_dataset
-from sidebar import render_sidebar
+from sidebar import render_sidebar, render_painel_desempenho
 from dashboard import render_dashboard
+from rastreamento import ARQUIVO_JSONL, encerrar_coleta, exportar_jsonl, iniciar_coleta, span
 
 def main():
-    data = load_dataset()
-    if data is None:
-        st.stop()
+    # A coleta de tempos só é ativada com o painel aberto ou com a exportação configurada
+    painel = st.session_state.get("painel_desempenho", False)
+    if painel or ARQUIVO_JSONL:
+        iniciar_coleta()
+    try:
+        with span("load_dataset"):
+            dataset = load_dataset()
+        if dataset is None:
+            st.stop()
 
-    #Renderizar o sidebar e capturar os filtros
-    faixa_etaria, sexo, uf, rede, filtro_notas = render_sidebar(data)
+        #Renderizar o sidebar e capturar os filtros
+        faixa_etaria, sexo, uf, rede, filtro_notas = render_sidebar(dataset.catalogo)
+        st.sidebar.caption(f"Dataset em memória: {dataset.memoria_bytes / 2**20:.1f} MB")
+        st.sidebar.toggle("Painel de desempenho", key="painel_desempenho")
 
-    #Renderizar o dashboard
-    render_dashboard(data, faixa_etaria, sexo, uf, rede, filtro_notas)
+        #Renderizar o dashboard
+        render_dashboard(dataset, faixa_etaria, sexo, uf, rede, filtro_notas)
+    finally:
+        coleta = encerrar_coleta()
+
+    if coleta is not None:
+        if painel:
+            render_painel_desempenho(coleta)
+        contexto = get_script_run_ctx()
+        exportar_jsonl(
+            coleta,
+            sessao=contexto.session_id if contexto else None,
+            aba=st.session_state.get("aba_ativa"),
+        )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,128 @@
+"""
+Armazenamento compartilhado do dataset em arquivos Arrow IPC (Feather v2, sem
+compressão), lidos por mapeamento de memória. As colunas do DataFrame lido são
+visões das páginas do arquivo: todas as sessões e todos os processos do servidor
+que abrem o mesmo arquivo compartilham essas páginas pelo cache do sistema
+operacional, em vez de cada um manter sua própria cópia dos microdados.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Versão do formato: arquivos de outra versão são reconstruídos. Deve ser incrementada
+# sempre que as colunas guardadas (por exemplo, as derivadas na carga) mudarem.
+VERSAO_ARMAZENAMENTO = 1
+
+
+def _coluna_arrow(serie):
+    # Converte a coluna em um array Arrow sem nulos sempre que possível, para que a
+    # leitura seja uma visão direta do buffer (nulos exigiriam uma máscara à parte)
+    tipo = serie.dtype
+    if isinstance(tipo, pd.CategoricalDtype):
+        # Códigos (-1 para nulo) com as categorias na descrição da coluna
+        return pa.array(serie.cat.codes.to_numpy()), {"tipo": "categoria", "categorias": list(serie.cat.categories)}
+    if tipo == bool:
+        return pa.array(serie.to_numpy().view(np.uint8)), {"tipo": "bool"}
+    if isinstance(tipo, pd.api.extensions.ExtensionDtype):
+        # Inteiros anuláveis (Int8): guardados com os nulos do Arrow
+        return pa.array(serie, from_pandas=True), {"tipo": str(tipo)}
+    # Numéricos: NaN é mantido como valor (não vira nulo), como no pandas
+    return pa.array(serie.to_numpy()), {"tipo": "numerico"}
+
+
+def salvar_arrow(data, caminho):
+    """
+    Grava o DataFrame em um arquivo Arrow IPC de um único lote, pronto para ser
+    mapeado em memória. A gravação é atômica (arquivo temporário e renomeação), então
+    processos que leem o arquivo nunca veem uma versão incompleta.
+
+    Args:
+    - data (pd.DataFrame): Tabela com colunas numéricas, booleanas, categóricas ou Int8.
+    - caminho (str): Arquivo de destino.
+
+    Returns:
+    - str: Caminho do arquivo gravado.
+    """
+    arrays, descricoes = [], {}
+    for coluna in data.columns:
+        array, descricao = _coluna_arrow(data[coluna])
+        arrays.append(array)
+        descricoes[coluna] = descricao
+    tabela = pa.table(arrays, names=list(map(str, data.columns)))
+    tabela = tabela.replace_schema_metadata({
+        "versao": str(VERSAO_ARMAZENAMENTO),
+        "colunas": json.dumps(descricoes, ensure_ascii=False),
+    })
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, "wb") as arquivo:
+        with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela, max_chunksize=len(data) or None)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def _coluna_pandas(array, descricao):
+    # Visão somente leitura do buffer mapeado (cópia apenas da máscara de nulos do Int8)
+    if descricao["tipo"] == "categoria":
+        return pd.Categorical.from_codes(
+            array.to_numpy(zero_copy_only=True), categories=descricao["categorias"], validate=False
+        )
+    if descricao["tipo"] == "bool":
+        return array.to_numpy(zero_copy_only=True).view(bool)
+    if descricao["tipo"] == "numerico":
+        return array.to_numpy(zero_copy_only=True)
+    valores = np.frombuffer(array.buffers()[1], dtype=array.type.to_pandas_dtype(),
+                            count=len(array), offset=array.offset * array.type.bit_width // 8)
+    return pd.arrays.IntegerArray(valores, array.is_null().to_numpy(zero_copy_only=False))
+
+
+def abrir_arrow(caminho):
+    """
+    Abre um arquivo gravado por salvar_arrow por mapeamento de memória.
+
+    Args:
+    - caminho (str): Arquivo Arrow IPC.
+
+    Returns:
+    - pd.DataFrame | None: Tabela somente leitura, ou None se o arquivo é de outra versão.
+    """
+    tabela = pa.ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+    metadados = tabela.schema.metadata or {}
+    if metadados.get(b"versao") != str(VERSAO_ARMAZENAMENTO).encode():
+        return None
+    descricoes = json.loads(metadados[b"colunas"])
+    colunas = {}
+    for nome, descricao in descricoes.items():
+        coluna = tabela.column(nome)
+        # Um único lote por arquivo: o primeiro bloco já é a coluna inteira, sem cópia
+        array = coluna.chunk(0) if coluna.num_chunks == 1 else coluna.combine_chunks()
+        colunas[nome] = _coluna_pandas(array, descricao)
+    # copy=False mantém cada coluna como visão do arquivo (sem consolidar os blocos)
+    return pd.DataFrame(colunas, copy=False)
+
+
+def modificacao_origem(origem):
+    """
+    Retorna o instante da última modificação da origem. Para um diretório (dataset
+    particionado), é o mais recente entre os arquivos e subdiretórios dele: o mtime do
+    diretório não muda quando arquivos em níveis mais profundos são regravados.
+    """
+    if not os.path.isdir(origem):
+        return os.path.getmtime(origem)
+    instantes = [os.path.getmtime(origem)]
+    for diretorio, _, arquivos in os.walk(origem):
+        instantes.append(os.path.getmtime(diretorio))
+        instantes += [os.path.getmtime(os.path.join(diretorio, nome)) for nome in arquivos]
+    return max(instantes)
+
+
+def arquivo_atualizado(caminho, origem):
+    """
+    Indica se o arquivo existe e é mais recente que a origem de que foi gerado (um
+    parquet ou um diretório particionado).
+    """
+    return os.path.exists(caminho) and os.path.getmtime(caminho) >= modificacao_origem(origem)
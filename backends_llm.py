@@ -0,0 +1,115 @@
+import json
+
+import httpx
+from langchain_groq import ChatGroq
+
+# Limites de conexão e tempo das requisições HTTP, compartilhados pelos backends
+MAX_CONEXOES = 8
+TIMEOUT_SEGUNDOS = 60
+
+# Endereço padrão do servidor local de testes (servidor_llm_fake.py)
+URL_LOCAL = "http://127.0.0.1:8765/v1"
+
+
+class BackendGroq:
+    """
+    Backend da API da Groq, via langchain-groq, com um pool de conexões HTTP próprio.
+    """
+
+    def __init__(self, modelo, api_key):
+        if not api_key:
+            raise ValueError("API Key não encontrada no arquivo config.toml.")
+        self.modelo = modelo
+        self.identificador = f"groq/{modelo}"
+        self._chat = ChatGroq(
+            model=modelo,
+            api_key=api_key,
+            timeout=TIMEOUT_SEGUNDOS,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=MAX_CONEXOES),
+                timeout=TIMEOUT_SEGUNDOS,
+            ),
+        )
+
+    def invocar(self, prompt):
+        return self._chat.invoke(prompt).content  # Passar o prompt diretamente como string
+
+    def stream(self, prompt):
+        for pedaco in self._chat.stream(prompt):
+            if pedaco.content:
+                yield pedaco.content
+
+
+class BackendOpenAI:
+    """
+    Backend para qualquer endpoint compatível com a API de chat completions da OpenAI
+    (inclusive o servidor local de testes), usando httpx diretamente.
+    """
+
+    def __init__(self, modelo, base_url, api_key=None):
+        self.modelo = modelo
+        self.identificador = f"{base_url.rstrip('/')}/{modelo}"
+        cabecalhos = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._http = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            headers=cabecalhos,
+            limits=httpx.Limits(max_connections=MAX_CONEXOES),
+            timeout=TIMEOUT_SEGUNDOS,
+        )
+
+    def _corpo(self, prompt, stream):
+        return {
+            "model": self.modelo,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+        }
+
+    def invocar(self, prompt):
+        resposta = self._http.post("/chat/completions", json=self._corpo(prompt, False))
+        resposta.raise_for_status()
+        return resposta.json()["choices"][0]["message"]["content"]
+
+    def stream(self, prompt):
+        # Server-sent events: uma linha "data: {...}" por trecho, terminando em "data: [DONE]"
+        with self._http.stream("POST", "/chat/completions", json=self._corpo(prompt, True)) as resposta:
+            resposta.raise_for_status()
+            for linha in resposta.iter_lines():
+                if not linha.startswith("data: "):
+                    continue
+                dado = linha[len("data: "):]
+                if dado == "[DONE]":
+                    break
+                conteudo = json.loads(dado)["choices"][0]["delta"].get("content")
+                if conteudo:
+                    yield conteudo
+
+
+def criar_backend(config, modelo):
+    """
+    Cria o backend da LLM indicado na configuração.
+
+    Chaves lidas do config.toml:
+    - LLM_BACKEND: "groq" (padrão), "openai" (endpoint compatível) ou "local"
+      (servidor de testes, ver servidor_llm_fake.py).
+    - LLM_MODELO: Modelo usado no lugar do padrão.
+    - LLM_BASE_URL: URL base do endpoint compatível com a OpenAI.
+    - API_KEY: Chave da API (obrigatória para a Groq).
+
+    Args:
+    - config (dict): Configuração carregada do config.toml.
+    - modelo (str): Modelo padrão.
+
+    Returns:
+    - BackendGroq | BackendOpenAI: Backend configurado.
+    """
+    tipo = config.get("LLM_BACKEND", "groq")
+    modelo = config.get("LLM_MODELO", modelo)
+    if tipo == "groq":
+        return BackendGroq(modelo, config.get("API_KEY"))
+    if tipo == "openai":
+        if "LLM_BASE_URL" not in config:
+            raise ValueError("LLM_BASE_URL não encontrada no arquivo config.toml.")
+        return BackendOpenAI(modelo, config["LLM_BASE_URL"], config.get("API_KEY"))
+    if tipo == "local":
+        return BackendOpenAI(modelo, config.get("LLM_BASE_URL", URL_LOCAL))
+    raise ValueError(f"Backend de LLM desconhecido: {tipo}")
@@ -0,0 +1,336 @@
+"""
+Benchmarks das etapas do dashboard (carga, sidebar, filtros, agregações e renderização)
+sobre microdados sintéticos, sem servidor do Streamlit. Gera um relatório JSON para
+acompanhar regressões.
+
+Uso:
+    python -m benchmarks.executar --tamanhos 100k 1M --repeticoes 5
+    python -m benchmarks.executar --comparar benchmarks/resultados/anterior.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from streamlit import logger as st_logger
+
+from benchmarks.gerar_dados import TAMANHOS, gerar_parquet
+from agrupamento import agrupar_por
+from amostra import construir_amostra
+from cache_resultados import cache_resultados
+from cubo import MEDIDAS, construir_cubo
+from data_loader import (COLUNAS_DASHBOARD, adicionar_colunas_derivadas,
+                         iterar_microdados, ler_microdados, load_dataset,
+                         reduzir_tipos)
+from dashboard import (ABAS, AGREGACOES, AGREGACOES_DISTRIBUICAO,
+                       AGREGACOES_MICRODADOS, DIMENSOES_AGREGACOES,
+                       ConsultasRerun)
+from distribuicao import construir_histogramas
+from filtros import (FILTRO_NOTAS_VALIDAS, FiltroIncremental, construir_indices,
+                     filtrar, selecionar_linhas)
+from motores_consulta import (MotorAmostra, MotorDuckDB, MotorPandas,
+                              verificar_paridade)
+from particionar import particionar_parquet
+from sidebar import render_sidebar
+
+# Fora de "streamlit run" os comandos do Streamlit não exibem nada; os avisos de contexto
+# ausente são omitidos. A configuração é carregada antes, pois ao ser carregada ela
+# redefine o nível do log.
+st.config.get_config_options()
+st_logger.set_log_level("error")
+
+PASTA_DADOS = os.path.join(os.path.dirname(__file__), "dados")
+PASTA_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+# Razão entre medianas a partir da qual uma etapa é considerada mais lenta, desconsiderando
+# diferenças menores que DIFERENCA_MINIMA_S (ruído das etapas de poucos milissegundos)
+LIMITE_REGRESSAO = 1.2
+DIFERENCA_MINIMA_S = 0.005
+
+
+def medir(funcao, repeticoes):
+    """
+    Executa a função repetidas vezes e mede o tempo de cada execução e o pico de
+    memória alocada (tracemalloc, em uma execução adicional que também serve de
+    aquecimento).
+
+    Args:
+    - funcao (callable): Função sem argumentos.
+    - repeticoes (int): Número de execuções cronometradas.
+
+    Returns:
+    - tuple: Último resultado da função e dicionário com as medidas.
+    """
+    # O tracemalloc deixa a execução mais lenta: o pico é medido fora das execuções cronometradas
+    gc.collect()
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    return resultado, {
+        "repeticoes": repeticoes,
+        "tempos_s": tempos,
+        "min_s": min(tempos),
+        "mediana_s": statistics.median(tempos),
+        "media_s": statistics.mean(tempos),
+        "pico_memoria_mb": pico / 2**20,
+    }
+
+
+def _cenarios_filtro(padrao):
+    # Filtros no formato de render_sidebar: faixa_etaria, sexo, uf, rede, filtro_notas
+    faixa_etaria, sexo, uf, rede, filtro_notas = padrao
+    return {
+        "padrao": padrao,
+        "uf_sp_rj": (faixa_etaria, sexo, ["SP", "RJ"], rede, filtro_notas),
+        "feminino_18_anos": ([3], ["F"], uf, rede, filtro_notas),
+        "publica_notas_validas": (faixa_etaria, sexo, uf, [2], FILTRO_NOTAS_VALIDAS),
+    }
+
+
+def _cliques(padrao):
+    # Sequência de seleções em que cada passo altera uma única dimensão
+    faixa_etaria, sexo, uf, rede, filtro_notas = padrao
+    return [
+        (faixa_etaria, sexo, ["SP"], rede, filtro_notas),
+        (faixa_etaria, sexo, ["SP", "RJ"], rede, filtro_notas),
+        (faixa_etaria, ["F"], ["SP", "RJ"], rede, filtro_notas),
+        (faixa_etaria, ["F"], ["SP", "RJ"], [2], filtro_notas),
+        (faixa_etaria, ["F"], ["SP", "RJ", "MG"], [2], filtro_notas),
+        ([3], ["F"], ["SP", "RJ", "MG"], [2], filtro_notas),
+        ([3], ["F"], ["SP", "RJ", "MG"], [2], FILTRO_NOTAS_VALIDAS),
+        ([3], sexo, ["SP", "RJ", "MG"], [2], FILTRO_NOTAS_VALIDAS),
+    ]
+
+
+class _AgregadosProntos(dict):
+    # Mesma interface de ConsultasRerun sobre agregações já calculadas, sem cache: mede
+    # a construção das figuras
+    def __call__(self, nome):
+        return self[nome]
+
+    def grafico(self, key, construir):
+        return construir()
+
+    def intervalo(self, nome):
+        return None
+
+
+def benchmark_tamanho(caminho, repeticoes):
+    """
+    Executa os benchmarks de todas as etapas para um arquivo de microdados.
+
+    Args:
+    - caminho (str): Parquet de microdados.
+    - repeticoes (int): Número de execuções cronometradas por etapa.
+
+    Returns:
+    - tuple: Lista com uma medida por etapa e lista de divergências entre os motores de consulta.
+    """
+    resultados = []
+
+    def etapa(nome, funcao):
+        resultado, medidas = medir(funcao, repeticoes)
+        resultados.append({"etapa": nome, **medidas})
+        print(f"  {nome:<40} {medidas['mediana_s'] * 1000:>10.1f} ms {medidas['pico_memoria_mb']:>9.1f} MB")
+        return resultado
+
+    # Carga, etapa por etapa e completa (sem o cache do Streamlit)
+    bruto = etapa("carga.leitura_parquet", lambda: pd.read_parquet(caminho, columns=COLUNAS_DASHBOARD))
+    reduzido = etapa("carga.reduzir_tipos", lambda: reduzir_tipos(bruto))
+    dados = etapa("carga.colunas_derivadas", lambda: adicionar_colunas_derivadas(reduzido))
+    cubo = etapa("carga.cubo", lambda: construir_cubo(dados))
+    etapa("carga.indices", lambda: construir_indices(cubo))
+    etapa("carga.histogramas", lambda: construir_histogramas(dados))
+    del bruto, reduzido, dados, cubo
+    dataset = etapa("carga.total", lambda: load_dataset.__wrapped__(caminho=caminho, compartilhado=False))
+    if dataset is None:
+        raise RuntimeError(f"Não foi possível carregar {caminho}")
+
+    # Dataset compartilhado: os arquivos Arrow são gerados antes, e a etapa mede apenas
+    # o mapeamento em memória feito pelos demais processos e reinícios
+    load_dataset.__wrapped__(caminho=caminho)
+    etapa("carga.compartilhada", lambda: load_dataset.__wrapped__(caminho=caminho))
+
+    # Sidebar: derivação das opções dos filtros (os widgets devolvem os valores padrão)
+    padrao = etapa("sidebar.opcoes", lambda: render_sidebar(dataset.catalogo))
+
+    # Dataset particionado por UF e rede: carga (cubo partição por partição) e leitura
+    # dos microdados com os filtros aplicados na leitura, comparada ao filtro em memória
+    particionado = caminho[: -len(".parquet")] + "_particionado"
+    if not os.path.isdir(particionado):
+        particionar_parquet(caminho, particionado, por=("SG_UF_ESC", "TP_ESCOLA"))
+    dataset_particionado = etapa("carga.total_particionado", lambda: load_dataset.__wrapped__(caminho=particionado))
+
+    # Filtro incremental: um clique por vez (uma dimensão muda a cada passo), sem
+    # reaproveitar combinações, comparado ao filtro completo das mesmas seleções
+    cliques = _cliques(padrao)
+    etapa("filtro.cliques.completo", lambda: [selecionar_linhas(dataset.indices_cubo, *f) for f in cliques])
+    incremental = FiltroIncremental(dataset.indices_cubo, max_combinacoes=0)
+    etapa("filtro.cliques.incremental", lambda: [incremental.selecionar(*f) for f in cliques])
+
+    # Filtros sobre o cubo
+    filtrados = {}
+    for nome, filtros in _cenarios_filtro(padrao).items():
+        filtrados[nome] = etapa(
+            f"filtro.{nome}", lambda f=filtros: filtrar(dataset.cubo, dataset.indices_cubo, *f)
+        )
+        etapa(f"microdados.{nome}", lambda f=filtros: ler_microdados(dataset, *f))
+        etapa(f"microdados.{nome}.particionado", lambda f=filtros: ler_microdados(dataset_particionado, *f))
+    del dataset_particionado
+
+    # Agregações de cada aba, com os filtros padrão
+    agregados = {}
+    for nome, agregar in AGREGACOES.items():
+        agregados[nome] = etapa(f"agregacao.{nome}", lambda a=agregar: a(filtrados["padrao"]))
+
+    # Distribuições: soma dos histogramas das células selecionadas pelos filtros padrão
+    ids_padrao = selecionar_linhas(dataset.indices_cubo, *padrao)
+    for nome, agregar in AGREGACOES_DISTRIBUICAO.items():
+        agregados[nome] = etapa(f"agregacao.{nome}", lambda a=agregar: a(dataset, ids_padrao))
+
+    # Recortes socioeconômicos: agrupamento por códigos (bincount) sobre os microdados
+    # filtrados, comparado ao groupby do pandas com as mesmas chaves
+    microdados = etapa("filtro.microdados", lambda: ler_microdados(dataset, *padrao))
+    for nome, agregar in AGREGACOES_MICRODADOS.items():
+        agregados[nome] = etapa(f"agregacao.{nome}", lambda a=agregar: a(microdados))
+    chaves = ["Q006_DESC", "TP_ESCOLA_DESC", "SG_UF_ESC"]
+    etapa("agrupamento.bincount", lambda: agrupar_por(microdados, chaves, MEDIDAS))
+    etapa("agrupamento.groupby", lambda: microdados.groupby(chaves, observed=True)[MEDIDAS].agg(["count", "sum"]))
+    del microdados
+
+    # Motor DuckDB: filtro e agrupamento direto sobre o parquet, conferidos com o pandas
+    duckdb = MotorDuckDB(caminho)
+    for nome, agregar in AGREGACOES.items():
+        etapa(
+            f"agregacao_duckdb.{nome}",
+            lambda n=nome, a=agregar: a(duckdb.agrupar(padrao, DIMENSOES_AGREGACOES[n])),
+        )
+    divergencias = verificar_paridade(
+        duckdb, MotorPandas(dataset), AGREGACOES, DIMENSOES_AGREGACOES, _cenarios_filtro(padrao)
+    )
+
+    # Renderização de cada aba (construção das figuras) a partir das agregações prontas
+    prontos = _AgregadosProntos(agregados)
+    for nome, aba in ABAS.items():
+        etapa(f"render.{nome}", lambda a=aba: a["render"](prontos))
+
+    # Rerun completo das abas com o cache compartilhado já preenchido (outra sessão com os
+    # mesmos filtros): agregações e figuras são apenas consultadas
+    cache_resultados.limpar()
+    for nome, aba in ABAS.items():
+        etapa(f"render_cache.{nome}", lambda a=aba: a["render"](ConsultasRerun(dataset, padrao)))
+
+    # Prévia pela amostra estratificada: sorteio (feito uma vez por dataset) e rerun
+    # completo de cada aba com as estimativas e os intervalos, sem o cache compartilhado
+    amostra = MotorAmostra(etapa("amostra.sorteio", lambda: construir_amostra(iterar_microdados(dataset), dataset.cubo)))
+    for nome, aba in ABAS.items():
+        def previa(a=aba):
+            cache_resultados.limpar()
+            a["render"](ConsultasRerun(dataset, padrao, motor=amostra))
+        etapa(f"render_previa.{nome}", previa)
+
+    return resultados, divergencias
+
+
+def metadados():
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pa.__version__,
+        "streamlit": st.__version__,
+    }
+
+
+def comparar(atual, anterior, limite=LIMITE_REGRESSAO):
+    """
+    Compara as medianas com as de um relatório anterior.
+
+    Args:
+    - atual (dict): Relatório atual.
+    - anterior (dict): Relatório anterior.
+    - limite (float): Razão a partir da qual a etapa é considerada regressão.
+
+    Returns:
+    - list of dict: Etapas mais lentas que o limite.
+    """
+    base = {(r["linhas"], r["etapa"]): r["mediana_s"] for r in anterior["resultados"]}
+    regressoes = []
+    for r in atual["resultados"]:
+        chave = (r["linhas"], r["etapa"])
+        if chave in base and base[chave] > 0:
+            razao = r["mediana_s"] / base[chave]
+            if razao > limite and r["mediana_s"] - base[chave] > DIFERENCA_MINIMA_S:
+                regressoes.append({"linhas": r["linhas"], "etapa": r["etapa"], "razao": razao})
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard ENEM 2023.")
+    parser.add_argument("--tamanhos", nargs="+", default=["100k", "1M"], choices=list(TAMANHOS))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON do relatório.")
+    parser.add_argument("--comparar", default=None, help="Relatório anterior para comparação.")
+    parser.add_argument("--limite", type=float, default=LIMITE_REGRESSAO,
+                        help="Razão entre medianas considerada regressão.")
+    args = parser.parse_args()
+
+    relatorio = {"metadados": metadados(), "resultados": [], "divergencias": []}
+    for rotulo in args.tamanhos:
+        linhas = TAMANHOS[rotulo]
+        caminho = os.path.join(PASTA_DADOS, f"enem_sintetico_{rotulo}.parquet")
+        if not os.path.exists(caminho):
+            print(f"Gerando {caminho}...")
+            gerar_parquet(linhas, caminho)
+        print(f"{rotulo} linhas ({caminho})")
+        resultados, divergencias = benchmark_tamanho(caminho, args.repeticoes)
+        relatorio["resultados"] += [{"linhas": linhas, **resultado} for resultado in resultados]
+        relatorio["divergencias"] += [{"linhas": linhas, **divergencia} for divergencia in divergencias]
+        gc.collect()
+
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"Relatório gravado em {saida}")
+
+    for d in relatorio["divergencias"]:
+        print(f"DIVERGÊNCIA {d['linhas']} linhas, {d['cenario']}, {d['agregacao']}: {d['diferenca']}")
+
+    regressoes = []
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            regressoes = comparar(relatorio, json.load(f), args.limite)
+        for r in regressoes:
+            print(f"REGRESSÃO {r['linhas']} linhas, {r['etapa']}: {r['razao']:.2f}x mais lento")
+    if regressoes or relatorio["divergencias"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
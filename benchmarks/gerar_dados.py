@@ -0,0 +1,158 @@
+"""
+Gera arquivos parquet sintéticos com o formato dos microdados do ENEM 2023
+(mesmas colunas e códigos), para os benchmarks.
+
+Uso:
+    python -m benchmarks.gerar_dados --linhas 1000000 --saida benchmarks/dados/enem_1M.parquet
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Tamanhos usados pelos benchmarks
+TAMANHOS = {
+    "100k": 100_000,
+    "1M": 1_000_000,
+    "4M": 4_000_000,
+    "10M": 10_000_000,
+}
+
+# Linhas geradas e gravadas por vez (limita a memória em arquivos grandes)
+LINHAS_POR_BLOCO = 1_000_000
+
+# Participação aproximada de cada UF no número de inscritos
+PESOS_UF = {
+    "SP": 16.0, "MG": 9.0, "BA": 7.0, "RJ": 7.0, "CE": 6.0, "PE": 5.0, "PA": 5.0,
+    "PR": 5.0, "MA": 4.0, "RS": 4.0, "GO": 3.0, "PB": 3.0, "AM": 3.0, "SC": 3.0,
+    "RN": 2.0, "PI": 2.0, "AL": 2.0, "ES": 2.0, "MT": 2.0, "DF": 2.0, "MS": 1.5,
+    "SE": 1.5, "RO": 1.0, "TO": 1.0, "AC": 0.7, "AP": 0.7, "RR": 0.4,
+}
+
+# Concentração nas faixas de 17 a 19 anos, com cauda longa nas idades maiores
+PESOS_FAIXA_ETARIA = [8, 20, 20, 10, 7, 5, 4, 3, 3, 2, 5, 3, 2.5, 2, 1.5, 1, 1, 0.7, 0.5, 0.3]
+
+# Média e desvio padrão de cada prova
+NOTAS = {
+    "NU_NOTA_CN": (495, 80),
+    "NU_NOTA_CH": (520, 90),
+    "NU_NOTA_LC": (520, 75),
+    "NU_NOTA_MT": (530, 125),
+    "NU_NOTA_REDACAO": (620, 190),
+}
+PROVAS_DIA_1 = ["NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_REDACAO"]
+PROVAS_DIA_2 = ["NU_NOTA_CN", "NU_NOTA_MT"]
+
+PROPORCAO_AUSENTES = 0.28  # Faltaram em um dos dias (nota nula nas provas do dia)
+PROPORCAO_INVALIDAS = 0.005  # Notas fora do intervalo 0-1000
+
+
+def _pesos(valores):
+    valores = np.asarray(valores, dtype=float)
+    return valores / valores.sum()
+
+
+def gerar_bloco(n, rng, inicio=0):
+    """
+    Gera um bloco de microdados sintéticos.
+
+    Args:
+    - n (int): Número de linhas.
+    - rng (np.random.Generator): Gerador de números aleatórios.
+    - inicio (int): Primeiro NU_INSCRICAO do bloco.
+
+    Returns:
+    - pd.DataFrame: Microdados sintéticos.
+    """
+    ufs = np.array(list(PESOS_UF), dtype=object)
+    uf = rng.choice(ufs, n, p=_pesos(list(PESOS_UF.values())))
+    sem_escola = rng.random(n) < 0.6  # UF da escola só é informada por quem está cursando
+    uf_escola = uf.copy()
+    uf_escola[sem_escola] = None
+
+    # Rede: quem não informa a escola quase sempre não responde a rede
+    rede = np.where(
+        sem_escola,
+        rng.choice([1, 2, 3], n, p=[0.95, 0.04, 0.01]),
+        rng.choice([1, 2, 3], n, p=[0.05, 0.75, 0.20]),
+    )
+
+    renda = rng.choice(list("ABCDEFGHIJKLMNOPQ"), n, p=_pesos(0.8 ** np.arange(17)))
+    # Efeito de rede privada e renda nas notas
+    indice_renda = np.frombuffer("".join(renda).encode("ascii"), dtype=np.uint8) - ord("A")
+    efeito = (rede == 3) * 60.0 + indice_renda * 4.0
+
+    dados = {
+        "NU_INSCRICAO": np.arange(inicio, inicio + n, dtype=np.int64),
+        "NU_ANO": np.full(n, 2023, dtype=np.int64),
+        "TP_FAIXA_ETARIA": rng.choice(np.arange(1, 21), n, p=_pesos(PESOS_FAIXA_ETARIA)),
+        "TP_SEXO": rng.choice(["F", "M"], n, p=[0.6, 0.4]).astype(object),
+        "TP_ST_CONCLUSAO": rng.choice([1, 2, 3, 4], n, p=[0.55, 0.3, 0.1, 0.05]),
+        "TP_ESCOLA": rede,
+        "SG_UF_PROVA": uf,
+        "SG_UF_ESC": uf_escola,
+    }
+
+    ausente_dia_1 = rng.random(n) < PROPORCAO_AUSENTES
+    ausente_dia_2 = ausente_dia_1 | (rng.random(n) < 0.05)
+    for prova, (media, desvio) in NOTAS.items():
+        notas = (rng.normal(media, desvio, n) + efeito).clip(0, 1000)
+        notas[ausente_dia_1 if prova in PROVAS_DIA_1 else ausente_dia_2] = np.nan
+        dados[prova] = notas
+    for prova, ausente in (("CN", ausente_dia_2), ("CH", ausente_dia_1), ("LC", ausente_dia_1), ("MT", ausente_dia_2)):
+        dados[f"TP_PRESENCA_{prova}"] = np.where(ausente, 0, 1)
+
+    # Notas inválidas (fora de 0-1000) em uma fração das linhas presentes
+    invalidas = (rng.random(n) < PROPORCAO_INVALIDAS) & ~ausente_dia_1
+    dados["NU_NOTA_REDACAO"][invalidas] = rng.choice([-1.0, 1040.0], invalidas.sum())
+
+    escolaridade = _pesos([4, 20, 10, 8, 30, 6, 14, 8])
+    dados["Q001"] = rng.choice(list("ABCDEFGH"), n, p=escolaridade).astype(object)
+    dados["Q002"] = rng.choice(list("ABCDEFGH"), n, p=escolaridade).astype(object)
+    dados["Q006"] = renda.astype(object)
+    dados["Q025"] = rng.choice(["A", "B"], n, p=[0.15, 0.85]).astype(object)
+    return pd.DataFrame(dados)
+
+
+def gerar_parquet(linhas, caminho, semente=0):
+    """
+    Grava um parquet sintético com o número de linhas pedido, bloco a bloco.
+
+    Args:
+    - linhas (int): Número total de linhas.
+    - caminho (str): Arquivo de saída.
+    - semente (int): Semente do gerador (mesma semente, mesmo arquivo).
+
+    Returns:
+    - str: Caminho do arquivo gravado.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = caminho + ".tmp"
+    escritor = None
+    try:
+        for i, inicio in enumerate(range(0, linhas, LINHAS_POR_BLOCO)):
+            rng = np.random.default_rng([semente, i])
+            bloco = gerar_bloco(min(LINHAS_POR_BLOCO, linhas - inicio), rng, inicio)
+            if escritor is None:
+                tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+                escritor = pq.ParquetWriter(temporario, tabela.schema)
+            else:
+                tabela = pa.Table.from_pandas(bloco, schema=escritor.schema, preserve_index=False)
+            escritor.write_table(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    os.replace(temporario, caminho)
+    return caminho
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera microdados sintéticos do ENEM em parquet.")
+    parser.add_argument("--linhas", type=int, default=TAMANHOS["1M"])
+    parser.add_argument("--saida", required=True)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+    print(gerar_parquet(args.linhas, args.saida, args.semente))
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Pasta do cache em disco e limites de cada camada
+CACHE_DIR = "./.cache_llm"
+MAX_ENTRADAS_MEMORIA = 256
+TTL_SEGUNDOS = 24 * 60 * 60
+MAX_BYTES_DISCO = 50 * 1024 * 1024
+
+# Escritas em disco entre duas limpezas completas da pasta (expirados e excedentes); entre
+# elas, o tamanho da pasta é acompanhado somando o tamanho de cada arquivo gravado
+ESCRITAS_POR_LIMPEZA = 64
+
+
+def chave_resposta(modelo, titulo, tabelas, versao_prompt):
+    """
+    Gera uma chave estável para a análise a partir do modelo, do título, do conteúdo
+    normalizado das tabelas e da versão do prompt.
+
+    Args:
+    - modelo (str): Nome do modelo da LLM.
+    - titulo (str): Título ou contexto da análise.
+    - tabelas (list of tuples): Lista de tabelas no formato [(nome_tabela, df), ...].
+    - versao_prompt (int): Versão do texto do prompt.
+
+    Returns:
+    - str: Hash SHA-256 em hexadecimal.
+    """
+    conteudo = {
+        "modelo": modelo,
+        "titulo": titulo,
+        "versao_prompt": versao_prompt,
+        # Arredondamento evita chaves diferentes por ruído de ponto flutuante
+        "tabelas": [(nome, tabela.round(4).to_csv(index=False)) for nome, tabela in tabelas],
+    }
+    texto = json.dumps(conteudo, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """
+    Cache de respostas da LLM em duas camadas: LRU em memória e arquivos JSON em disco
+    com validade (TTL) e limite de tamanho. É seguro para uso entre sessões (threads):
+    o lock protege apenas a LRU e os contadores, e as leituras e escritas em disco são
+    feitas fora dele (escritas atômicas, por renomeação).
+    """
+
+    def __init__(self, diretorio=CACHE_DIR, max_entradas=MAX_ENTRADAS_MEMORIA,
+                 ttl=TTL_SEGUNDOS, max_bytes=MAX_BYTES_DISCO):
+        self.diretorio = diretorio
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._lock_limpeza = threading.Lock()
+        self._bytes_disco = None  # Desconhecido até a primeira limpeza
+        self._escritas = 0
+        self.contadores = {"hits_memoria": 0, "hits_disco": 0, "misses": 0}
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def _guardar_memoria(self, chave, criado_em, resposta):
+        self._memoria[chave] = (criado_em, resposta)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _ler_disco(self, chave):
+        try:
+            with open(self._caminho(chave), "r", encoding="utf-8") as f:
+                entrada = json.load(f)
+            return entrada["criado_em"], entrada["resposta"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def obter(self, chave):
+        """
+        Retorna a resposta guardada para a chave, ou None se ausente ou expirada.
+        """
+        agora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                if agora - entrada[0] <= self.ttl:
+                    self._memoria.move_to_end(chave)
+                    self.contadores["hits_memoria"] += 1
+                    return entrada[1]
+                del self._memoria[chave]  # Expirada
+
+        entrada = self._ler_disco(chave)
+        with self._lock:
+            if entrada is not None and agora - entrada[0] <= self.ttl:
+                # Não substitui uma resposta mais nova guardada enquanto o disco era lido
+                atual = self._memoria.get(chave)
+                if atual is None or atual[0] < entrada[0]:
+                    self._guardar_memoria(chave, *entrada)
+                self.contadores["hits_disco"] += 1
+                return entrada[1]
+            self.contadores["misses"] += 1
+            return None
+
+    def guardar(self, chave, resposta):
+        """
+        Guarda a resposta nas duas camadas e aplica o limite de tamanho do disco.
+        """
+        criado_em = time.time()
+        with self._lock:
+            self._guardar_memoria(chave, criado_em, resposta)
+
+        # Escrita fora do lock, em um temporário próprio da thread renomeado sobre o destino
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = f"{self._caminho(chave)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"criado_em": criado_em, "resposta": resposta}, f, ensure_ascii=False)
+            tamanho = os.path.getsize(temporario)
+            os.replace(temporario, self._caminho(chave))
+        except OSError:
+            return  # O cache em disco é opcional: falhas de escrita não interrompem a análise
+
+        # A pasta só é percorrida quando passa do limite ou a cada ESCRITAS_POR_LIMPEZA
+        # escritas (para remover os expirados); respostas regravadas contam duas vezes até
+        # a limpeza seguinte, que recalcula o tamanho
+        with self._lock:
+            self._escritas += 1
+            if self._bytes_disco is not None:
+                self._bytes_disco += tamanho
+            limpar = (
+                self._bytes_disco is None
+                or self._bytes_disco > self.max_bytes
+                or self._escritas >= ESCRITAS_POR_LIMPEZA
+            )
+            if limpar:
+                self._escritas = 0
+        if limpar:
+            self._remover_excedentes()
+
+    def _remover_excedentes(self):
+        # Remove arquivos expirados e, se ainda acima do limite, os mais antigos primeiro.
+        # Uma limpeza por vez: se outra thread já está limpando, esta não espera por ela.
+        if not self._lock_limpeza.acquire(blocking=False):
+            return
+        try:
+            agora = time.time()
+            arquivos = []
+            for nome in os.listdir(self.diretorio):
+                if not nome.endswith(".json"):
+                    continue
+                caminho = os.path.join(self.diretorio, nome)
+                try:
+                    info = os.stat(caminho)
+                    if agora - info.st_mtime > self.ttl:
+                        os.remove(caminho)
+                    else:
+                        arquivos.append((info.st_mtime, info.st_size, caminho))
+                except OSError:
+                    continue  # Removido ou substituído por outra thread durante a limpeza
+
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+                total -= tamanho
+            with self._lock:
+                self._bytes_disco = total
+        except OSError:
+            pass
+        finally:
+            self._lock_limpeza.release()
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de acertos e falhas e a taxa de acerto.
+        """
+        with self._lock:
+            contadores = dict(self.contadores)
+        total = sum(contadores.values())
+        acertos = contadores["hits_memoria"] + contadores["hits_disco"]
+        contadores["taxa_acerto"] = acertos / total if total else 0.0
+        return contadores
+
+
+# Instância única, compartilhada por todas as sessões do servidor
+cache_respostas = CacheRespostas()
@@ -0,0 +1,152 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Limite de memória das tabelas e figuras guardadas (somado entre todas as sessões)
+MAX_BYTES_RESULTADOS = 64 * 1024 * 1024
+
+# Estimativa do tamanho das figuras: arrays de dados de cada trace, mais uma parte fixa
+# (layout, template e atributos de estilo) e, nos arrays de objetos, um tamanho médio
+# por elemento
+ATRIBUTOS_DADOS_FIGURA = ("x", "y", "z", "customdata", "text", "hovertext", "labels", "values", "ids")
+BYTES_FIXOS_FIGURA = 4 * 1024
+BYTES_POR_OBJETO = 64
+
+
+def _bytes_valores(valores):
+    # Arrays numéricos pelo tamanho real; listas e arrays de objetos por elemento
+    if isinstance(valores, np.ndarray) and valores.dtype != object:
+        return valores.nbytes
+    if not hasattr(valores, "__len__"):
+        return BYTES_POR_OBJETO  # Valor único para todos os pontos
+    elementos = len(valores)
+    if elementos and isinstance(valores[0], (list, tuple, np.ndarray)):
+        elementos *= len(valores[0])  # customdata: uma linha por ponto
+    return elementos * BYTES_POR_OBJETO
+
+
+def _bytes_figura(figura):
+    # Soma os arrays de dados dos traces, sem serializar nem copiar a figura: os traces
+    # são lidos como os dicionários que o Plotly guarda (_data); o acesso pelos
+    # atributos dos traces valida cada caminho e custa mais que a própria serialização
+    traces = getattr(figura, "_data", None)
+    if traces is None:
+        traces = figura.to_dict()["data"]
+    total = BYTES_FIXOS_FIGURA
+    for trace in traces:
+        for atributo in ATRIBUTOS_DADOS_FIGURA:
+            valores = trace.get(atributo)
+            if valores is not None and not isinstance(valores, str):
+                total += _bytes_valores(valores)
+        for barra in ("error_x", "error_y"):
+            valores = (trace.get(barra) or {}).get("array")
+            if valores is not None:
+                total += _bytes_valores(valores)
+    return total
+
+
+def estimar_bytes(valor):
+    """
+    Estima a memória ocupada por um resultado guardado no cache.
+
+    Args:
+    - valor: Tabela, figura do Plotly, número ou None.
+
+    Returns:
+    - int: Tamanho aproximado em bytes.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if hasattr(valor, "data") and hasattr(valor, "layout"):
+        # Figuras: tamanho dos dados dos traces, sem serializar a figura
+        return _bytes_figura(valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    """
+    Cache LRU em memória das agregações e figuras do dashboard, compartilhado por todas
+    as sessões e limitado pelo tamanho total dos resultados guardados. As chaves usam os
+    filtros canônicos, então seleções equivalentes reaproveitam o mesmo resultado.
+
+    Os resultados são devolvidos sem cópia: quem os recebe não deve alterá-los.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES_RESULTADOS):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.contadores = {"hits": 0, "misses": 0, "remocoes": 0}
+
+    def obter_ou_calcular(self, chave, calcular):
+        """
+        Retorna o resultado guardado para a chave ou o calcula e o guarda.
+
+        Args:
+        - chave (tuple): Chave do resultado (com os filtros canônicos).
+        - calcular (callable): Função sem argumentos que calcula o resultado.
+
+        Returns:
+        - Resultado guardado ou recém-calculado.
+        """
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.contadores["hits"] += 1
+                return self._entradas[chave][0]
+            self.contadores["misses"] += 1
+
+        # Calculado fora do lock para não bloquear as outras sessões; se duas sessões
+        # pedirem a mesma chave ao mesmo tempo, a segunda apenas substitui o resultado
+        valor = calcular()
+        tamanho = estimar_bytes(valor)
+        if tamanho > self.max_bytes:
+            return valor
+
+        with self._lock:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+            self._entradas[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                _, (_, removido) = self._entradas.popitem(last=False)
+                self.bytes -= removido
+                self.contadores["remocoes"] += 1
+        return valor
+
+    def contem(self, chave):
+        """
+        Indica se há resultado guardado para a chave (sem contar acerto nem falha).
+        """
+        with self._lock:
+            return chave in self._entradas
+
+    def limpar(self):
+        """
+        Remove todos os resultados guardados (os contadores são mantidos).
+        """
+        with self._lock:
+            self._entradas.clear()
+            self.bytes = 0
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de acertos, falhas e remoções, a taxa de acerto e a
+        memória ocupada.
+        """
+        with self._lock:
+            contadores = dict(self.contadores)
+            contadores["entradas"] = len(self._entradas)
+            contadores["bytes"] = self.bytes
+        total = contadores["hits"] + contadores["misses"]
+        contadores["taxa_acerto"] = contadores["hits"] / total if total else 0.0
+        return contadores
+
+
+# Instância única, compartilhada por todas as sessões do servidor
+cache_resultados = CacheResultados()
@@ -0,0 +1,149 @@
+"""
+Catálogo de metadados do dataset: valores distintos de cada dimensão do sidebar, com
+a quantidade de alunos por valor e de nulos, total de alunos e, para cada nota, os
+valores mínimo e máximo e a quantidade de nulos. É gerado na ingestão ou na primeira
+carga e gravado em JSON ao lado do parquet, para que o sidebar e as métricas do
+cabeçalho não precisem percorrer os dados.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from armazenamento import arquivo_atualizado
+from filtros import COLUNAS_NOTAS, DIMENSOES_FILTRO
+
+# Versão do formato: catálogos de outra versão são gerados de novo
+VERSAO_CATALOGO = 1
+
+
+def caminho_catalogo(caminho):
+    """
+    Retorna o arquivo do catálogo de um parquet ou de um diretório particionado.
+    """
+    return f"{os.path.splitext(caminho.rstrip('/'))[0]}.catalogo.json"
+
+
+def _valor_json(valor):
+    # Tipos do numpy viram tipos nativos e nulos (NaN/pd.NA) viram None
+    if pd.isna(valor):
+        return None
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def _extremos_notas(caminho):
+    # Mínimo e máximo de cada nota pelas estatísticas dos row groups do parquet; a
+    # coluna só é lida quando algum row group não tem estatísticas
+    fonte = ds.dataset(caminho, format="parquet", partitioning="hive")
+    extremos = {coluna: [] for coluna in COLUNAS_NOTAS}
+    for fragmento in fonte.get_fragments():
+        metadados = fragmento.metadata
+        posicoes = {metadados.schema.column(i).name: i for i in range(metadados.num_columns)}
+        for coluna in COLUNAS_NOTAS:
+            if extremos[coluna] is None:
+                continue
+            for grupo in range(metadados.num_row_groups):
+                estatisticas = metadados.row_group(grupo).column(posicoes[coluna]).statistics
+                if estatisticas is not None and estatisticas.has_min_max:
+                    extremos[coluna] += [estatisticas.min, estatisticas.max]
+                elif estatisticas is None or estatisticas.num_values > 0:
+                    extremos[coluna] = None  # Sem estatísticas: calcula sobre a coluna
+                    break
+
+    resultado = {}
+    for coluna, valores in extremos.items():
+        if valores is None:
+            minimo_maximo = pc.min_max(fonte.to_table(columns=[coluna])[coluna]).as_py()
+            valores = [v for v in minimo_maximo.values() if v is not None]
+        resultado[coluna] = {
+            "min": float(min(valores)) + 0.0 if valores else None,  # + 0.0 normaliza -0.0
+            "max": float(max(valores)) + 0.0 if valores else None,
+        }
+    return resultado
+
+
+def construir_catalogo(cubo, caminho):
+    """
+    Gera o catálogo a partir do cubo (contagens por valor e de nulos) e das
+    estatísticas do parquet (mínimo e máximo das notas).
+
+    Args:
+    - cubo (pd.DataFrame): Cubo do dataset.
+    - caminho (str): Parquet ou diretório particionado de origem.
+
+    Returns:
+    - dict: Catálogo com total, dimensões e notas.
+    """
+    total = int(cubo["QTD"].sum())
+    dimensoes = {}
+    for dimensao in DIMENSOES_FILTRO:
+        contagens = cubo.groupby(dimensao, dropna=False, observed=True)["QTD"].sum()
+        contagens = contagens[contagens > 0]
+        valores = sorted(
+            ((_valor_json(valor), int(quantidade)) for valor, quantidade in contagens.items()),
+            key=lambda item: (item[0] is None, item[0] if item[0] is not None else ""),
+        )
+        dimensoes[dimensao] = {
+            "valores": [valor for valor, _ in valores],
+            "contagens": [quantidade for _, quantidade in valores],
+            "nulos": sum(quantidade for valor, quantidade in valores if valor is None),
+        }
+
+    extremos = _extremos_notas(caminho)
+    notas = {
+        coluna: {**extremos[coluna], "nulos": total - int(cubo[f"{coluna}_N"].sum())}
+        for coluna in COLUNAS_NOTAS
+    }
+    return {"versao": VERSAO_CATALOGO, "total": total, "dimensoes": dimensoes, "notas": notas}
+
+
+def salvar_catalogo(catalogo, caminho):
+    """
+    Grava o catálogo ao lado do parquet (gravação atômica).
+
+    Args:
+    - catalogo (dict): Catálogo gerado por construir_catalogo.
+    - caminho (str): Parquet ou diretório particionado de origem.
+
+    Returns:
+    - str: Arquivo gravado.
+    """
+    destino = caminho_catalogo(caminho)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(catalogo, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, destino)
+    return destino
+
+
+def carregar_catalogo(caminho, cubo):
+    """
+    Lê o catálogo do dataset, gerando-o (e tentando gravá-lo) quando não existe, está
+    desatualizado em relação ao parquet ou é de outra versão.
+
+    Args:
+    - caminho (str): Parquet ou diretório particionado de origem.
+    - cubo (pd.DataFrame): Cubo do dataset, usado se o catálogo precisar ser gerado.
+
+    Returns:
+    - dict: Catálogo do dataset.
+    """
+    arquivo = caminho_catalogo(caminho)
+    if arquivo_atualizado(arquivo, caminho):
+        try:
+            with open(arquivo, "r", encoding="utf-8") as f:
+                catalogo = json.load(f)
+            if catalogo.get("versao") == VERSAO_CATALOGO:
+                return catalogo
+        except (OSError, ValueError):
+            pass
+
+    catalogo = construir_catalogo(cubo, caminho)
+    try:
+        salvar_catalogo(catalogo, caminho)
+    except OSError:
+        pass  # Sem permissão de escrita: o catálogo fica apenas em memória
+    return catalogo
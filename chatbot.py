@@ -1,15 +1,101 @@
-import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
 import streamlit as st
-from langchain_groq import ChatGroq
-import tomli
+from cache_llm import cache_respostas, chave_resposta
+from cliente_llm import ClienteLLM
+from prompt_tabelas import serializar_tabelas
+from rastreamento import contar, rastrear, span
 
-# Função para carregar a chave API do arquivo config.toml
-def carregar_chave_api():
-    with open("config.toml", "rb") as f:
-        config = tomli.load(f)
-    return config["API_KEY"]
+# Modelo padrão do backend da Groq (pode ser trocado por LLM_MODELO no config.toml)
+MODELO = 'llama-3.1-70b-versatile'
+
+# Incrementar sempre que o texto do prompt mudar, para invalidar as respostas em cache
+PROMPT_VERSAO = 3
+
+# Número máximo de análises parciais do relatório executadas em paralelo
+MAX_ANALISES_PARALELAS = 4
+
+INSTRUCAO_ASSISTENTE = "Você é um Assistente de Ingeligência virtual analisando os dados para uma instituição de ensino que tem como sua principal função oferecer cursos e programas de formação profissional para a indústria, contribuindo para a qualificação da mão de obra e o desenvolvimento tecnológico do setor. Faça insights com base nos dados apresentados e que seja do interesse dessa instituição."
+
+INSTRUCAO_PARCIAL = "Resuma em até cinco tópicos curtos os fatos e padrões mais relevantes dessas tabelas, citando os números principais. Esse resumo será combinado com os de outras tabelas em um relatório."
+
+# Cliente único, compartilhado por todas as sessões: configuração, conexões e limites de carga
+cliente_llm = ClienteLLM(MODELO)
+
+def _montar_prompt(titulo, tabelas, instrucao):
+    # Tabelas em formato compacto, dentro do orçamento de tokens
+    prompt = f"Analise as tabelas a seguir para o contexto: {titulo}\n\n"
+    return prompt + serializar_tabelas(tabelas) + "\n" + instrucao
+
+def _consultar(chave, prompt, metricas=None):
+    # Consulta a LLM, reaproveitando e guardando a resposta no cache
+    resposta_cache = cache_respostas.obter(chave)
+    if resposta_cache is not None:
+        return resposta_cache
+    resposta = cliente_llm.invocar(prompt, metricas)
+    if resposta.strip():
+        cache_respostas.guardar(chave, resposta)
+    return resposta
+
+def _stream_com_cache(chave, prompt, metricas=None):
+    # Gerador comum às análises e às perguntas: chave e prompt são funções, avaliadas
+    # dentro do try para que qualquer erro vire mensagem na tela
+    metricas = {} if metricas is None else metricas
+    inicio = time.perf_counter()
+    try:
+        chave = chave()
+        resposta_cache = cache_respostas.obter(chave)
+        metricas["cache"] = resposta_cache is not None
+        contar("llm.cache_hits" if resposta_cache is not None else "llm.cache_misses")
+        if resposta_cache is not None:
+            metricas["primeiro_token"] = time.perf_counter() - inicio
+            yield resposta_cache
+            return
+
+        prompt = prompt()
+        partes = []
+        for pedaco in cliente_llm.stream(prompt, metricas):
+            if not partes:
+                metricas["primeiro_token"] = time.perf_counter() - inicio
+            partes.append(pedaco)
+            yield pedaco
+
+        # Só respostas completas e não vazias vão para o cache
+        resposta = "".join(partes)
+        if resposta.strip():
+            cache_respostas.guardar(chave, resposta)
+        else:
+            yield "Não foi possível gerar uma análise no momento."
+    except Exception as e:
+        yield f"Erro ao processar a análise: {str(e)}"
+    finally:
+        metricas["total"] = time.perf_counter() - inicio
+
+def analisar_tabelas_stream(titulo, tabelas, metricas=None):
+    """
+    Analisa as tabelas com a LLM e devolve a resposta em partes, à medida que os
+    tokens chegam. Respostas em cache são devolvidas de uma vez.
+
+    Args:
+    - titulo (str): Título ou contexto da análise, para exibir no prompt.
+    - tabelas (list of tuples): Lista de tabelas no formato [(nome_tabela, df), ...].
+    - metricas (dict): Dicionário opcional que recebe os tempos "espera_fila",
+      "primeiro_token" e "total" (em segundos) e a flag "cache".
+
+    Returns:
+    - generator of str: Trechos da resposta gerada pela LLM.
+    """
+    def chave():
+        return chave_resposta(cliente_llm.identificador, titulo, tabelas, PROMPT_VERSAO)
+
+    def prompt():
+        return _montar_prompt(titulo, tabelas, INSTRUCAO_ASSISTENTE)
+
+    return _stream_com_cache(chave, prompt, metricas)
 
 # Função genérica para análise das tabelas
+@rastrear("analisar_tabelas")
 def analisar_tabelas(titulo, tabelas):
     """
     Analisa uma ou mais tabelas fornecidas e gera um resumo com a LLM.
@@ -21,29 +107,94 @@ def analisar_tabelas(titulo, tabelas):
     Returns:
     - str: Resultado da análise gerada pela LLM.
     """
-    try:
-        # Carregar a chave da API
-        API_KEY = carregar_chave_api()
-        if API_KEY:
-            os.environ['GROQ_API_KEY'] = API_KEY
-        else:
-            return "Erro: API Key não encontrada no arquivo config.toml."
+    return "".join(analisar_tabelas_stream(titulo, tabelas))
 
-        # Criar o modelo LLM
-        chat = ChatGroq(model='llama-3.1-70b-versatile')
+def gerar_relatorio(titulo, grupos):
+    """
+    Gera um relatório em duas etapas: cada grupo de tabelas é resumido em paralelo
+    (map) e os resumos parciais são combinados em um relatório final (reduce).
 
-        # Preparar o prompt
-        prompt = f"Analise as tabelas a seguir para o contexto: {titulo}\n\n"
-        for nome_tabela, tabela in tabelas:
-            prompt += f"Tabela: {nome_tabela}\n{tabela.to_string(index=False)}\n\n"
+    Args:
+    - titulo (str): Título ou contexto do relatório.
+    - grupos (list of tuples): Grupos no formato [(nome_grupo, [(nome_tabela, df), ...]), ...].
+
+    Returns:
+    - tuple: Texto do relatório e dicionário com os tempos (em segundos) de cada etapa
+      e a maior espera na fila do cliente da LLM.
+    """
+    tempos = {"parciais": {}, "espera_fila": 0.0}
+    inicio = time.perf_counter()
+    try:
+        def resumir(grupo):
+            nome_grupo, tabelas = grupo
+            inicio_grupo = time.perf_counter()
+            metricas = {}
+            chave = chave_resposta(
+                cliente_llm.identificador, f"{titulo} - {nome_grupo} (parcial)", tabelas, PROMPT_VERSAO
+            )
+            resumo = _consultar(chave, _montar_prompt(nome_grupo, tabelas, INSTRUCAO_PARCIAL), metricas)
+            tempos["parciais"][nome_grupo] = time.perf_counter() - inicio_grupo
+            tempos["espera_fila"] = max(tempos["espera_fila"], metricas.get("espera_fila", 0.0))
+            return resumo
 
-        prompt += "Você é um Assistente de Ingeligência virtual analisando os dados para uma instituição de ensino que tem como sua principal função oferecer cursos e programas de formação profissional para a indústria, contribuindo para a qualificação da mão de obra e o desenvolvimento tecnológico do setor. Faça insights com base nos dados apresentados e que seja do interesse dessa instituição."
+        # Map: um resumo por grupo, com no máximo MAX_ANALISES_PARALELAS chamadas simultâneas
+        with ThreadPoolExecutor(max_workers=min(MAX_ANALISES_PARALELAS, len(grupos))) as executor:
+            resumos = list(executor.map(resumir, grupos))
+        tempos["map"] = time.perf_counter() - inicio
 
-        # Enviar para a LLM como uma string
-        resposta = chat.invoke(prompt)  # Passar o prompt diretamente como string
-        return resposta.content if resposta.content.strip() else "Não foi possível gerar uma análise no momento."
+        # Reduce: relatório final a partir dos resumos parciais
+        inicio_reduce = time.perf_counter()
+        prompt = f"A seguir estão resumos parciais das análises para o contexto: {titulo}\n\n"
+        for (nome_grupo, _), resumo in zip(grupos, resumos):
+            prompt += f"Resumo: {nome_grupo}\n{resumo}\n\n"
+        prompt += "Cruze as informações desses resumos em um relatório completo. " + INSTRUCAO_ASSISTENTE
+        todas_tabelas = [tabela for _, tabelas in grupos for tabela in tabelas]
+        chave = chave_resposta(cliente_llm.identificador, f"{titulo} (síntese)", todas_tabelas, PROMPT_VERSAO)
+        relatorio = _consultar(chave, prompt)
+        tempos["reduce"] = time.perf_counter() - inicio_reduce
+        tempos["total"] = time.perf_counter() - inicio
+        return (relatorio if relatorio.strip() else "Não foi possível gerar o relatório no momento."), tempos
     except Exception as e:
-        return f"Erro ao processar a análise: {str(e)}"
+        tempos["total"] = time.perf_counter() - inicio
+        return f"Erro ao processar o relatório: {str(e)}", tempos
+
+def responder_pergunta_stream(pergunta, fatos, metricas=None):
+    """
+    Responde a uma pergunta em texto livre usando apenas os fatos recuperados do
+    dataset, devolvendo a resposta em partes à medida que os tokens chegam.
+
+    Args:
+    - pergunta (str): Pergunta do usuário.
+    - fatos (list of str): Fatos relevantes recuperados para a pergunta.
+    - metricas (dict): Dicionário opcional que recebe os tempos "espera_fila",
+      "primeiro_token" e "total" (em segundos) e a flag "cache".
+
+    Returns:
+    - generator of str: Trechos da resposta gerada pela LLM.
+    """
+    def chave():
+        tabelas = [("Fatos", pd.DataFrame({"Fato": fatos}))]
+        return chave_resposta(cliente_llm.identificador, f"Pergunta: {pergunta}", tabelas, PROMPT_VERSAO)
+
+    def prompt():
+        return (
+            "Responda à pergunta usando somente os fatos a seguir, extraídos dos microdados do ENEM 2023. "
+            "Se os fatos não forem suficientes, diga isso claramente.\n\n"
+            + "\n".join(f"- {fato}" for fato in fatos)
+            + f"\n\nPergunta: {pergunta}\n\n" + INSTRUCAO_ASSISTENTE
+        )
+
+    return _stream_com_cache(chave, prompt, metricas)
+
+def _exibir_stream(gerador, metricas):
+    # Exibe a resposta à medida que os tokens chegam, com os tempos quando não veio do cache
+    st.write_stream(gerador)
+    if "primeiro_token" in metricas and not metricas["cache"]:
+        st.caption(
+            f"Espera na fila {metricas['espera_fila']:.2f} s, "
+            f"primeiro token em {metricas['primeiro_token']:.2f} s, "
+            f"resposta completa em {metricas['total']:.1f} s"
+        )
 
 # Função para criar um botão de análise
 def botao_analise(titulo, tabelas, botao_texto="Analisar com Inteligência Artificial", key=None):
@@ -52,7 +203,8 @@ def botao_analise(titulo, tabelas, botao_texto="Analisar com Inteligência Artif
 
     Args:
     - titulo (str): Título ou contexto da análise.
-    - tabelas (list of tuples): Lista de tabelas no formato [(nome_tabela, df), ...].
+    - tabelas (list of tuples | callable): Lista de tabelas no formato [(nome_tabela, df), ...],
+      ou função que a retorna (calculada apenas quando o botão é clicado).
     - botao_texto (str): Texto do botão a ser exibido.
     - key (str): Chave única para o botão.
 
@@ -60,6 +212,70 @@ def botao_analise(titulo, tabelas, botao_texto="Analisar com Inteligência Artif
     - None
     """
     if st.button(botao_texto, key=key):
-        resultado_analise = analisar_tabelas(titulo, tabelas)
-        st.markdown(f"### Resultado da Análise:\n{resultado_analise}")
+        if callable(tabelas):
+            tabelas = tabelas()
+        st.markdown("### Resultado da Análise:")
+        metricas = {}
+        with span("analisar_tabelas"):
+            _exibir_stream(analisar_tabelas_stream(titulo, tabelas, metricas), metricas)
 
+# Função para criar o botão do relatório completo
+def botao_relatorio(titulo, grupos, botao_texto="Gerar Relatório Completo", key=None):
+    """
+    Exibe um botão e, ao clicar, gera o relatório completo a partir dos grupos de tabelas.
+
+    Args:
+    - titulo (str): Título ou contexto do relatório.
+    - grupos (list of tuples | callable): Grupos no formato [(nome_grupo, tabelas), ...],
+      ou função que os retorna (calculada apenas quando o botão é clicado).
+    - botao_texto (str): Texto do botão a ser exibido.
+    - key (str): Chave única para o botão.
+
+    Returns:
+    - None
+    """
+    if st.button(botao_texto, key=key):
+        if callable(grupos):
+            grupos = grupos()
+        with span("gerar_relatorio"):
+            relatorio, tempos = gerar_relatorio(titulo, grupos)
+        st.markdown(f"### Resultado da Análise:\n{relatorio}")
+        if "reduce" in tempos:
+            st.caption(
+                f"Tempo: análises parciais {tempos['map']:.1f} s ({len(grupos)} grupos, até "
+                f"{MAX_ANALISES_PARALELAS} em paralelo, espera máxima na fila "
+                f"{tempos['espera_fila']:.1f} s), síntese {tempos['reduce']:.1f} s, "
+                f"total {tempos['total']:.1f} s"
+            )
+
+# Função para criar a caixa de perguntas em texto livre
+def caixa_pergunta(buscar_fatos, botao_texto="Perguntar à Inteligência Artificial", key="pergunta"):
+    """
+    Exibe um campo de pergunta e, ao enviar, recupera os fatos relevantes e responde
+    com a LLM usando apenas esses fatos.
+
+    Args:
+    - buscar_fatos (callable): Função que recebe a pergunta e retorna pares (fato, similaridade).
+    - botao_texto (str): Texto do botão a ser exibido.
+    - key (str): Prefixo das chaves dos widgets.
+
+    Returns:
+    - None
+    """
+    pergunta = st.text_input(
+        "Pergunta", key=f"{key}_texto",
+        placeholder="Ex.: Qual a média da rede pública em Pernambuco?",
+    )
+    if st.button(botao_texto, key=f"{key}_botao") and pergunta.strip():
+        with span("buscar_fatos"):
+            fatos = buscar_fatos(pergunta)
+        if not fatos:
+            st.warning("Nenhum fato do dataset relacionado à pergunta foi encontrado.")
+            return
+        st.markdown("### Resposta:")
+        metricas = {}
+        with span("responder_pergunta"):
+            _exibir_stream(responder_pergunta_stream(pergunta, [fato for fato, _ in fatos], metricas), metricas)
+        with st.expander(f"Fatos usados na resposta ({len(fatos)})"):
+            for fato, similaridade in fatos:
+                st.markdown(f"- {fato} *(similaridade {similaridade:.2f})*")
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import tomli
+from backends_llm import criar_backend
+
+CONFIG_PATH = "config.toml"
+
+# Limites compartilhados por todas as sessões do servidor
+MAX_CONCORRENCIA = 4
+MAX_REQUISICOES_POR_MINUTO = 30
+
+
+# Função para carregar a configuração do arquivo config.toml
+def carregar_config(caminho=CONFIG_PATH):
+    with open(caminho, "rb") as f:
+        return tomli.load(f)
+
+
+# Configuração lida uma única vez por processo (obter_config)
+_config = None
+_lock_config = threading.Lock()
+
+
+def obter_config():
+    """
+    Retorna a configuração do config.toml, lida na primeira chamada e reaproveitada
+    pelas seguintes (e por todas as sessões). Se o arquivo não puder ser lido, o erro
+    (OSError) é propagado e a leitura é tentada de novo na chamada seguinte.
+
+    Returns:
+    - dict: Configuração (compartilhada: não deve ser alterada).
+    """
+    global _config
+    if _config is None:
+        with _lock_config:
+            if _config is None:
+                _config = carregar_config()
+    return _config
+
+
+class ClienteLLM:
+    """
+    Cliente da LLM de longa duração: carrega a configuração uma única vez, reutiliza
+    o mesmo backend e o mesmo pool de conexões HTTP e controla a carga com um limite
+    de requisições simultâneas e um limite de requisições por minuto. Requisições
+    acima desses limites aguardam na fila, e o tempo de espera é registrado.
+    """
+
+    def __init__(self, modelo, backend=None, max_concorrencia=MAX_CONCORRENCIA,
+                 max_por_minuto=MAX_REQUISICOES_POR_MINUTO):
+        self.modelo_padrao = modelo
+        self.max_por_minuto = max_por_minuto
+        self._backend = backend  # Se None, é criado a partir do config.toml
+        self._lock = threading.Lock()
+        self._semaforo = threading.BoundedSemaphore(max_concorrencia)
+        self._inicios = deque()  # Instantes das requisições do último minuto
+        self.contadores = {"requisicoes": 0, "em_fila": 0, "espera_total": 0.0, "espera_max": 0.0}
+
+    def _obter_backend(self):
+        # Criado na primeira requisição e reaproveitado pelas seguintes
+        with self._lock:
+            if self._backend is None:
+                self._backend = criar_backend(obter_config(), self.modelo_padrao)
+            return self._backend
+
+    @property
+    def identificador(self):
+        """
+        Backend e modelo efetivamente usados (fazem parte da chave do cache de respostas).
+        """
+        return self._obter_backend().identificador
+
+    def _reservar_envio(self):
+        # Janela deslizante de 60 s: registra o envio se há vaga e retorna 0, ou retorna o
+        # tempo até a próxima vaga
+        with self._lock:
+            agora = time.monotonic()
+            while self._inicios and agora - self._inicios[0] >= 60:
+                self._inicios.popleft()
+            if len(self._inicios) < self.max_por_minuto:
+                self._inicios.append(agora)
+                return 0.0
+            return 60 - (agora - self._inicios[0])
+
+    @contextmanager
+    def _requisicao(self, metricas):
+        inicio = time.perf_counter()
+        with self._lock:
+            self.contadores["em_fila"] += 1
+        try:
+            # O envio só entra na janela por minuto depois de obtida a vaga de concorrência,
+            # no instante em que a requisição sai; com a janela cheia, a vaga é devolvida
+            # durante a espera, para não ficar presa sem requisição em andamento
+            while True:
+                self._semaforo.acquire()
+                espera_taxa = self._reservar_envio()
+                if not espera_taxa:
+                    break
+                self._semaforo.release()
+                time.sleep(espera_taxa)
+        finally:
+            with self._lock:
+                self.contadores["em_fila"] -= 1
+        try:
+            espera = time.perf_counter() - inicio
+            with self._lock:
+                self.contadores["requisicoes"] += 1
+                self.contadores["espera_total"] += espera
+                self.contadores["espera_max"] = max(self.contadores["espera_max"], espera)
+            if metricas is not None:
+                metricas["espera_fila"] = espera
+            yield self._obter_backend()
+        finally:
+            self._semaforo.release()
+
+    def invocar(self, prompt, metricas=None):
+        """
+        Envia o prompt e retorna o texto completo da resposta.
+
+        Args:
+        - prompt (str): Prompt enviado à LLM.
+        - metricas (dict): Dicionário opcional que recebe "espera_fila" (em segundos).
+
+        Returns:
+        - str: Conteúdo da resposta.
+        """
+        with self._requisicao(metricas) as backend:
+            return backend.invocar(prompt)
+
+    def stream(self, prompt, metricas=None):
+        """
+        Envia o prompt e devolve os trechos da resposta à medida que chegam. A vaga de
+        concorrência fica ocupada até o fim da resposta.
+
+        Args:
+        - prompt (str): Prompt enviado à LLM.
+        - metricas (dict): Dicionário opcional que recebe "espera_fila" (em segundos).
+
+        Returns:
+        - generator of str: Trechos da resposta.
+        """
+        with self._requisicao(metricas) as backend:
+            yield from backend.stream(prompt)
+
+    def estatisticas(self):
+        """
+        Retorna o número de requisições, as que aguardam na fila e os tempos de espera
+        (total, máximo e médio) em segundos.
+        """
+        with self._lock:
+            contadores = dict(self.contadores)
+        n = contadores["requisicoes"]
+        contadores["espera_media"] = contadores["espera_total"] / n if n else 0.0
+        return contadores
@@ -0,0 +1,115 @@
+import pandas as pd
+from filtros import DIMENSOES_FILTRO, COLUNAS_NOTAS, notas_validas
+
+# Dimensões do sidebar que formam as células do cubo
+DIMENSOES_CUBO = DIMENSOES_FILTRO + ["NOTAS_VALIDAS"]
+
+# Notas das provas e a média simples derivada delas
+MEDIDAS = COLUNAS_NOTAS + ["MEDIA_SIMPLES"]
+
+
+def construir_cubo(data):
+    """
+    Materializa o cubo de agregação a partir dos microdados.
+
+    Cada célula corresponde a uma combinação das dimensões do sidebar e guarda a
+    quantidade de alunos e, para cada medida, a quantidade de notas não nulas, a
+    soma e a soma dos quadrados. Qualquer contagem ou média filtrada pode ser
+    respondida somando células, sem voltar aos microdados.
+
+    Args:
+    - data (pd.DataFrame): Microdados do ENEM.
+
+    Returns:
+    - pd.DataFrame: Cubo com uma linha por célula não vazia.
+    """
+    notas = data[COLUNAS_NOTAS].astype("float64")  # Somas acumuladas em precisão dupla
+    base = data[DIMENSOES_CUBO[:-1]].copy()
+    # Reaproveita as colunas derivadas na carga, quando presentes
+    base["NOTAS_VALIDAS"] = data["NOTAS_VALIDAS"] if "NOTAS_VALIDAS" in data else notas_validas(data)
+    base["MEDIA_SIMPLES"] = data["MEDIA_SIMPLES"].astype("float64") if "MEDIA_SIMPLES" in data else notas.mean(axis=1)
+    for coluna in COLUNAS_NOTAS:
+        base[coluna] = notas[coluna]
+
+    agregacoes = {"QTD": ("NOTAS_VALIDAS", "size")}
+    for medida in MEDIDAS:
+        base[f"{medida}_Q"] = base[medida] ** 2
+        agregacoes[f"{medida}_N"] = (medida, "count")
+        agregacoes[f"{medida}_SOMA"] = (medida, "sum")
+        agregacoes[f"{medida}_SOMA_Q"] = (f"{medida}_Q", "sum")
+
+    cubo = base.groupby(DIMENSOES_CUBO, dropna=False, observed=True).agg(**agregacoes)
+    return cubo.reset_index()
+
+
+def combinar_cubos(cubos):
+    """
+    Junta cubos construídos sobre partes disjuntas dos microdados (por exemplo, uma
+    partição por UF). Como todas as colunas são contagens e somas, as células
+    repetidas entre as partes são somadas sem perda.
+
+    Args:
+    - cubos (iterable of pd.DataFrame): Cubos gerados por construir_cubo.
+
+    Returns:
+    - pd.DataFrame: Cubo único, com as dimensões de texto como categóricos.
+    """
+    cubo = pd.concat(list(cubos), ignore_index=True)
+    cubo = cubo.groupby(DIMENSOES_CUBO, dropna=False, observed=True, sort=False).sum().reset_index()
+    # Categóricos com categorias diferentes em cada parte viram object no concat
+    for dimensao in DIMENSOES_CUBO:
+        if cubo[dimensao].dtype == object:
+            cubo[dimensao] = cubo[dimensao].astype("category")
+    return cubo
+
+
+def _rotular(agregado, rotulos, rotulo_nulo):
+    # Troca os códigos pelas descrições, descartando códigos sem descrição (como o .map original)
+    agregado.index = pd.Index(agregado.index.astype(object), name=agregado.index.name)
+    if rotulo_nulo is not None:
+        agregado.index = agregado.index.fillna(rotulo_nulo)
+    if rotulos is not None:
+        validos = list(rotulos) + ([rotulo_nulo] if rotulo_nulo is not None else [])
+        agregado = agregado[agregado.index.isin(validos)].rename(index=rotulos)
+    return agregado
+
+
+def contar_por(cubo, dimensao, rotulos=None, rotulo_nulo=None):
+    """
+    Conta os alunos por valor de uma dimensão, em ordem decrescente (como value_counts).
+
+    Args:
+    - cubo (pd.DataFrame): Células do cubo (filtradas ou não).
+    - dimensao (str): Coluna do cubo usada no agrupamento.
+    - rotulos (dict): Mapeamento opcional de código para descrição.
+    - rotulo_nulo (str): Se informado, mantém os nulos com este rótulo.
+
+    Returns:
+    - pd.Series: Quantidade de alunos por valor.
+    """
+    contagem = cubo.groupby(dimensao, dropna=rotulo_nulo is None, observed=True)["QTD"].sum()
+    contagem = _rotular(contagem, rotulos, rotulo_nulo)
+    return contagem[contagem > 0].sort_values(ascending=False)
+
+
+def medias_por(cubo, dimensao, medidas=MEDIDAS, rotulos=None):
+    """
+    Calcula a média de cada medida por valor de uma dimensão (nulos descartados, como no groupby).
+
+    Args:
+    - cubo (pd.DataFrame): Células do cubo (filtradas ou não).
+    - dimensao (str): Coluna do cubo usada no agrupamento.
+    - medidas (list): Medidas cuja média será calculada.
+    - rotulos (dict): Mapeamento opcional de código para descrição.
+
+    Returns:
+    - pd.DataFrame: Médias indexadas pelo valor da dimensão.
+    """
+    colunas = [f"{m}_SOMA" for m in medidas] + [f"{m}_N" for m in medidas]
+    somas = cubo.groupby(dimensao, observed=True)[colunas + ["QTD"]].sum()
+    somas = somas[somas["QTD"] > 0]
+    medias = pd.DataFrame(
+        {m: somas[f"{m}_SOMA"] / somas[f"{m}_N"].where(somas[f"{m}_N"] > 0) for m in medidas},
+        index=somas.index,
+    )
+    return _rotular(medias, rotulos, None)
@@ -1,531 +1,1144 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from chatbot import botao_analise
-from constants import (FAIXA_ETARIA_MAP, SEXO_MAP, REDE_ENSINO_MAP, 
-                       ACESSO_INTERNET_MAP, RENDA_FAMILIAR_MAP, 
+from agrupamento import agrupar_por
+from amostra import carregar_amostra, intervalos_por, tamanho_amostra
+from cache_resultados import cache_resultados
+from chatbot import botao_analise, botao_relatorio, caixa_pergunta
+from cliente_llm import obter_config
+from cubo import MEDIDAS, contar_por, medias_por
+from data_loader import ler_microdados
+from distribuicao import LARGURA_FAIXA, NUM_FAIXAS, histogramas_por, tabela_percentis
+from filtros import FiltroIncremental, canonizar_filtros, selecionar_linhas
+from graficos import grafico_pizza, grafico_contagem, grafico_percentis, exibir_grafico
+from motores_consulta import MotorAmostra, criar_motor
+from rastreamento import contar, rastrear, span
+from recuperacao import buscar_fatos
+from constants import (FAIXA_ETARIA_MAP, SEXO_MAP, REDE_ENSINO_MAP,
+                       ACESSO_INTERNET_MAP, RENDA_FAMILIAR_MAP,
                        ESCOLARIDADE_PAIS_MAP)
 
 # Configurar o layout em wide
 st.set_page_config(page_title="Dashboard ENEM 2023", layout="wide")
 
-def render_dashboard(data, faixa_etaria, sexo, uf, rede, filtro_notas):
-    # Substituir os valores categóricos pelas descrições
-    data["TP_FAIXA_ETARIA_DESC"] = data["TP_FAIXA_ETARIA"].map(FAIXA_ETARIA_MAP)
-    data["TP_SEXO_DESC"] = data["TP_SEXO"].map(SEXO_MAP)
-    data["TP_ESCOLA_DESC"] = data["TP_ESCOLA"].map(REDE_ENSINO_MAP)
-    data["Q025_DESC"] = data["Q025"].map(ACESSO_INTERNET_MAP)
-    data["Q006_DESC"] = data["Q006"].map(RENDA_FAMILIAR_MAP)
-    data["Q001_DESC"] = data["Q001"].map(ESCOLARIDADE_PAIS_MAP)
-    data["Q002_DESC"] = data["Q002"].map(ESCOLARIDADE_PAIS_MAP)
-
-    # Filtrar os dados com base nos filtros do sidebar
-    data_filtered = data[
-        ((faixa_etaria == ["TODOS"]) | (data["TP_FAIXA_ETARIA"].isin(faixa_etaria))) &
-        (data["TP_SEXO"].isin(sexo) if sexo else True) &
-        ((uf == ["TODOS"]) | (data["SG_UF_ESC"].isin(uf))) &  # Verifica se "TODOS" está selecionado no filtro de Estado (UF)
-        (data["TP_ESCOLA"].isin(rede) if rede else True)
-    ]
+faixa_etaria_order = list(FAIXA_ETARIA_MAP.values())
 
-    # Aplicar o filtro de notas válidas
-    if filtro_notas == "Notas Válidas (0-1000)":
-        data_filtered = data_filtered[
-            data_filtered[["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]]
-            .apply(lambda row: row.between(0, 1000).all(), axis=1)
-        ]
+logger = logging.getLogger(__name__)
 
-    st.title("Estatísticas - ENEM 2023")
 
-    # Cálculo das métricas
-    total_alunos = len(data)  # Total geral de alunos sem filtros
-    total_filtrado = len(data_filtered)  # Total de alunos após filtros
-    sexo_m = len(data_filtered[data_filtered["TP_SEXO_DESC"] == "Masculino"])
-    sexo_f = len(data_filtered[data_filtered["TP_SEXO_DESC"] == "Feminino"])
-    rede_predominante = (
-        data_filtered["TP_ESCOLA_DESC"].value_counts().idxmax()
-        if not data_filtered.empty else "N/A"
+# ---------------------------------------------------------------------------
+# Agregações: cada uma recebe as células filtradas do cubo e devolve uma tabela
+# pequena, pronta para os gráficos e para as tabelas enviadas à IA
+# ---------------------------------------------------------------------------
+
+def _tabela_contagem(contagem, rotulo):
+    tabela = contagem.reset_index()
+    tabela.columns = [rotulo, "Quantidade"]
+    tabela["Porcentagem"] = (tabela["Quantidade"] / tabela["Quantidade"].sum() * 100).round(2)
+    return tabela
+
+
+def agregar_total(cubo_filtrado):
+    return int(cubo_filtrado["QTD"].sum())
+
+
+def agregar_sexo(cubo_filtrado):
+    return _tabela_contagem(contar_por(cubo_filtrado, "TP_SEXO", SEXO_MAP), "Sexo")
+
+
+def agregar_faixa_etaria(cubo_filtrado):
+    return _tabela_contagem(contar_por(cubo_filtrado, "TP_FAIXA_ETARIA", FAIXA_ETARIA_MAP), "Faixa Etária")
+
+
+def agregar_rede(cubo_filtrado):
+    return _tabela_contagem(contar_por(cubo_filtrado, "TP_ESCOLA", REDE_ENSINO_MAP), "Rede de Ensino")
+
+
+def agregar_estado(cubo_filtrado):
+    # "Não informado" para valores nulos de UF
+    return _tabela_contagem(contar_por(cubo_filtrado, "SG_UF_ESC", rotulo_nulo="Não informado"), "Estado (UF)")
+
+
+def agregar_media_estado(cubo_filtrado):
+    return medias_por(cubo_filtrado, "SG_UF_ESC", ["MEDIA_SIMPLES"]).reset_index()
+
+
+def agregar_media_faixa(cubo_filtrado):
+    return (
+        medias_por(cubo_filtrado, "TP_FAIXA_ETARIA", ["MEDIA_SIMPLES"], FAIXA_ETARIA_MAP)
+        .rename_axis("TP_FAIXA_ETARIA_DESC")
+        .reset_index()
     )
-    faixa_etaria_comum = (
-        data_filtered["TP_FAIXA_ETARIA_DESC"].value_counts().idxmax()
-        if not data_filtered.empty else "N/A"
+
+
+def agregar_provas_faixa(cubo_filtrado):
+    data_grouped = (
+        medias_por(
+            cubo_filtrado, "TP_FAIXA_ETARIA",
+            ["NU_NOTA_MT", "NU_NOTA_LC", "NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_REDACAO"],
+            FAIXA_ETARIA_MAP,
+        )
+        .rename_axis("TP_FAIXA_ETARIA_DESC")
+        .reset_index()
     )
 
-    # Exibir métricas
-    col1, col2, col3, col4, col5, col6 = st.columns(6)
-    col1.metric("Total de Alunos (Geral)", f"{total_alunos:,}".replace(",", "."))
-    col2.metric("Total Filtrado", f"{total_filtrado:,}".replace(",", "."))
-    col3.metric("Sexo M", f"{sexo_m:,}".replace(",", "."))
-    col4.metric("Sexo F", f"{sexo_f:,}".replace(",", "."))
-    col5.metric("Rede Predominante", rede_predominante)
-    col6.metric("Faixa Etária Comum", faixa_etaria_comum)
+    # Mapeamento de nomes das colunas para os nomes das matérias
+    materia_map = {
+        "NU_NOTA_MT": "Matemática",
+        "NU_NOTA_LC": "Linguagens",
+        "NU_NOTA_CN": "Ciências da Natureza",
+        "NU_NOTA_CH": "Ciências Humanas",
+        "NU_NOTA_REDACAO": "Redação"
+    }
+
+    # Ordenar faixas etárias
+    data_grouped["TP_FAIXA_ETARIA_DESC"] = pd.Categorical(
+        data_grouped["TP_FAIXA_ETARIA_DESC"],
+        categories=faixa_etaria_order,
+        ordered=True
+    )
+    data_grouped = data_grouped.sort_values("TP_FAIXA_ETARIA_DESC")
 
+    # Renomear colunas de acordo com os nomes das matérias
+    return data_grouped.rename(columns=materia_map)
 
 
-    # Linha separadora
-    st.divider()
+def agregar_media_rede(cubo_filtrado):
+    media_rede_data = (
+        medias_por(cubo_filtrado, "TP_ESCOLA", ["MEDIA_SIMPLES"], REDE_ENSINO_MAP)
+        .rename_axis("TP_ESCOLA_DESC")
+        .reset_index()
+    )
+    return media_rede_data.sort_values(by="MEDIA_SIMPLES", ascending=True)
 
-    faixa_etaria_order = list(FAIXA_ETARIA_MAP.values())
 
-    # Criação das Tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Sexo & Idade", "Rede & Região", "Média por UF", "Faixa & Rede", "Comparação", "Relatório"])
+def _media_sexo(cubo_filtrado):
+    return (
+        medias_por(
+            cubo_filtrado, "TP_SEXO",
+            ["NU_NOTA_MT", "NU_NOTA_LC", "NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_REDACAO"],
+            SEXO_MAP,
+        )
+        .rename_axis("TP_SEXO_DESC")
+        .sort_index()
+        .reset_index()
+    )
 
-    # 1. Faixa Etária
-# 1. Faixa Etária
-    with tab1:
-        col1, col2 = st.columns(2)
 
-        # Gráfico 1: Distribuição por Sexo
-        with col1:
-            sexo_fig = px.pie(
-                data_filtered,
-                names="TP_SEXO_DESC",
-                title="Distribuição por Sexo",
-                hole=0.4,
-                color_discrete_sequence=px.colors.sequential.RdBu
-            )
-            sexo_fig.update_layout(
-                font=dict(color="white"),
-            )
-            sexo_fig.update_traces(hovertemplate="<b>Sexo</b>: %{label}<br><b>Porcentagem</b>: %{percent}")
-            st.plotly_chart(sexo_fig, use_container_width=True, key="sexo_fig")
+prova_map = {
+    "NU_NOTA_CN": "Ciências da Natureza",
+    "NU_NOTA_CH": "Ciências Humanas",
+    "NU_NOTA_LC": "Linguagens e Códigos",
+    "NU_NOTA_MT": "Matemática",
+    "NU_NOTA_REDACAO": "Redação"
+}
 
-        # Gráfico 2: Distribuição por Faixa Etária
-        with col2:
-            faixa_fig = px.histogram(
-                data_filtered,
-                x="TP_FAIXA_ETARIA_DESC",
-                title="Distribuição por Faixa Etária",
-                color_discrete_sequence=["#FFA07A"]
-            )
-            faixa_fig.update_layout(
-                xaxis_title="Faixa Etária",
-                yaxis_title="Quantidade",
-                xaxis=dict(categoryorder="array", categoryarray=faixa_etaria_order),
-                font=dict(color="white"),
-            )
-            faixa_fig.update_traces(hovertemplate="<b>Faixa Etária</b>: %{x}<br><b>Quantidade</b>: %{y}")
-            st.plotly_chart(faixa_fig, use_container_width=True, key="faixa_fig")
-
-        # Adicionar tabelas abaixo dos gráficos
-        #st.subheader("Tabela: Distribuição por Sexo")
-        tabela_sexo = data_filtered["TP_SEXO_DESC"].value_counts().reset_index()
-        tabela_sexo.columns = ["Sexo", "Quantidade"]
-        tabela_sexo["Porcentagem"] = (tabela_sexo["Quantidade"] / tabela_sexo["Quantidade"].sum() * 100).round(2)
-        #st.dataframe(tabela_sexo, use_container_width=True)
-
-        #st.subheader("Tabela: Distribuição por Faixa Etária")
-        tabela_faixa_etaria = data_filtered["TP_FAIXA_ETARIA_DESC"].value_counts().reset_index()
-        tabela_faixa_etaria.columns = ["Faixa Etária", "Quantidade"]
-        tabela_faixa_etaria["Porcentagem"] = (tabela_faixa_etaria["Quantidade"] / tabela_faixa_etaria["Quantidade"].sum() * 100).round(2)
-        #st.dataframe(tabela_faixa_etaria, use_container_width=True)
-
-        # Botão de análise
-
-        tabelas = [("Distribuição por Sexo", tabela_sexo), ("Distribuição por Faixa Etária", tabela_faixa_etaria)]
-        botao_analise("Análise de Sexo & Idade", tabelas)
-
-    with tab2:
-        col1, col2 = st.columns(2)
-
-        # Gráfico 1: Distribuição por Rede de Ensino
-        with col1:
-            rede_fig = px.pie(
-                data_filtered,
-                names="TP_ESCOLA_DESC",
-                title="Distribuição por Rede de Ensino",
-                hole=0.4,
-                color_discrete_sequence=px.colors.sequential.Plasma_r  # Paleta vibrante
-            )
-            rede_fig.update_layout(
-                font=dict(color="white"),
-            )
-            rede_fig.update_traces(
-                textinfo="percent+label",
-                hovertemplate="<b>Rede de Ensino</b>: %{label}<br><b>Porcentagem</b>: %{percent}"
-            )
-            st.plotly_chart(rede_fig, use_container_width=True, key="rede_fig")
-
-        # Gráfico 2: Distribuição por Região
-        with col2:
-            # Adicionar uma coluna "Estado" com "Não informado" para valores nulos
-            data_filtered["Estado"] = data_filtered["SG_UF_ESC"].fillna("Não informado")
-
-            # Criar o gráfico
-            regiao_fig = px.histogram(
-                data_filtered,
-                x="Estado",
-                title="Distribuição por Estado (UF)",
-                color_discrete_sequence=["#90ee90"]
-            )
-            regiao_fig.update_layout(
-                font=dict(color="white"),
-                xaxis_title="Estado (UF)",
-                yaxis_title="Quantidade",
-            )
-            regiao_fig.update_traces(
-                hovertemplate="<b>Estado (UF)</b>: %{x}<br><b>Quantidade</b>: %{y}"
-            )
-            st.plotly_chart(regiao_fig, use_container_width=True, key="regiao_fig")
-
-        # Tabela: Distribuição por Rede de Ensino
-        #st.subheader("Tabela: Distribuição por Rede de Ensino")
-        tabela_rede = data_filtered["TP_ESCOLA_DESC"].value_counts().reset_index()
-        tabela_rede.columns = ["Rede de Ensino", "Quantidade"]
-        tabela_rede["Porcentagem"] = (tabela_rede["Quantidade"] / tabela_rede["Quantidade"].sum() * 100).round(2)
-        # Exibe a tabela apenas se você deseja visualizar os dados:
-        #st.dataframe(tabela_rede, use_container_width=True)
-
-        # Tabela: Distribuição por Estado (UF)
-        #st.subheader("Tabela: Distribuição por Estado (UF)")
-        tabela_regiao = data_filtered["Estado"].value_counts().reset_index()
-        tabela_regiao.columns = ["Estado (UF)", "Quantidade"]
-        tabela_regiao["Porcentagem"] = (tabela_regiao["Quantidade"] / tabela_regiao["Quantidade"].sum() * 100).round(2)
-        # Exibe a tabela apenas se você deseja visualizar os dados:
-        #st.dataframe(tabela_regiao, use_container_width=True)
-
-        # Botão de análise
-        tabelas_tab2 = [
-            ("Distribuição por Rede de Ensino", tabela_rede),
-            ("Distribuição por Estado (UF)", tabela_regiao),
-        ]
-        botao_analise("Análise de Rede de ensino e Região", tabelas_tab2, botao_texto="Analisar com Inteligência Artificial", key="botao_tab2")
-
-    with tab3:
-        col1, col2 = st.columns(2)
-
-        # Gráfico 1: Média Simples das Notas por Estado (UF)
-        with col1:
-            data_filtered["MEDIA_SIMPLES"] = data_filtered[["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]].mean(axis=1)
-            media_estado_data = data_filtered.groupby("SG_UF_ESC")["MEDIA_SIMPLES"].mean().reset_index()
-
-            media_estado_fig = px.bar(
-                media_estado_data,
-                x="SG_UF_ESC",
-                y="MEDIA_SIMPLES",
-                title="Média Simples das Notas por Estado (UF)",
-                text="MEDIA_SIMPLES",
-                color_discrete_sequence=["#FFD700"]
-            )
-            media_estado_fig.update_layout(
-                xaxis_title="Estado (UF)",
-                yaxis_title="Média Simples das Notas",
-                font=dict(color="white"),
-            )
-            media_estado_fig.update_traces(
-                texttemplate="%{text:.2f}",
-                textposition="outside",
-                hovertemplate="<b>Estado (UF)</b>: %{x}<br><b>Média Simples</b>: %{y:.2f}"
-            )
-            st.plotly_chart(media_estado_fig, use_container_width=True, key="media_estado_fig")
+# Medidas com distribuição na aba de distribuições (as provas e a média simples)
+medida_map = {**prova_map, "MEDIA_SIMPLES": "Média Simples"}
 
-        # Gráfico 2: Média Simples das Notas por Faixa Etária
-        with col2:
-            media_data = data_filtered.groupby("TP_FAIXA_ETARIA_DESC")["MEDIA_SIMPLES"].mean().reset_index()
 
-            media_fig = px.bar(
-                media_data,
-                x="TP_FAIXA_ETARIA_DESC",
-                y="MEDIA_SIMPLES",
-                title="Média Simples das Notas por Faixa Etária",
-                color="MEDIA_SIMPLES",
-                color_continuous_scale="Blues"
-            )
-            media_fig.update_layout(
-                xaxis_title="Faixa Etária",
-                yaxis_title="Média Simples das Notas",
-                xaxis=dict(categoryorder="array", categoryarray=faixa_etaria_order),
-                font=dict(color="white"),
-                coloraxis_colorbar=dict(
-                    title="Média",
-                    title_side="right"
-                ),
-            )
-            media_fig.update_traces(
-                hovertemplate="<b>Faixa Etária</b>: %{x}<br><b>Média Simples</b>: %{y:.2f}"
-            )
-            st.plotly_chart(media_fig, use_container_width=True, key="media_fig")
-
-        # Tabela: Média Simples das Notas por Estado (UF)
-        #st.subheader("Tabela: Média Simples das Notas por Estado (UF)")
-        tabela_estado = media_estado_data.copy()
-        tabela_estado.columns = ["Estado (UF)", "Média Simples"]
-        #st.dataframe(tabela_estado, use_container_width=True)
-
-        # Tabela: Média Simples das Notas por Faixa Etária
-        #st.subheader("Tabela: Média Simples das Notas por Faixa Etária")
-        tabela_faixa = media_data.copy()
-        tabela_faixa.columns = ["Faixa Etária", "Média Simples"]
-        #st.dataframe(tabela_faixa, use_container_width=True)
-
-        # Botão de análise
-        tabelas_tab3 = [
-            ("Média Simples das Notas por Estado (UF)", tabela_estado),
-            ("Média Simples das Notas por Faixa Etária", tabela_faixa),
-        ]
-        botao_analise("Análise das Médias", tabelas_tab3, botao_texto="Analisar com Inteligência Artificial", key="botao_tab3")
-
-    with tab4:
-        # Distribuição por Rede de Ensino
-        col1, col2 = st.columns(2)
-
-        # Gráfico 1: Desempenho Geral por Faixa Etária
-        with col1:
-            data_grouped = data_filtered.groupby("TP_FAIXA_ETARIA_DESC")[
-                ["NU_NOTA_MT", "NU_NOTA_LC", "NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_REDACAO"]
-            ].mean().reset_index()
-
-            # Mapeamento de nomes das colunas para os nomes das matérias
-            materia_map = {
-                "NU_NOTA_MT": "Matemática",
-                "NU_NOTA_LC": "Linguagens",
-                "NU_NOTA_CN": "Ciências da Natureza",
-                "NU_NOTA_CH": "Ciências Humanas",
-                "NU_NOTA_REDACAO": "Redação"
-            }
-
-            # Ordenar faixas etárias
-            faixa_etaria_order = list(FAIXA_ETARIA_MAP.values())
-            data_grouped["TP_FAIXA_ETARIA_DESC"] = pd.Categorical(
-                data_grouped["TP_FAIXA_ETARIA_DESC"],
-                categories=faixa_etaria_order,
-                ordered=True
-            )
-            data_grouped = data_grouped.sort_values("TP_FAIXA_ETARIA_DESC")
-
-            # Renomear colunas de acordo com os nomes das matérias
-            data_grouped_renamed = data_grouped.rename(columns=materia_map)
-
-            # Verificar o número de faixas etárias para escolher o tipo de gráfico
-            if len(data_grouped) == 1:
-                provas_fig = px.bar(
-                    data_grouped_renamed.melt(id_vars=["TP_FAIXA_ETARIA_DESC"],
-                                            var_name="Prova",
-                                            value_name="Média"),
-                    x="Prova",
-                    y="Média",
-                    title=f"Desempenho Geral na Faixa Etária: {data_grouped['TP_FAIXA_ETARIA_DESC'].iloc[0]}",
-                    color_discrete_sequence=["#FFA07A"]
-                )
+def agregar_media_sexo(cubo_filtrado):
+    media_geral_data = _media_sexo(cubo_filtrado).melt(id_vars=["TP_SEXO_DESC"], var_name="Prova", value_name="Média")
 
-                # Gerar tabela para este tipo de gráfico
-                tabela_provas = data_grouped_renamed.melt(id_vars=["TP_FAIXA_ETARIA_DESC"],
-                                                        var_name="Prova",
-                                                        value_name="Média")
-            else:
-                provas_fig = px.line(
-                    data_grouped_renamed,
-                    x="TP_FAIXA_ETARIA_DESC",
-                    y=list(materia_map.values()),
-                    title="Desempenho Geral nas Provas por Faixa Etária",
-                    color_discrete_sequence=px.colors.sequential.Rainbow
+    # Substituir os códigos das provas pelos nomes
+    media_geral_data["Prova"] = media_geral_data["Prova"].map(prova_map)
+    return media_geral_data
+
+
+def agregar_diferenca_sexo(cubo_filtrado):
+    # Só existe quando os dois sexos estão presentes no filtro
+    media_sexo = _media_sexo(cubo_filtrado)
+    if not set(media_sexo["TP_SEXO_DESC"]) >= {"Masculino", "Feminino"}:
+        return None
+    diff_data = (
+        media_sexo
+        .melt(id_vars=["TP_SEXO_DESC"], var_name="Prova", value_name="Média")
+        .pivot(index="Prova", columns="TP_SEXO_DESC", values="Média")
+    )
+    diff_data.index = diff_data.index.map(prova_map)
+    diff_data["Diferença"] = (diff_data["Masculino"] - diff_data["Feminino"]).round(2)  # Arredondar para 2 casas decimais
+    return diff_data.reset_index()
+
+
+# Distribuições: calculadas pelos histogramas das células do cubo selecionadas pelos
+# filtros (ids), e não pelas células devolvidas pelo motor de consultas
+
+def agregar_percentis_estado(dataset, ids):
+    valores, contagens = histogramas_por(dataset.histogramas, dataset.indices_cubo, ids, "SG_UF_ESC")
+    return tabela_percentis(valores, contagens, rotulo_nulo="Não informado")
+
+
+def agregar_percentis_rede(dataset, ids):
+    valores, contagens = histogramas_por(dataset.histogramas, dataset.indices_cubo, ids, "TP_ESCOLA")
+    return tabela_percentis(valores, contagens, REDE_ENSINO_MAP)
+
+
+def agregar_percentis_sexo(dataset, ids):
+    valores, contagens = histogramas_por(dataset.histogramas, dataset.indices_cubo, ids, "TP_SEXO")
+    return tabela_percentis(valores, contagens, SEXO_MAP)
+
+
+def agregar_percentis_faixa(dataset, ids):
+    valores, contagens = histogramas_por(dataset.histogramas, dataset.indices_cubo, ids, "TP_FAIXA_ETARIA")
+    return tabela_percentis(valores, contagens, FAIXA_ETARIA_MAP)
+
+
+def agregar_histograma_notas(dataset, ids):
+    # Uma linha por faixa de notas e uma coluna de quantidade por medida
+    _, contagens = histogramas_por(dataset.histogramas, dataset.indices_cubo, ids)
+    histograma = pd.DataFrame(contagens[0].T, columns=MEDIDAS)
+    histograma.insert(0, "Faixa", [f"{i * LARGURA_FAIXA}-{(i + 1) * LARGURA_FAIXA}" for i in range(NUM_FAIXAS)])
+    return histograma
+
+
+# Recortes socioeconômicos: coluna de descrição, título e ordem das categorias
+RECORTES_SOCIOECONOMICOS = {
+    "Q006_DESC": ("Renda Familiar", list(RENDA_FAMILIAR_MAP.values())),
+    "Q001_DESC": ("Escolaridade do Pai", list(ESCOLARIDADE_PAIS_MAP.values())),
+    "Q002_DESC": ("Escolaridade da Mãe", list(ESCOLARIDADE_PAIS_MAP.values())),
+    "Q025_DESC": ("Acesso à Internet", list(ACESSO_INTERNET_MAP.values())),
+}
+
+
+def agregar_socioeconomico(microdados):
+    # Os recortes não estão no cubo: cada um é agrupado sobre os microdados filtrados,
+    # por códigos inteiros (bincount), junto com rede e UF; os gráficos somam os grupos
+    partes = []
+    for coluna in RECORTES_SOCIOECONOMICOS:
+        grupos = agrupar_por(microdados, [coluna, "TP_ESCOLA_DESC", "SG_UF_ESC"], MEDIDAS, nulos=True)
+        partes.append(grupos.rename(columns={coluna: "Categoria"}).assign(Recorte=coluna))
+    return pd.concat(partes, ignore_index=True)
+
+
+def _socioeconomico_por(tabela, recorte, cruzamento, medida):
+    # Quantidade e média da medida por categoria do recorte (e do cruzamento, se houver)
+    chaves = ["Categoria"] + ([cruzamento] if cruzamento else [])
+    somas = (
+        tabela[tabela["Recorte"] == recorte]
+        .groupby(chaves, observed=True)[["QTD", f"{medida}_N", f"{medida}_SOMA"]]
+        .sum()
+    )
+    somas["Média"] = somas[f"{medida}_SOMA"] / somas[f"{medida}_N"].where(somas[f"{medida}_N"] > 0)
+    return somas.reset_index()
+
+
+AGREGACOES = {
+    "total": agregar_total,
+    "sexo": agregar_sexo,
+    "faixa_etaria": agregar_faixa_etaria,
+    "rede": agregar_rede,
+    "estado": agregar_estado,
+    "media_estado": agregar_media_estado,
+    "media_faixa": agregar_media_faixa,
+    "provas_faixa": agregar_provas_faixa,
+    "media_rede": agregar_media_rede,
+    "media_sexo": agregar_media_sexo,
+    "diferenca_sexo": agregar_diferenca_sexo,
+}
+
+AGREGACOES_DISTRIBUICAO = {
+    "percentis_estado": agregar_percentis_estado,
+    "percentis_rede": agregar_percentis_rede,
+    "percentis_sexo": agregar_percentis_sexo,
+    "percentis_faixa": agregar_percentis_faixa,
+    "histograma_notas": agregar_histograma_notas,
+}
+
+AGREGACOES_MICRODADOS = {
+    "socioeconomico": agregar_socioeconomico,
+}
+
+# Dimensões de que cada agregação precisa: o motor DuckDB agrupa só por elas
+DIMENSOES_AGREGACOES = {
+    "total": [],
+    "sexo": ["TP_SEXO"],
+    "faixa_etaria": ["TP_FAIXA_ETARIA"],
+    "rede": ["TP_ESCOLA"],
+    "estado": ["SG_UF_ESC"],
+    "media_estado": ["SG_UF_ESC"],
+    "media_faixa": ["TP_FAIXA_ETARIA"],
+    "provas_faixa": ["TP_FAIXA_ETARIA"],
+    "media_rede": ["TP_ESCOLA"],
+    "media_sexo": ["TP_SEXO"],
+    "diferenca_sexo": ["TP_SEXO"],
+}
+
+# Agregações usadas nas métricas do cabeçalho (calculadas em todas as abas)
+AGREGACOES_METRICAS = ["sexo", "rede", "faixa_etaria", "total"]
+
+# Agregações exatas com qualquer motor (não usam o cubo da amostra): ficam fora da
+# prévia e são guardadas no cache sem o nome do motor
+AGREGACOES_EXATAS = set(AGREGACOES_DISTRIBUICAO) | set(AGREGACOES_MICRODADOS)
+
+# Intervalos de confiança exibidos na prévia pela amostra: argumentos de intervalos_por
+# para cada agregação (proporções nas roscas, quantidades e médias nas barras)
+INTERVALOS_AGREGACOES = {
+    "sexo": {"dimensao": "TP_SEXO", "proporcao": True, "rotulos": SEXO_MAP},
+    "faixa_etaria": {"dimensao": "TP_FAIXA_ETARIA", "rotulos": FAIXA_ETARIA_MAP},
+    "rede": {"dimensao": "TP_ESCOLA", "proporcao": True, "rotulos": REDE_ENSINO_MAP},
+    "estado": {"dimensao": "SG_UF_ESC", "rotulo_nulo": "Não informado"},
+    "media_estado": {"dimensao": "SG_UF_ESC", "medida": "MEDIA_SIMPLES"},
+    "media_faixa": {"dimensao": "TP_FAIXA_ETARIA", "medida": "MEDIA_SIMPLES", "rotulos": FAIXA_ETARIA_MAP},
+    "media_rede": {"dimensao": "TP_ESCOLA", "medida": "MEDIA_SIMPLES", "rotulos": REDE_ENSINO_MAP},
+}
+
+
+@st.cache_resource(show_spinner=False)
+def obter_motor(caminho, _dataset):
+    """
+    Cria uma única vez, por arquivo de origem, o motor de consultas configurado
+    (pandas ou DuckDB), compartilhado entre as sessões.
+    """
+    return criar_motor(_dataset)
+
+
+@st.cache_resource(show_spinner=False)
+def obter_amostra(caminho, _dataset):
+    """
+    Abre uma única vez, por arquivo de origem, o motor da prévia sobre o cubo da
+    amostra estratificada, compartilhado entre as sessões.
+    """
+    return MotorAmostra(carregar_amostra(_dataset))
+
+
+def _filtro_da_sessao(dataset):
+    # Um filtro incremental por sessão: entre reruns, só a dimensão alterada no sidebar
+    # tem a máscara recalculada
+    filtro = st.session_state.get("filtro_incremental")
+    if filtro is None or filtro.indices is not dataset.indices_cubo:
+        filtro = st.session_state["filtro_incremental"] = FiltroIncremental(dataset.indices_cubo)
+    return filtro
+
+
+class ConsultasRerun:
+    """
+    Agregações e figuras de um rerun, calculadas sob demanda. Cada uma é procurada
+    primeiro na memória do rerun e depois no cache compartilhado entre as sessões,
+    cuja chave usa os filtros canônicos: seleções equivalentes no sidebar (em outra
+    ordem, "TODOS" ou todos os valores marcados) reaproveitam o mesmo resultado.
+
+    Chamar a instância com o nome de uma agregação retorna o resultado dela. Com o motor
+    da amostra, os resultados são estimativas e intervalo() dá a margem de cada uma.
+    """
+
+    def __init__(self, dataset, filtros, filtro_sessao=None, motor=None):
+        self.dataset = dataset
+        self.filtros = filtros
+        self.filtro_sessao = filtro_sessao
+        self.motor = motor if motor is not None else obter_motor(dataset.caminho, dataset)
+        self.chave_exata = (dataset.caminho, canonizar_filtros(dataset.indices_cubo, *filtros))
+        self.chave_filtros = (self.motor.nome,) + self.chave_exata
+        self._resultados = {}
+
+    def _chave(self, nome):
+        # As agregações exatas são as mesmas com qualquer motor: uma única entrada no cache
+        return ("agregacao", nome) + (self.chave_exata if nome in AGREGACOES_EXATAS else self.chave_filtros)
+
+    def __call__(self, nome):
+        if nome not in self._resultados:
+            contar("agregacoes.pedidas")
+            with span(f"agregacao.{nome}"):
+                self._resultados[nome] = cache_resultados.obter_ou_calcular(
+                    self._chave(nome), lambda: self._calcular(nome)
                 )
+        return self._resultados[nome]
+
+    def _calcular(self, nome):
+        contar("agregacoes.calculadas")  # Só executa quando o resultado não está no cache
+        if nome in AGREGACOES_DISTRIBUICAO:
+            # Somam os histogramas das células do cubo selecionadas, qualquer que seja o motor
+            if self.filtro_sessao is not None:
+                ids = self.filtro_sessao.selecionar(*self.filtros)
+            else:
+                ids = selecionar_linhas(self.dataset.indices_cubo, *self.filtros)
+            return AGREGACOES_DISTRIBUICAO[nome](self.dataset, ids)
+        if nome in AGREGACOES_MICRODADOS:
+            # Agrupam as linhas dos microdados selecionadas pelos filtros
+            return AGREGACOES_MICRODADOS[nome](ler_microdados(self.dataset, *self.filtros))
+        celulas = self.motor.agrupar(self.filtros, DIMENSOES_AGREGACOES[nome], self.filtro_sessao)
+        return AGREGACOES[nome](celulas)
+
+    def grafico(self, key, construir):
+        """
+        Retorna a figura do gráfico para os filtros do rerun, construída apenas se ainda
+        não estiver no cache compartilhado.
+
+        Args:
+        - key (str): Chave do gráfico (a mesma passada para exibir_grafico).
+        - construir (callable): Função sem argumentos que cria a figura.
+
+        Returns:
+        - go.Figure: Figura do gráfico (compartilhada: não deve ser alterada).
+        """
+        contar("graficos.pedidos")
+
+        def calcular():
+            contar("graficos.construidos")
+            return construir()
+
+        return cache_resultados.obter_ou_calcular(("grafico", key) + self.chave_filtros, calcular)
+
+    def em_cache(self, nomes):
+        """
+        Indica se todas as agregações pedidas já estão no cache compartilhado.
+        """
+        return all(cache_resultados.contem(self._chave(nome)) for nome in nomes)
+
+    def intervalo(self, nome):
+        """
+        Retorna a meia-largura do intervalo de confiança de 95% de cada linha da tabela
+        da agregação, quando os resultados são estimados pela amostra.
+
+        Args:
+        - nome (str): Agregação (uma das chaves de INTERVALOS_AGREGACOES).
+
+        Returns:
+        - np.ndarray | None: Intervalos na ordem das linhas da tabela (em pontos
+          percentuais nas proporções), ou None quando os resultados são exatos.
+        """
+        if self.motor.nome != MotorAmostra.nome:
+            return None
+        parametros = INTERVALOS_AGREGACOES[nome]
+
+        def calcular():
+            celulas = self.motor.agrupar(self.filtros, [parametros["dimensao"]])
+            intervalos = intervalos_por(celulas, **parametros)
+            return intervalos * 100 if parametros.get("proporcao") else intervalos
+
+        intervalos = cache_resultados.obter_ou_calcular(("intervalo", nome) + self.chave_filtros, calcular)
+        # A primeira coluna da tabela é a das categorias (valores ou rótulos da dimensão)
+        return intervalos.reindex(self(nome).iloc[:, 0]).to_numpy()
+
+
+# ---------------------------------------------------------------------------
+# Prévia pela amostra: com PREVIA_AMOSTRA = true no config.toml, enquanto as agregações
+# exatas das métricas e da aba não estão no cache, a aba é exibida com as estimativas
+# da amostra e as exatas são calculadas em segundo plano; ao terminarem, o app é
+# executado de novo e os valores exatos substituem a prévia
+# ---------------------------------------------------------------------------
+
+# Intervalo, em segundos, entre as verificações do cálculo exato em andamento
+INTERVALO_REFINAMENTO = 0.5
+
+# Cálculos exatos em andamento, compartilhados entre as sessões: sessões com os mesmos
+# filtros e a mesma aba aguardam o mesmo cálculo
+_executor_refinamento = ThreadPoolExecutor(max_workers=2, thread_name_prefix="refinamento")
+_refinamentos = {}
+_lock_refinamentos = threading.Lock()
+
+
+def previa_ativada():
+    """
+    Indica se a prévia pela amostra está ativada (PREVIA_AMOSTRA no config.toml, lido
+    uma única vez por processo).
+    """
+    try:
+        return bool(obter_config().get("PREVIA_AMOSTRA", False))
+    except OSError:
+        return False
+
+
+def _calcular_exatas(consultas, nomes, chave):
+    # Os resultados ficam no cache compartilhado. O cálculo sai do registro mesmo se
+    # falhar (o erro é registrado no log): um rerun seguinte pode tentar de novo.
+    try:
+        for nome in nomes:
+            consultas(nome)
+    except Exception:
+        logger.exception("Falha no cálculo exato em segundo plano (%s)", ", ".join(nomes))
+        raise
+    finally:
+        with _lock_refinamentos:
+            _refinamentos.pop(chave, None)
+
+
+def refinar_em_segundo_plano(consultas, nomes):
+    """
+    Inicia, ou reaproveita se já estiver em andamento, o cálculo exato das agregações
+    em segundo plano.
+
+    Args:
+    - consultas (ConsultasRerun): Consultas exatas, sem o filtro da sessão (que não pode
+      ser usado fora da thread da sessão).
+    - nomes (list of str): Agregações a calcular.
+
+    Returns:
+    - Future | None: Cálculo em andamento, ou None se ele já terminou.
+    """
+    chave = (tuple(nomes),) + consultas.chave_filtros
+    with _lock_refinamentos:
+        futuro = _refinamentos.get(chave)
+        if futuro is None:
+            futuro = _executor_refinamento.submit(_calcular_exatas, consultas, nomes, chave)
+            _refinamentos[chave] = futuro
+    return None if futuro.done() else futuro
+
+
+@st.fragment(run_every=INTERVALO_REFINAMENTO)
+def _aguardar_refinamento(futuro):
+    # Executa o app de novo quando o cálculo exato termina, trocando a prévia pelos
+    # valores exatos (apenas este fragmento é executado enquanto o cálculo não termina)
+    if futuro.done():
+        st.rerun()
+
+
+# ---------------------------------------------------------------------------
+# Tabelas enviadas à IA por aba
+# ---------------------------------------------------------------------------
+
+def tabelas_sexo_idade(obter):
+    return [
+        ("Distribuição por Sexo", obter("sexo")),
+        ("Distribuição por Faixa Etária", obter("faixa_etaria")),
+    ]
 
-                # Gerar tabela para este tipo de gráfico
-                tabela_provas = data_grouped_renamed.copy()
 
-            provas_fig.update_layout(
-                font=dict(color="white"),
-                xaxis_title="Faixa Etária",
-                yaxis_title="Média das Notas",
-                xaxis=dict(categoryorder="array", categoryarray=faixa_etaria_order),
-                legend_title="Matérias"
-            )
-            provas_fig.update_traces(
-                hovertemplate="<b>Faixa Etária</b>: %{x}<br><b>Média</b>: %{y:.2f}"
-            )
+def tabelas_rede_regiao(obter):
+    return [
+        ("Distribuição por Rede de Ensino", obter("rede")),
+        ("Distribuição por Estado (UF)", obter("estado")),
+    ]
 
-            st.plotly_chart(provas_fig, use_container_width=True, key="provas_fig")
 
-        # Gráfico 2: Média Simples das Notas por Rede de Ensino
-        with col2:
-            data_filtered["MEDIA_SIMPLES"] = data_filtered[["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]].mean(axis=1)
-            media_rede_data = data_filtered.groupby("TP_ESCOLA_DESC")["MEDIA_SIMPLES"].mean().reset_index()
+def tabelas_medias(obter):
+    # Tabela: Média Simples das Notas por Estado (UF)
+    tabela_estado = obter("media_estado").copy()
+    tabela_estado.columns = ["Estado (UF)", "Média Simples"]
 
-            media_rede_data = media_rede_data.sort_values(by="MEDIA_SIMPLES", ascending=True)
+    # Tabela: Média Simples das Notas por Faixa Etária
+    tabela_faixa = obter("media_faixa").copy()
+    tabela_faixa.columns = ["Faixa Etária", "Média Simples"]
 
-            media_rede_fig = px.bar(
-                media_rede_data,
-                y="TP_ESCOLA_DESC",
-                x="MEDIA_SIMPLES",
-                title="Média Simples das Notas por Rede de Ensino",
-                text="MEDIA_SIMPLES",
-                labels={"TP_ESCOLA_DESC": "Rede de Ensino", "MEDIA_SIMPLES": "Média Simples"},
-                color="TP_ESCOLA_DESC",
-                color_discrete_sequence=px.colors.sequential.Teal
-            )
-            media_rede_fig.update_layout(
-                yaxis_title="Rede de Ensino",
-                xaxis_title="Média Simples das Notas",
-                font=dict(color="white"),
-                title=dict(x=0.5)
+    return [
+        ("Média Simples das Notas por Estado (UF)", tabela_estado),
+        ("Média Simples das Notas por Faixa Etária", tabela_faixa),
+    ]
+
+
+def tabelas_faixa_rede(obter):
+    # Tabela: Desempenho Geral por Faixa Etária (formato longo quando há uma só faixa)
+    data_grouped_renamed = obter("provas_faixa")
+    if len(data_grouped_renamed) == 1:
+        tabela_provas = data_grouped_renamed.melt(id_vars=["TP_FAIXA_ETARIA_DESC"],
+                                                var_name="Prova",
+                                                value_name="Média")
+    else:
+        tabela_provas = data_grouped_renamed.copy()
+
+    # Tabela: Média Simples das Notas por Rede de Ensino
+    tabela_rede = obter("media_rede").copy()
+    tabela_rede.columns = ["Rede de Ensino", "Média Simples"]
+
+    return [
+        ("Desempenho Geral por Faixa Etária", tabela_provas),
+        ("Média Simples das Notas por Rede de Ensino", tabela_rede),
+    ]
+
+
+def tabelas_comparacao(obter):
+    # Tabela: Média Geral das Provas por Sexo
+    tabela_media_geral = obter("media_sexo").copy()
+    tabela_media_geral.columns = ["Sexo", "Prova", "Média"]
+    tabelas = [("Média Geral das Provas por Sexo", tabela_media_geral)]
+
+    # Tabela: Diferença de Médias das Provas por Sexo
+    diff_data = obter("diferenca_sexo")
+    if diff_data is not None:
+        tabela_diferenca = diff_data.copy()
+
+        # Ajustar os nomes das colunas invertidas
+        tabela_diferenca.columns = ["Prova", "Média Feminino", "Média Masculino", "Diferença"]
+        tabelas.append(("Diferença de Médias das Provas por Sexo", tabela_diferenca))
+    return tabelas
+
+
+def tabelas_distribuicao(obter):
+    # Tabelas: percentis das notas por Estado (UF) e por Rede de Ensino
+    tabelas = []
+    for titulo, nome, rotulo in [
+        ("Percentis das Notas por Estado (UF)", "percentis_estado", "Estado (UF)"),
+        ("Percentis das Notas por Rede de Ensino", "percentis_rede", "Rede de Ensino"),
+    ]:
+        tabela = obter(nome).copy()
+        tabela["Medida"] = tabela["Medida"].map(medida_map)
+        tabela.columns = [rotulo, "Prova", "Notas", "P10", "Mediana", "P90"]
+        tabelas.append((titulo, tabela))
+    return tabelas
+
+
+def tabelas_socioeconomico(obter):
+    # Tabelas: Quantidade e Média Simples por categoria de cada recorte
+    tabelas = []
+    for recorte, (titulo, ordem) in RECORTES_SOCIOECONOMICOS.items():
+        tabela = _socioeconomico_por(obter("socioeconomico"), recorte, None, "MEDIA_SIMPLES")
+        tabela = tabela.set_index("Categoria").reindex([c for c in ordem if c in set(tabela["Categoria"])])
+        tabela = tabela.reset_index()[["Categoria", "QTD", "Média"]].round(2)
+        tabela.columns = [titulo, "Quantidade", "Média Simples"]
+        tabelas.append((f"Média Simples das Notas por {titulo}", tabela))
+    return tabelas
+
+
+def tabelas_relatorio(obter):
+    # Reúne as tabelas das abas anteriores, agrupadas por aba, a partir das mesmas agregações
+    return [
+        (nome, aba["tabelas"](obter))
+        for nome, aba in ABAS.items()
+        if aba["tabelas"] not in (None, tabelas_relatorio)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Conteúdo das abas
+# ---------------------------------------------------------------------------
+
+def render_sexo_idade(obter):
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Distribuição por Sexo
+    with col1:
+        sexo_fig = obter.grafico("sexo_fig", lambda: grafico_pizza(
+            obter("sexo"), "Sexo", "Quantidade",
+            titulo="Distribuição por Sexo",
+            cores=px.colors.sequential.RdBu,
+            rotulo="Sexo",
+            erro=obter.intervalo("sexo"),
+        ))
+        exibir_grafico(sexo_fig, key="sexo_fig")
+
+    # Gráfico 2: Distribuição por Faixa Etária
+    with col2:
+        faixa_fig = obter.grafico("faixa_fig", lambda: grafico_contagem(
+            obter("faixa_etaria"), "Faixa Etária", "Quantidade",
+            titulo="Distribuição por Faixa Etária",
+            cor="#FFA07A",
+            rotulo="Faixa Etária",
+            ordem=faixa_etaria_order,
+            erro=obter.intervalo("faixa_etaria"),
+        ))
+        exibir_grafico(faixa_fig, key="faixa_fig")
+
+    # Botão de análise
+    botao_analise("Análise de Sexo & Idade", lambda: tabelas_sexo_idade(obter))
+
+
+def render_rede_regiao(obter):
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Distribuição por Rede de Ensino
+    with col1:
+        rede_fig = obter.grafico("rede_fig", lambda: grafico_pizza(
+            obter("rede"), "Rede de Ensino", "Quantidade",
+            titulo="Distribuição por Rede de Ensino",
+            cores=px.colors.sequential.Plasma_r,  # Paleta vibrante
+            rotulo="Rede de Ensino",
+            textinfo="percent+label",
+            erro=obter.intervalo("rede"),
+        ))
+        exibir_grafico(rede_fig, key="rede_fig")
+
+    # Gráfico 2: Distribuição por Região
+    with col2:
+        regiao_fig = obter.grafico("regiao_fig", lambda: grafico_contagem(
+            obter("estado"), "Estado (UF)", "Quantidade",
+            titulo="Distribuição por Estado (UF)",
+            cor="#90ee90",
+            rotulo="Estado (UF)",
+            erro=obter.intervalo("estado"),
+        ))
+        exibir_grafico(regiao_fig, key="regiao_fig")
+
+    # Botão de análise
+    botao_analise("Análise de Rede de ensino e Região", lambda: tabelas_rede_regiao(obter), botao_texto="Analisar com Inteligência Artificial", key="botao_tab2")
+
+
+def render_medias(obter):
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Média Simples das Notas por Estado (UF)
+    def figura_media_estado():
+        media_estado_fig = px.bar(
+            obter("media_estado"),
+            x="SG_UF_ESC",
+            y="MEDIA_SIMPLES",
+            title="Média Simples das Notas por Estado (UF)",
+            text="MEDIA_SIMPLES",
+            error_y=obter.intervalo("media_estado"),  # Só na prévia pela amostra
+            color_discrete_sequence=["#FFD700"]
+        )
+        media_estado_fig.update_layout(
+            xaxis_title="Estado (UF)",
+            yaxis_title="Média Simples das Notas",
+            font=dict(color="white"),
+        )
+        media_estado_fig.update_traces(
+            texttemplate="%{text:.2f}",
+            textposition="outside",
+            hovertemplate="<b>Estado (UF)</b>: %{x}<br><b>Média Simples</b>: %{y:.2f}"
+        )
+        return media_estado_fig
+
+    with col1:
+        exibir_grafico(obter.grafico("media_estado_fig", figura_media_estado), key="media_estado_fig")
+
+    # Gráfico 2: Média Simples das Notas por Faixa Etária
+    def figura_media_faixa():
+        media_fig = px.bar(
+            obter("media_faixa"),
+            x="TP_FAIXA_ETARIA_DESC",
+            y="MEDIA_SIMPLES",
+            title="Média Simples das Notas por Faixa Etária",
+            error_y=obter.intervalo("media_faixa"),
+            color="MEDIA_SIMPLES",
+            color_continuous_scale="Blues"
+        )
+        media_fig.update_layout(
+            xaxis_title="Faixa Etária",
+            yaxis_title="Média Simples das Notas",
+            xaxis=dict(categoryorder="array", categoryarray=faixa_etaria_order),
+            font=dict(color="white"),
+            coloraxis_colorbar=dict(
+                title="Média",
+                title_side="right"
+            ),
+        )
+        media_fig.update_traces(
+            hovertemplate="<b>Faixa Etária</b>: %{x}<br><b>Média Simples</b>: %{y:.2f}"
+        )
+        return media_fig
+
+    with col2:
+        exibir_grafico(obter.grafico("media_fig", figura_media_faixa), key="media_fig")
+
+    # Botão de análise
+    botao_analise("Análise das Médias", lambda: tabelas_medias(obter), botao_texto="Analisar com Inteligência Artificial", key="botao_tab3")
+
+
+def render_faixa_rede(obter):
+    # Distribuição por Rede de Ensino
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Desempenho Geral por Faixa Etária
+    def figura_provas():
+        data_grouped_renamed = obter("provas_faixa")
+
+        # Verificar o número de faixas etárias para escolher o tipo de gráfico
+        if len(data_grouped_renamed) == 1:
+            provas_fig = px.bar(
+                data_grouped_renamed.melt(id_vars=["TP_FAIXA_ETARIA_DESC"],
+                                        var_name="Prova",
+                                        value_name="Média"),
+                x="Prova",
+                y="Média",
+                title=f"Desempenho Geral na Faixa Etária: {data_grouped_renamed['TP_FAIXA_ETARIA_DESC'].iloc[0]}",
+                color_discrete_sequence=["#FFA07A"]
             )
-            media_rede_fig.update_traces(
-                texttemplate="%{text:.2f}",
-                textposition="outside",
-                hovertemplate="<b>Rede de Ensino</b>: %{y}<br><b>Média Simples</b>: %{x:.2f}"
+        else:
+            provas_fig = px.line(
+                data_grouped_renamed,
+                x="TP_FAIXA_ETARIA_DESC",
+                y=[coluna for coluna in data_grouped_renamed.columns if coluna != "TP_FAIXA_ETARIA_DESC"],
+                title="Desempenho Geral nas Provas por Faixa Etária",
+                color_discrete_sequence=px.colors.sequential.Rainbow
             )
 
-            st.plotly_chart(media_rede_fig, use_container_width=True, key="media_rede_fig")
-
-            # Tabela: Média Simples das Notas por Rede de Ensino
-            tabela_rede = media_rede_data.copy()
-            tabela_rede.columns = ["Rede de Ensino", "Média Simples"]
-
-        # Tabela: Desempenho Geral por Faixa Etária
-        #st.subheader("Tabela: Desempenho Geral por Faixa Etária")
-        #st.dataframe(tabela_provas, use_container_width=True)
-
-        # Tabela: Média Simples das Notas por Rede de Ensino
-        #st.subheader("Tabela: Média Simples das Notas por Rede de Ensino")
-        #st.dataframe(tabela_rede, use_container_width=True)
-
-        # Botão de análise
-        tabelas_tab4 = [
-            ("Desempenho Geral por Faixa Etária", tabela_provas),
-            ("Média Simples das Notas por Rede de Ensino", tabela_rede),
-        ]
-        botao_analise("Análise de Faixa Etária & Rede", tabelas_tab4, botao_texto="Analisar com Inteligência Artificial", key="botao_tab4")
-
-    with tab5:
-        col1, col2 = st.columns(2)
-
-        # Gráfico 1: Média Geral das Provas por Sexo
-        with col1:
-            prova_map = {
-                "NU_NOTA_CN": "Ciências da Natureza",
-                "NU_NOTA_CH": "Ciências Humanas",
-                "NU_NOTA_LC": "Linguagens e Códigos",
-                "NU_NOTA_MT": "Matemática",
-                "NU_NOTA_REDACAO": "Redação"
-            }
-
-            # Agrupamento por sexo e cálculo das médias
-            media_geral_data = (
-                data_filtered.groupby("TP_SEXO_DESC")[
-                    ["NU_NOTA_MT", "NU_NOTA_LC", "NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_REDACAO"]
-                ]
-                .mean()
-                .reset_index()
-                .melt(id_vars=["TP_SEXO_DESC"], var_name="Prova", value_name="Média")
-            )
+        provas_fig.update_layout(
+            font=dict(color="white"),
+            xaxis_title="Faixa Etária",
+            yaxis_title="Média das Notas",
+            xaxis=dict(categoryorder="array", categoryarray=faixa_etaria_order),
+            legend_title="Matérias"
+        )
+        provas_fig.update_traces(
+            hovertemplate="<b>Faixa Etária</b>: %{x}<br><b>Média</b>: %{y:.2f}"
+        )
+        return provas_fig
+
+    with col1:
+        exibir_grafico(obter.grafico("provas_fig", figura_provas), key="provas_fig")
+
+    # Gráfico 2: Média Simples das Notas por Rede de Ensino
+    def figura_media_rede():
+        media_rede_fig = px.bar(
+            obter("media_rede"),
+            y="TP_ESCOLA_DESC",
+            x="MEDIA_SIMPLES",
+            title="Média Simples das Notas por Rede de Ensino",
+            text="MEDIA_SIMPLES",
+            labels={"TP_ESCOLA_DESC": "Rede de Ensino", "MEDIA_SIMPLES": "Média Simples"},
+            error_x=obter.intervalo("media_rede"),
+            color="TP_ESCOLA_DESC",
+            color_discrete_sequence=px.colors.sequential.Teal
+        )
+        media_rede_fig.update_layout(
+            yaxis_title="Rede de Ensino",
+            xaxis_title="Média Simples das Notas",
+            font=dict(color="white"),
+            title=dict(x=0.5)
+        )
+        media_rede_fig.update_traces(
+            texttemplate="%{text:.2f}",
+            textposition="outside",
+            hovertemplate="<b>Rede de Ensino</b>: %{y}<br><b>Média Simples</b>: %{x:.2f}"
+        )
+        return media_rede_fig
 
-            # Substituir os códigos das provas pelos nomes
-            media_geral_data["Prova"] = media_geral_data["Prova"].map(prova_map)
+    with col2:
+        exibir_grafico(obter.grafico("media_rede_fig", figura_media_rede), key="media_rede_fig")
 
-            # Criar gráfico de barras agrupadas
-            media_geral_fig = px.bar(
-                media_geral_data,
-                x="TP_SEXO_DESC",
-                y="Média",
-                color="Prova",
-                barmode="group",
-                title="Média Geral das Provas por Sexo",
-                color_discrete_sequence=px.colors.sequential.Viridis
+    # Botão de análise
+    botao_analise("Análise de Faixa Etária & Rede", lambda: tabelas_faixa_rede(obter), botao_texto="Analisar com Inteligência Artificial", key="botao_tab4")
+
+
+def render_comparacao(obter):
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Média Geral das Provas por Sexo
+    def figura_media_geral():
+        # Criar gráfico de barras agrupadas
+        media_geral_fig = px.bar(
+            obter("media_sexo"),
+            x="TP_SEXO_DESC",
+            y="Média",
+            color="Prova",
+            barmode="group",
+            title="Média Geral das Provas por Sexo",
+            color_discrete_sequence=px.colors.sequential.Viridis
+        )
+        media_geral_fig.update_layout(
+            font=dict(color="white"),
+            xaxis_title="Sexo",
+            yaxis_title="Média de Notas",
+            legend_title="Provas",
+        )
+        media_geral_fig.update_traces(
+            hovertemplate="<b>Média</b>: %{y:.2f}"
+        )
+        return media_geral_fig
+
+    with col1:
+        exibir_grafico(obter.grafico("media_geral_fig", figura_media_geral), key="media_geral_fig")
+
+    # Gráfico 2: Diferença de Médias das Provas por Sexo
+    def figura_diferenca():
+        diff_fig = px.bar(
+            obter("diferenca_sexo"),
+            x="Diferença",
+            y="Prova",
+            orientation="h",
+            title="Diferença de Médias das Provas por Sexo",
+            text="Diferença",
+            color="Diferença",
+            color_continuous_scale="RdBu"
+        )
+        diff_fig.update_layout(
+            font=dict(color="white"),
+            xaxis_title="Diferença (Masculino - Feminino)",
+            yaxis_title="Matéria",
+            coloraxis_showscale=False,
+        )
+        diff_fig.update_traces(
+            texttemplate="%{x:.2f}",  # Formatar valores com 2 casas decimais
+            hovertemplate="<b>Prova</b>: %{y}<br><b>Diferença</b>: %{x:.2f}"  # Exibir 2 casas decimais no hover
+        )
+        return diff_fig
+
+    with col2:
+        if obter("diferenca_sexo") is not None:
+            exibir_grafico(obter.grafico("diff_fig", figura_diferenca), key="diff_fig")
+        else:
+            st.warning("É necessário marcar os dois sexos no sidebar para exibir este gráfico.")
+
+    # Botão de análise
+    botao_analise("Análise por Sexo", lambda: tabelas_comparacao(obter), botao_texto="Analisar com Inteligência Artificial", key="botao_tab5")
+
+
+# Agrupamentos do gráfico de percentis: agregação e ordem das categorias
+AGRUPAMENTOS_PERCENTIS = {
+    "Estado (UF)": ("percentis_estado", None),
+    "Rede de Ensino": ("percentis_rede", None),
+    "Sexo": ("percentis_sexo", None),
+    "Faixa Etária": ("percentis_faixa", faixa_etaria_order),
+}
+
+
+def render_distribuicao(obter):
+    col_prova, col_grupo = st.columns(2)
+    prova = col_prova.selectbox(
+        "Prova", list(medida_map), format_func=medida_map.get, key="prova_distribuicao"
+    )
+    agrupamento = col_grupo.selectbox("Agrupar por", list(AGRUPAMENTOS_PERCENTIS), key="grupo_distribuicao")
+    nome, ordem = AGRUPAMENTOS_PERCENTIS[agrupamento]
+
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Mediana, P10 e P90 por categoria
+    with col1:
+        percentis_fig = obter.grafico(f"percentis_fig.{nome}.{prova}", lambda: grafico_percentis(
+            obter(nome)[lambda tabela: tabela["Medida"] == prova],
+            "Grupo",
+            titulo=f"Mediana e P10 a P90 - {medida_map[prova]} por {agrupamento}",
+            cor="#87CEFA",
+            rotulo=agrupamento,
+            ordem=ordem,
+        ))
+        exibir_grafico(percentis_fig, key="percentis_fig")
+
+    # Gráfico 2: Distribuição das notas da seleção em faixas de 10 pontos
+    with col2:
+        histograma_fig = obter.grafico(f"histograma_fig.{prova}", lambda: grafico_contagem(
+            obter("histograma_notas")[["Faixa", prova]].rename(columns={prova: "Quantidade"}),
+            "Faixa", "Quantidade",
+            titulo=f"Distribuição das Notas - {medida_map[prova]}",
+            cor="#9370DB",
+            rotulo="Faixa de Notas",
+        ))
+        exibir_grafico(histograma_fig, key="histograma_fig")
+
+    # Botão de análise
+    botao_analise("Análise das Distribuições", lambda: tabelas_distribuicao(obter), botao_texto="Analisar com Inteligência Artificial", key="botao_distribuicao")
+
+
+# Cruzamentos da aba socioeconômica: título e coluna
+CRUZAMENTOS_SOCIOECONOMICOS = {
+    "Rede de Ensino": "TP_ESCOLA_DESC",
+    "Estado (UF)": "SG_UF_ESC",
+}
+
+
+def render_socioeconomico(obter):
+    col_recorte, col_cruzamento, col_prova = st.columns(3)
+    recorte = col_recorte.selectbox(
+        "Recorte", list(RECORTES_SOCIOECONOMICOS),
+        format_func=lambda coluna: RECORTES_SOCIOECONOMICOS[coluna][0], key="recorte_socioeconomico",
+    )
+    cruzamento = col_cruzamento.selectbox("Cruzar com", list(CRUZAMENTOS_SOCIOECONOMICOS), key="cruzamento_socioeconomico")
+    prova = col_prova.selectbox(
+        "Prova", list(medida_map), format_func=medida_map.get, key="prova_socioeconomico"
+    )
+    titulo_recorte, ordem = RECORTES_SOCIOECONOMICOS[recorte]
+    coluna_cruzamento = CRUZAMENTOS_SOCIOECONOMICOS[cruzamento]
+
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Média por categoria do recorte e rede (linhas) ou UF (mapa de calor)
+    def figura_cruzamento():
+        tabela = _socioeconomico_por(obter("socioeconomico"), recorte, coluna_cruzamento, prova)
+        titulo = f"{medida_map[prova]} por {titulo_recorte} e {cruzamento}"
+        if coluna_cruzamento == "SG_UF_ESC":
+            matriz = tabela.pivot(index="Categoria", columns="SG_UF_ESC", values="Média")
+            matriz = matriz.reindex([categoria for categoria in ordem if categoria in matriz.index])
+            cruzamento_fig = px.imshow(
+                matriz,
+                aspect="auto",
+                title=titulo,
+                color_continuous_scale="Viridis",
             )
-            media_geral_fig.update_layout(
-                font=dict(color="white"),
-                xaxis_title="Sexo",
-                yaxis_title="Média de Notas",
-                legend_title="Provas",
+            cruzamento_fig.update_traces(
+                hovertemplate=f"<b>Estado (UF)</b>: %{{x}}<br><b>{titulo_recorte}</b>: %{{y}}<br><b>Média</b>: %{{z:.2f}}<extra></extra>"
             )
-            media_geral_fig.update_traces(
-                hovertemplate="<b>Média</b>: %{y:.2f}"
+            cruzamento_fig.update_layout(coloraxis_colorbar=dict(title="Média", title_side="right"))
+        else:
+            cruzamento_fig = px.line(
+                tabela,
+                x="Categoria",
+                y="Média",
+                color="TP_ESCOLA_DESC",
+                markers=True,
+                title=titulo,
+                category_orders={"Categoria": ordem},
+                color_discrete_sequence=px.colors.sequential.Plasma_r,
             )
-            st.plotly_chart(media_geral_fig, use_container_width=True, key="media_geral_fig")
-
-        # Gráfico 2: Diferença de Médias das Provas por Sexo
-        with col2:
-            if set(data_filtered["TP_SEXO_DESC"].unique()) >= {"Masculino", "Feminino"}:
-                diff_data = (
-                    data_filtered.groupby("TP_SEXO_DESC")[
-                        ["NU_NOTA_MT", "NU_NOTA_LC", "NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_REDACAO"]
-                    ]
-                    .mean()
-                    .reset_index()
-                    .melt(id_vars=["TP_SEXO_DESC"], var_name="Prova", value_name="Média")
-                    .pivot(index="Prova", columns="TP_SEXO_DESC", values="Média")
-                )
-                diff_data.index = diff_data.index.map(prova_map)
-                diff_data["Diferença"] = (diff_data["Masculino"] - diff_data["Feminino"]).round(2)  # Arredondar para 2 casas decimais
-                diff_data = diff_data.reset_index()
-
-                diff_fig = px.bar(
-                    diff_data,
-                    x="Diferença",
-                    y="Prova",
-                    orientation="h",
-                    title="Diferença de Médias das Provas por Sexo",
-                    text="Diferença",
-                    color="Diferença",
-                    color_continuous_scale="RdBu"
-                )
-                diff_fig.update_layout(
-                    font=dict(color="white"),
-                    xaxis_title="Diferença (Masculino - Feminino)",
-                    yaxis_title="Matéria",
-                    coloraxis_showscale=False,
-                )
-                diff_fig.update_traces(
-                    texttemplate="%{x:.2f}",  # Formatar valores com 2 casas decimais
-                    hovertemplate="<b>Prova</b>: %{y}<br><b>Diferença</b>: %{x:.2f}"  # Exibir 2 casas decimais no hover
-                )
-                st.plotly_chart(diff_fig, use_container_width=True, key="diff_fig")
-            else:
-                st.warning("É necessário marcar os dois sexos no sidebar para exibir este gráfico.")
-
-
-        # Tabela: Média Geral das Provas por Sexo
-        #st.subheader("Tabela: Média Geral das Provas por Sexo")
-        tabela_media_geral = media_geral_data.copy()
-        tabela_media_geral.columns = ["Sexo", "Prova", "Média"]
-        #st.dataframe(tabela_media_geral, use_container_width=True)
-
-        # Tabela: Diferença de Médias das Provas por Sexo
-        if set(data_filtered["TP_SEXO_DESC"].unique()) >= {"Masculino", "Feminino"}:
-            #st.subheader("Tabela: Diferença de Médias das Provas por Sexo")
-            tabela_diferenca = diff_data.copy()
-
-            # Ajustar os nomes das colunas invertidas
-            tabela_diferenca.columns = ["Prova", "Média Feminino", "Média Masculino", "Diferença"]
-            #st.dataframe(tabela_diferenca, use_container_width=True)
-
-        # Botão de análise
-        tabelas_tab5 = [
-            ("Média Geral das Provas por Sexo", tabela_media_geral),
-        ]
-        if set(data_filtered["TP_SEXO_DESC"].unique()) >= {"Masculino", "Feminino"}:
-            tabelas_tab5.append(("Diferença de Médias das Provas por Sexo", tabela_diferenca))
-
-        botao_analise("Análise por Sexo", tabelas_tab5, botao_texto="Analisar com Inteligência Artificial", key="botao_tab5")
-
-    # TAB6: Relatório Completo
-    with tab6:
-        st.title("Relatório Completo - Análise Avançada")
-        st.write(
-            """
-            Esta aba utiliza a inteligência artificial para cruzar informações de todas as tabelas
-            das abas anteriores e gerar um relatório completo com insights detalhados.
-            """
+            cruzamento_fig.update_traces(
+                hovertemplate=f"<b>{titulo_recorte}</b>: %{{x}}<br><b>Média</b>: %{{y:.2f}}"
+            )
+            cruzamento_fig.update_layout(legend_title="Rede de Ensino", yaxis_title="Média das Notas")
+        cruzamento_fig.update_layout(
+            xaxis_title=cruzamento if coluna_cruzamento == "SG_UF_ESC" else titulo_recorte,
+            font=dict(color="white"),
+        )
+        return cruzamento_fig
+
+    with col1:
+        exibir_grafico(
+            obter.grafico(f"socioeconomico_fig.{recorte}.{coluna_cruzamento}.{prova}", figura_cruzamento),
+            key="socioeconomico_fig",
         )
 
-        # Coletar todas as tabelas das tabs anteriores
-        tabelas_completas = [
-            ("Distribuição por Sexo", tabela_sexo),
-            ("Distribuição por Faixa Etária", tabela_faixa_etaria),
-            ("Distribuição por Rede de Ensino", tabela_rede),
-            ("Distribuição por Estado (UF)", tabela_regiao),
-            ("Média Simples das Notas por Estado (UF)", tabela_estado),
-            ("Média Simples das Notas por Faixa Etária", tabela_faixa),
-            ("Desempenho Geral por Faixa Etária", tabela_provas),
-            ("Média Simples das Notas por Rede de Ensino", tabela_rede),
-            ("Média Geral das Provas por Sexo", tabela_media_geral),
-            ("Diferença de Médias das Provas por Sexo", tabela_diferenca),
-        ]
-
-        # Botão para gerar relatório
-        botao_analise(
-            "Relatório Completo",
-            tabelas_completas,
-            botao_texto="Gerar Relatório Completo",
-            key="botao_tab6",
+    # Gráfico 2: Participantes por categoria do recorte
+    with col2:
+        participantes_fig = obter.grafico(f"participantes_fig.{recorte}", lambda: grafico_contagem(
+            _socioeconomico_por(obter("socioeconomico"), recorte, None, prova)
+            .rename(columns={"QTD": "Quantidade"}),
+            "Categoria", "Quantidade",
+            titulo=f"Participantes por {titulo_recorte}",
+            cor="#20B2AA",
+            rotulo=titulo_recorte,
+            ordem=ordem,
+        ))
+        exibir_grafico(participantes_fig, key="participantes_fig")
+
+    # Botão de análise
+    botao_analise("Análise Socioeconômica", lambda: tabelas_socioeconomico(obter), botao_texto="Analisar com Inteligência Artificial", key="botao_socioeconomico")
+
+
+def render_relatorio(obter):
+    st.title("Relatório Completo - Análise Avançada")
+    st.write(
+        """
+        Esta aba utiliza a inteligência artificial para cruzar informações de todas as tabelas
+        das abas anteriores e gerar um relatório completo com insights detalhados.
+        """
+    )
+
+    # Botão para gerar relatório (as tabelas só são calculadas ao clicar)
+    botao_relatorio(
+        "Relatório Completo",
+        lambda: tabelas_relatorio(obter),
+        botao_texto="Gerar Relatório Completo",
+        key="botao_tab6",
+    )
+
+
+def render_perguntas(obter):
+    st.title("Perguntas sobre os Dados")
+    st.write(
+        """
+        Faça uma pergunta em texto livre. A inteligência artificial responde com base nos
+        fatos do dataset mais relacionados à pergunta (totais e médias por estado, rede de
+        ensino, faixa etária, sexo e perfil socioeconômico), calculados sobre todos os
+        participantes, sem os filtros do sidebar.
+        """
+    )
+    caixa_pergunta(buscar_fatos, key="pergunta_tab7")
+
+
+# Registro das abas: agregações necessárias para exibir a aba, tabelas enviadas à IA e
+# função de renderização. Apenas a aba selecionada é calculada e renderizada.
+ABAS = {
+    "Sexo & Idade": {
+        "agregacoes": ["sexo", "faixa_etaria"],
+        "tabelas": tabelas_sexo_idade,
+        "render": render_sexo_idade,
+    },
+    "Rede & Região": {
+        "agregacoes": ["rede", "estado"],
+        "tabelas": tabelas_rede_regiao,
+        "render": render_rede_regiao,
+    },
+    "Média por UF": {
+        "agregacoes": ["media_estado", "media_faixa"],
+        "tabelas": tabelas_medias,
+        "render": render_medias,
+    },
+    "Faixa & Rede": {
+        "agregacoes": ["provas_faixa", "media_rede"],
+        "tabelas": tabelas_faixa_rede,
+        "render": render_faixa_rede,
+    },
+    "Comparação": {
+        "agregacoes": ["media_sexo", "diferenca_sexo"],
+        "tabelas": tabelas_comparacao,
+        "render": render_comparacao,
+    },
+    "Distribuição": {
+        "agregacoes": ["percentis_estado", "percentis_rede", "percentis_sexo", "percentis_faixa", "histograma_notas"],
+        "tabelas": tabelas_distribuicao,
+        "render": render_distribuicao,
+    },
+    "Socioeconômico": {
+        "agregacoes": ["socioeconomico"],
+        "tabelas": tabelas_socioeconomico,
+        "render": render_socioeconomico,
+    },
+    "Relatório": {
+        "agregacoes": [],  # Calculadas sob demanda ao gerar o relatório
+        "tabelas": tabelas_relatorio,
+        "render": render_relatorio,
+    },
+    "Perguntas": {
+        "agregacoes": [],
+        "tabelas": None,  # Usa os fatos recuperados, não as tabelas da aba
+        "render": render_perguntas,
+    },
+}
+
+
+@rastrear("render_dashboard")
+def render_dashboard(dataset, faixa_etaria, sexo, uf, rede, filtro_notas):
+    # Agregações calculadas sob demanda a partir do cubo (o dataset é somente leitura)
+    filtros = (faixa_etaria, sexo, uf, rede, filtro_notas)
+    obter = ConsultasRerun(dataset, filtros, _filtro_da_sessao(dataset))
+
+    # Prévia: se as agregações exatas das métricas e da aba ainda não estão no cache,
+    # exibe as estimativas da amostra enquanto as exatas são calculadas em segundo plano.
+    # As agregações que já são exatas com a amostra ficam fora da prévia e do refinamento.
+    futuro = None
+    agregacoes_aba = ABAS[st.session_state.get("aba_ativa", next(iter(ABAS)))]["agregacoes"]
+    aba_exata = bool(agregacoes_aba) and all(nome in AGREGACOES_EXATAS for nome in agregacoes_aba)
+    nomes = [nome for nome in AGREGACOES_METRICAS + agregacoes_aba if nome not in AGREGACOES_EXATAS]
+    if previa_ativada() and not obter.em_cache(nomes):
+        futuro = refinar_em_segundo_plano(ConsultasRerun(dataset, filtros), nomes)
+        if futuro is not None:
+            obter = ConsultasRerun(dataset, filtros, motor=obter_amostra(dataset.caminho, dataset))
+    aprox = "≈ " if futuro is not None else ""
+
+    st.title("Estatísticas - ENEM 2023")
+    if futuro is not None:
+        sorteados, fracao = tamanho_amostra(obter.motor.cubo)
+        st.caption(
+            f"⏳ Prévia estimada por uma amostra estratificada por UF e rede de ensino "
+            f"({f'{sorteados:,}'.replace(',', '.')} alunos, {fracao:.1%} do total), com "
+            "intervalos de confiança de 95%. Os valores exatos substituem a prévia assim que calculados."
+            + (" Os valores desta aba já são exatos; apenas as métricas do cabeçalho são estimadas." if aba_exata else "")
         )
+        _aguardar_refinamento(futuro)
+
+    # Cálculo das métricas
+    with span("metricas"):
+        contagem_sexo = obter("sexo").set_index("Sexo")["Quantidade"]
+        tabela_rede = obter("rede")
+        tabela_faixa_etaria = obter("faixa_etaria")
+        total_filtrado = obter("total")  # Total de alunos após filtros
+    total_alunos = dataset.catalogo["total"]  # Total geral de alunos sem filtros (do catálogo)
+    sexo_m = int(contagem_sexo.get("Masculino", 0))
+    sexo_f = int(contagem_sexo.get("Feminino", 0))
+    rede_predominante = (
+        tabela_rede["Rede de Ensino"].iloc[0]
+        if not tabela_rede.empty else "N/A"
+    )
+    faixa_etaria_comum = (
+        tabela_faixa_etaria["Faixa Etária"].iloc[0]
+        if not tabela_faixa_etaria.empty else "N/A"
+    )
+
+    # Exibir métricas
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    col1.metric("Total de Alunos (Geral)", f"{total_alunos:,}".replace(",", "."))
+    col2.metric("Total Filtrado", aprox + f"{total_filtrado:,}".replace(",", "."))
+    col3.metric("Sexo M", aprox + f"{sexo_m:,}".replace(",", "."))
+    col4.metric("Sexo F", aprox + f"{sexo_f:,}".replace(",", "."))
+    col5.metric("Rede Predominante", rede_predominante)
+    col6.metric("Faixa Etária Comum", faixa_etaria_comum)
+
+    # Linha separadora
+    st.divider()
+
+    # Seleção da aba: apenas a aba ativa tem suas agregações calculadas
+    aba_ativa = st.radio(
+        "Aba",
+        list(ABAS),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="aba_ativa",
+    )
+    aba = ABAS[aba_ativa]
+    with span(f"aba.{aba_ativa}"):
+        with span("agregacoes"):
+            for nome in aba["agregacoes"]:
+                obter(nome)
+        with span("render"):
+            aba["render"](obter)
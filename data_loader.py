@@ -1,13 +1,338 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import streamlit as st
+from armazenamento import abrir_arrow, arquivo_atualizado, salvar_arrow
+from catalogo import carregar_catalogo
+from cubo import combinar_cubos, construir_cubo
+from distribuicao import (carregar_histogramas, construir_histogramas,
+                          reposicionar_histogramas)
+from filtros import (COLUNAS_NOTAS, construir_indices, expressao_filtros,
+                     mascara_filtros, notas_validas)
+from rastreamento import span
+from constants import (FAIXA_ETARIA_MAP, SEXO_MAP, REDE_ENSINO_MAP,
+                       ACESSO_INTERNET_MAP, RENDA_FAMILIAR_MAP,
+                       ESCOLARIDADE_PAIS_MAP)
+
+DATASET_ARQUIVO_PATH = "./database/MICRODADOS_ENEM_2023_filtered_PQ.parquet"
+# Dataset particionado no formato Hive (SG_UF_ESC=SP/..., opcionalmente TP_ESCOLA=2/...),
+# gerado por particionar.py. Quando existe, é usado no lugar do arquivo único.
+DATASET_PARTICIONADO_PATH = "./database/MICRODADOS_ENEM_2023_particionado"
+DATASET_PATH = DATASET_PARTICIONADO_PATH if os.path.isdir(DATASET_PARTICIONADO_PATH) else DATASET_ARQUIVO_PATH
+
+# Linhas lidas por vez do dataset particionado: partições pequenas são agrupadas até
+# este limite, que define o pico de memória da carga
+LINHAS_POR_PARTE = 1_000_000
+
+# Colunas efetivamente usadas pelo sidebar e pelo dashboard
+COLUNAS_CATEGORICAS = ["TP_SEXO", "SG_UF_ESC", "Q001", "Q002", "Q006", "Q025"]
+COLUNAS_CODIGOS = ["TP_FAIXA_ETARIA", "TP_ESCOLA"]
+COLUNAS_DASHBOARD = COLUNAS_CODIGOS + COLUNAS_CATEGORICAS + COLUNAS_NOTAS
+
+# Colunas derivadas das notas gravadas pela ingestão (ingestao.py): quando o parquet já
+# as tem, são lidas em vez de recalculadas na carga
+COLUNAS_NOTAS_DERIVADAS = ["NOTAS_VALIDAS", "MEDIA_SIMPLES"]
+
+# Colunas de descrição derivadas na carga: coluna de origem e mapeamento
+COLUNAS_DESCRICAO = {
+    "TP_FAIXA_ETARIA_DESC": ("TP_FAIXA_ETARIA", FAIXA_ETARIA_MAP),
+    "TP_SEXO_DESC": ("TP_SEXO", SEXO_MAP),
+    "TP_ESCOLA_DESC": ("TP_ESCOLA", REDE_ENSINO_MAP),
+    "Q025_DESC": ("Q025", ACESSO_INTERNET_MAP),
+    "Q006_DESC": ("Q006", RENDA_FAMILIAR_MAP),
+    "Q001_DESC": ("Q001", ESCOLARIDADE_PAIS_MAP),
+    "Q002_DESC": ("Q002", ESCOLARIDADE_PAIS_MAP),
+}
+
+
+@dataclass(frozen=True)
+class DatasetEnem:
+    """
+    Dataset carregado e preparado uma única vez, compartilhado entre as sessões.
+
+    Os objetos são somente leitura: o código de renderização apenas consulta os
+    microdados, o cubo e os índices, sem copiar nem alterar.
+
+    Com um dataset particionado, apenas o cubo fica em memória (dados é None) e os
+    microdados são lidos sob demanda de fonte, com os filtros aplicados na leitura.
+    """
+    dados: pd.DataFrame
+    cubo: pd.DataFrame
+    indices_cubo: dict
+    memoria_bytes: int
+    fonte: ds.Dataset = None
+    caminho: str = None  # Arquivo ou diretório de origem, lido pelo motor DuckDB
+    catalogo: dict = None  # Valores e contagens das dimensões, lidos pelo sidebar
+    histogramas: np.ndarray = None  # Histogramas das notas por célula do cubo (distribuicao.py)
+
+
+def reduzir_tipos(data):
+    """
+    Converte as colunas do dashboard para tipos compactos: textos em categóricos,
+    códigos em int8 (Int8 quando há nulos) e notas em float32.
+
+    Args:
+    - data (pd.DataFrame): Microdados com as colunas de COLUNAS_DASHBOARD.
+
+    Returns:
+    - pd.DataFrame: Microdados com os tipos reduzidos.
+    """
+    tipos = {coluna: "category" for coluna in COLUNAS_CATEGORICAS}
+    tipos.update({coluna: "float32" for coluna in COLUNAS_NOTAS})
+    for coluna in COLUNAS_CODIGOS:
+        tipos[coluna] = "Int8" if data[coluna].isna().any() else "int8"
+    return data.astype(tipos)
+
+
+def _descricao(serie, mapa):
+    # Categórico cujas categorias são as descrições do mapeamento, na ordem dos códigos.
+    # A tradução é feita uma vez por valor distinto e aplicada aos códigos com np.take.
+    categorias = list(dict.fromkeys(mapa.values()))
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, valores = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, valores = pd.factorize(serie)
+    traducao = np.array(
+        [categorias.index(mapa[v]) if v in mapa else -1 for v in valores] + [-1],
+        dtype=np.int8 if len(categorias) < 127 else np.int16,
+    )
+    return pd.Categorical.from_codes(traducao[codigos], categories=categorias)
+
+
+def derivar_notas(data):
+    """
+    Calcula as colunas derivadas das notas: flag de notas válidas e média simples
+    (float32) das notas não nulas.
+
+    Args:
+    - data (pd.DataFrame): Tabela com as colunas NU_NOTA_*.
+
+    Returns:
+    - dict: Coluna -> valores, para cada coluna de COLUNAS_NOTAS_DERIVADAS.
+    """
+    return {
+        "NOTAS_VALIDAS": notas_validas(data),
+        "MEDIA_SIMPLES": data[COLUNAS_NOTAS].mean(axis=1).astype("float32"),
+    }
+
+
+def colunas_leitura(nomes):
+    """
+    Retorna as colunas lidas do parquet: as de COLUNAS_DASHBOARD e as derivadas das
+    notas que o arquivo já tiver.
+
+    Args:
+    - nomes (list of str): Colunas presentes no arquivo.
+
+    Returns:
+    - list of str: Colunas a ler.
+    """
+    return COLUNAS_DASHBOARD + [coluna for coluna in COLUNAS_NOTAS_DERIVADAS if coluna in nomes]
+
+
+def adicionar_colunas_derivadas(data):
+    """
+    Acrescenta as colunas derivadas usadas pelo dashboard: descrições categóricas,
+    média simples das notas (float32) e flag de notas válidas. As duas últimas só são
+    calculadas quando não vieram do parquet.
+
+    Args:
+    - data (pd.DataFrame): Microdados com as colunas de COLUNAS_DASHBOARD.
+
+    Returns:
+    - pd.DataFrame: Novo DataFrame com as colunas derivadas.
+    """
+    derivadas = {
+        coluna: _descricao(data[origem], mapa)
+        for coluna, (origem, mapa) in COLUNAS_DESCRICAO.items()
+    }
+    if not all(coluna in data for coluna in COLUNAS_NOTAS_DERIVADAS):
+        derivadas.update(derivar_notas(data))
+    return data.assign(**derivadas)
+
 
-@st.cache_data
-def load_dataset():
-    dataset_path = "./database/MICRODADOS_ENEM_2023_filtered_PQ.parquet"
+def memoria_dataset(data):
+    """
+    Retorna o uso de memória do DataFrame em bytes (incluindo o conteúdo dos textos).
+    """
+    return int(data.memory_usage(deep=True).sum())
+
+
+def _preparar(tabela):
+    # Tabela do pyarrow -> microdados com os tipos reduzidos e as colunas derivadas
+    return adicionar_colunas_derivadas(reduzir_tipos(tabela.to_pandas()))
+
+
+def _ler_fragmentos(fonte):
+    # Arquivos de partição (já com as colunas de partição) agrupados em partes de até
+    # LINHAS_POR_PARTE linhas, ou mais quando um único arquivo passa do limite
+    tabelas, linhas = [], 0
+    for fragmento in fonte.get_fragments():
+        tabela = fragmento.to_table(columns=colunas_leitura(fonte.schema.names), schema=fonte.schema)
+        if tabelas and linhas + tabela.num_rows > LINHAS_POR_PARTE:
+            yield _preparar(pa.concat_tables(tabelas))
+            tabelas, linhas = [], 0
+        tabelas.append(tabela)
+        linhas += tabela.num_rows
+    if tabelas:
+        yield _preparar(pa.concat_tables(tabelas))
+
+
+def abrir_particionado(caminho):
+    """
+    Abre um dataset particionado no formato Hive, sem ler os dados.
+
+    Args:
+    - caminho (str): Diretório raiz das partições.
+
+    Returns:
+    - pyarrow.dataset.Dataset: Dataset com as colunas de partição (SG_UF_ESC, TP_ESCOLA).
+    """
+    return ds.dataset(caminho, format="parquet", partitioning="hive")
+
+
+def iterar_microdados(dataset):
+    """
+    Percorre os microdados em partes, para cálculos que não precisam deles inteiros
+    em memória: grupos de partições de até LINHAS_POR_PARTE linhas no dataset
+    particionado, ou os microdados completos em uma única parte.
+
+    Args:
+    - dataset (DatasetEnem): Dataset carregado.
+
+    Returns:
+    - generator of pd.DataFrame: Partes dos microdados, com as colunas derivadas.
+    """
+    if dataset.fonte is None:
+        yield dataset.dados
+    else:
+        yield from _ler_fragmentos(dataset.fonte)
+
+
+def ler_microdados(dataset, faixa_etaria, sexo, uf, rede, filtro_notas):
+    """
+    Lê os microdados selecionados pelos filtros do sidebar. No dataset particionado,
+    os filtros são aplicados na leitura: só são abertas as partições das UFs e redes
+    escolhidas e, dentro delas, só os row groups que podem ter linhas selecionadas.
+
+    Args:
+    - dataset (DatasetEnem): Dataset carregado.
+    - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+    Returns:
+    - pd.DataFrame: Microdados filtrados, com as colunas derivadas.
+    """
+    filtros = (faixa_etaria, sexo, uf, rede, filtro_notas)
+    if dataset.fonte is None:
+        return dataset.dados[mascara_filtros(dataset.dados, *filtros)]
+    with span("leitura_particoes"):
+        tabela = dataset.fonte.to_table(
+            columns=colunas_leitura(dataset.fonte.schema.names), filter=expressao_filtros(*filtros)
+        )
+    return _preparar(tabela)
+
+
+def _carregar_particionado(caminho):
+    # O cubo é construído parte por parte: o pico de memória é o de LINHAS_POR_PARTE
+    # linhas (ou da maior partição), e não o dos microdados completos
+    fonte = abrir_particionado(caminho)
+    with span("cubo_particoes"):
+        partes = []
+        for parte in _ler_fragmentos(fonte):
+            partes.append((construir_cubo(parte), construir_histogramas(parte)))
+        cubo = combinar_cubos(cubo_parte for cubo_parte, _ in partes)
+        indices_cubo = construir_indices(cubo)
+    with span("histogramas"):
+        histogramas = sum(
+            reposicionar_histogramas(histogramas_parte, cubo_parte, cubo)
+            for cubo_parte, histogramas_parte in partes
+        )
+    with span("catalogo"):
+        catalogo = carregar_catalogo(caminho, cubo)
+    return DatasetEnem(
+        dados=None,
+        cubo=cubo,
+        indices_cubo=indices_cubo,
+        memoria_bytes=memoria_dataset(cubo),
+        fonte=fonte,
+        caminho=caminho,
+        catalogo=catalogo,
+        histogramas=histogramas,
+    )
+
+
+def _ler_parquet(caminho, compacto):
+    # Microdados com as colunas derivadas e o cubo construído a partir deles
+    with span("leitura_parquet"):
+        if compacto:
+            # Lê apenas as colunas usadas e reduz os tipos (categóricos, int8 e float32)
+            colunas = colunas_leitura(pq.read_schema(caminho).names)
+            data = reduzir_tipos(pd.read_parquet(caminho, columns=colunas))
+        else:
+            data = pd.read_parquet(caminho)
+    with span("colunas_derivadas"):
+        data = adicionar_colunas_derivadas(data)
+    with span("cubo"):
+        cubo = construir_cubo(data)
+    return data, cubo
+
+
+def _carregar_compartilhado(caminho):
+    # Microdados e cubo em arquivos Arrow mapeados em memória, gerados uma única vez a
+    # partir do parquet (e de novo quando o parquet muda). Cada processo do servidor
+    # mapeia os mesmos arquivos, e as páginas lidas são compartilhadas entre eles.
+    base = os.path.splitext(caminho)[0]
+    arquivo_dados, arquivo_cubo = f"{base}.dados.arrow", f"{base}.cubo.arrow"
+    data = cubo = None
+    if arquivo_atualizado(arquivo_dados, caminho) and arquivo_atualizado(arquivo_cubo, caminho):
+        with span("mapeamento_arrow"):
+            data, cubo = abrir_arrow(arquivo_dados), abrir_arrow(arquivo_cubo)
+    if data is None or cubo is None:
+        data, cubo = _ler_parquet(caminho, compacto=True)
+        try:
+            with span("gravacao_arrow"):
+                salvar_arrow(data, arquivo_dados)
+                salvar_arrow(cubo, arquivo_cubo)
+            # Passa a usar as visões dos arquivos, liberando as cópias privadas
+            data, cubo = abrir_arrow(arquivo_dados), abrir_arrow(arquivo_cubo)
+        except OSError:
+            pass  # Sem permissão de escrita: segue com os dados em memória deste processo
+    return data, cubo
+
+
+@st.cache_resource
+def load_dataset(compacto=True, caminho=DATASET_PATH, compartilhado=True):
     try:
-        data = pd.read_parquet(dataset_path)
-        return data
+        if os.path.isdir(caminho):
+            return _carregar_particionado(caminho)
+
+        if compacto and compartilhado:
+            data, cubo = _carregar_compartilhado(caminho)
+            with span("histogramas"):
+                histogramas = carregar_histogramas(caminho, data, cubo)
+        else:
+            data, cubo = _ler_parquet(caminho, compacto)
+            with span("histogramas"):
+                histogramas = construir_histogramas(data)
+
+        with span("catalogo"):
+            catalogo = carregar_catalogo(caminho, cubo)
+
+        # Os índices de filtragem do cubo são construídos junto com o dataset
+        return DatasetEnem(
+            dados=data,
+            cubo=cubo,
+            indices_cubo=construir_indices(cubo),
+            memoria_bytes=memoria_dataset(data),
+            caminho=caminho,
+            catalogo=catalogo,
+            histogramas=histogramas,
+        )
     except Exception as e:
         st.error(f"Erro ao carregar o dataset: {e}")
         return None
-
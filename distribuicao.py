@@ -0,0 +1,205 @@
+"""
+Histogramas das notas por célula do cubo, em faixas fixas de LARGURA_FAIXA pontos, usados
+nas distribuições e nos percentis do dashboard. Como os histogramas são contagens, os de
+qualquer combinação de filtros são obtidos somando os das células selecionadas, sem
+voltar aos microdados nem ordenar notas. Os percentis são interpolados dentro da faixa,
+com erro de no máximo meia faixa.
+
+Os histogramas formam um array (células x medidas x faixas) alinhado às linhas do cubo,
+de modo que os mesmos índices de filtragem do cubo selecionam as células.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import arquivo_atualizado
+from cubo import DIMENSOES_CUBO, MEDIDAS
+from filtros import COLUNAS_NOTAS, notas_validas
+
+# Faixas de 10 pontos entre 0 e 1000 (a nota 1000 entra na última faixa)
+LARGURA_FAIXA = 10
+NOTA_MAXIMA = 1000
+NUM_FAIXAS = NOTA_MAXIMA // LARGURA_FAIXA
+
+# Percentis exibidos no dashboard
+QUANTIS = {"P10": 0.1, "Mediana": 0.5, "P90": 0.9}
+
+
+def construir_histogramas(data):
+    """
+    Conta as notas de cada medida por faixa em cada célula do cubo.
+
+    Args:
+    - data (pd.DataFrame): Microdados do ENEM.
+
+    Returns:
+    - np.ndarray: Contagens (células x medidas x faixas), na ordem das linhas de
+      construir_cubo(data).
+    """
+    chaves = data[DIMENSOES_CUBO[:-1]].copy()
+    chaves["NOTAS_VALIDAS"] = data["NOTAS_VALIDAS"] if "NOTAS_VALIDAS" in data else notas_validas(data)
+    # Mesma ordem das células de construir_cubo (grupos ordenados, com os nulos)
+    celulas = chaves.groupby(DIMENSOES_CUBO, dropna=False, observed=True).ngroup().to_numpy()
+    num_celulas = int(celulas.max()) + 1 if len(celulas) else 0
+
+    histogramas = np.zeros((num_celulas, len(MEDIDAS), NUM_FAIXAS), dtype=np.int32)
+    for i, medida in enumerate(MEDIDAS):
+        if medida in data:
+            notas = data[medida].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            notas = data[COLUNAS_NOTAS].astype("float64").mean(axis=1).to_numpy()  # MEDIA_SIMPLES
+        presentes = ~np.isnan(notas)
+        faixas = np.clip(notas[presentes] // LARGURA_FAIXA, 0, NUM_FAIXAS - 1).astype(np.int64)
+        histogramas[:, i, :] = np.bincount(
+            celulas[presentes] * NUM_FAIXAS + faixas, minlength=num_celulas * NUM_FAIXAS
+        ).reshape(num_celulas, NUM_FAIXAS)
+    return histogramas
+
+
+def _chaves_celulas(cubo):
+    # Dimensões como objetos, com None nos nulos (categóricos de partes diferentes)
+    chaves = cubo[DIMENSOES_CUBO].astype(object)
+    return chaves.where(chaves.notna(), None)
+
+
+def reposicionar_histogramas(histogramas, cubo_origem, cubo):
+    """
+    Leva os histogramas de um cubo parcial (uma parte dos microdados) para as linhas
+    correspondentes do cubo combinado.
+
+    Args:
+    - histogramas (np.ndarray): Histogramas alinhados a cubo_origem.
+    - cubo_origem (pd.DataFrame): Cubo da parte.
+    - cubo (pd.DataFrame): Cubo combinado, que contém todas as células da parte.
+
+    Returns:
+    - np.ndarray: Histogramas alinhados a cubo (zero nas células ausentes da parte).
+    """
+    destino = _chaves_celulas(cubo).assign(POSICAO=np.arange(len(cubo)))
+    posicoes = _chaves_celulas(cubo_origem).merge(destino, on=DIMENSOES_CUBO, how="left")["POSICAO"]
+    resultado = np.zeros((len(cubo),) + histogramas.shape[1:], dtype=histogramas.dtype)
+    resultado[posicoes.to_numpy()] = histogramas
+    return resultado
+
+
+def carregar_histogramas(caminho, data, cubo):
+    """
+    Abre os histogramas gravados ao lado do parquet (mapeados em memória, como o dataset
+    compartilhado), construindo-os e tentando gravá-los quando não existem ou estão
+    desatualizados.
+
+    Args:
+    - caminho (str): Parquet de origem.
+    - data (pd.DataFrame): Microdados, usados se os histogramas precisarem ser construídos.
+    - cubo (pd.DataFrame): Cubo construído a partir de data.
+
+    Returns:
+    - np.ndarray: Histogramas alinhados ao cubo (somente leitura quando mapeados).
+    """
+    arquivo = f"{os.path.splitext(caminho)[0]}.histogramas.npy"
+    forma = (len(cubo), len(MEDIDAS), NUM_FAIXAS)
+    if arquivo_atualizado(arquivo, caminho):
+        try:
+            histogramas = np.load(arquivo, mmap_mode="r")
+            if histogramas.shape == forma:
+                return histogramas
+        except (OSError, ValueError):
+            pass
+
+    histogramas = construir_histogramas(data)
+    try:
+        temporario = f"{arquivo}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as f:
+            np.save(f, histogramas)
+        os.replace(temporario, arquivo)
+        return np.load(arquivo, mmap_mode="r")
+    except OSError:
+        return histogramas  # Sem permissão de escrita: os histogramas ficam em memória
+
+
+def histogramas_por(histogramas, indices, ids, dimensao=None):
+    """
+    Soma os histogramas das células selecionadas, por valor de uma dimensão.
+
+    Args:
+    - histogramas (np.ndarray): Histogramas alinhados ao cubo.
+    - indices (dict): Índices do cubo (construir_indices).
+    - ids (np.ndarray | None): Células selecionadas (None para todas).
+    - dimensao (str): Dimensão do agrupamento (None para o total da seleção).
+
+    Returns:
+    - tuple: Valores da dimensão (None para os nulos) e contagens (valores x medidas x faixas).
+    """
+    selecionados = histogramas if ids is None else histogramas[ids]
+    if dimensao is None:
+        return [None], selecionados.sum(axis=0, dtype=np.int64)[None]
+
+    indice = indices["dimensoes"][dimensao]
+    codigos = indice["codigos"] if ids is None else indice["codigos"][ids]
+    valores = [None] + list(indice["valores"])  # Código -1 (nulos) na primeira posição
+    # Soma por valor como produto com a matriz de pertinência (valores x células), bem
+    # mais rápido que acumular célula a célula; as contagens são exatas em float64
+    pertinencia = np.zeros((len(valores), len(codigos)))
+    pertinencia[codigos.astype(np.int64) + 1, np.arange(len(codigos))] = 1.0
+    somas = pertinencia @ selecionados.reshape(len(codigos), int(np.prod(histogramas.shape[1:]))).astype(np.float64)
+    contagens = somas.round().astype(np.int64).reshape((len(valores),) + histogramas.shape[1:])
+    # Valores presentes na seleção, em ordem crescente e com os nulos no fim
+    presentes = list(np.flatnonzero(contagens.sum(axis=(1, 2)) > 0))
+    presentes.sort(key=lambda i: (valores[i] is None, valores[i] if valores[i] is not None else 0))
+    return [valores[i] for i in presentes], contagens[presentes]
+
+
+def percentis(contagens, quantis):
+    """
+    Estima percentis a partir de histogramas, interpolando dentro da faixa.
+
+    Args:
+    - contagens (np.ndarray): Contagens por faixa no último eixo.
+    - quantis (list of float): Quantis entre 0 e 1.
+
+    Returns:
+    - np.ndarray: Percentis (quantis no último eixo), NaN onde não há notas.
+    """
+    acumulado = np.cumsum(contagens, axis=-1, dtype=np.float64)
+    total = acumulado[..., -1:]
+    resultado = []
+    for quantil in quantis:
+        alvo = quantil * total
+        # Primeira faixa em que o acumulado alcança o alvo e fração dela até o alvo
+        faixa = np.minimum((acumulado < alvo).sum(axis=-1, keepdims=True), NUM_FAIXAS - 1)
+        anterior = np.where(faixa > 0, np.take_along_axis(acumulado, np.maximum(faixa - 1, 0), axis=-1), 0.0)
+        na_faixa = np.take_along_axis(contagens, faixa, axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fracao = np.where(na_faixa > 0, (alvo - anterior) / na_faixa, 0.0)
+        valor = (faixa + fracao) * LARGURA_FAIXA
+        resultado.append(np.where(total > 0, valor, np.nan)[..., 0])
+    return np.stack(resultado, axis=-1)
+
+
+def tabela_percentis(valores, contagens, rotulos=None, rotulo_nulo=None):
+    """
+    Monta a tabela de percentis por valor da dimensão e por medida.
+
+    Args:
+    - valores (list): Valores da dimensão (de histogramas_por).
+    - contagens (np.ndarray): Contagens (valores x medidas x faixas).
+    - rotulos (dict): Mapeamento opcional de código para descrição.
+    - rotulo_nulo (str): Rótulo dos nulos (se None, os nulos são descartados).
+
+    Returns:
+    - pd.DataFrame: Colunas Grupo, Medida, Notas (quantidade de notas) e os percentis de QUANTIS.
+    """
+    estimados = percentis(contagens, list(QUANTIS.values()))
+    linhas = []
+    for i, valor in enumerate(valores):
+        if valor is None and rotulo_nulo is None:
+            continue
+        grupo = rotulo_nulo if valor is None else (rotulos.get(valor) if rotulos is not None else valor)
+        if grupo is None:
+            continue  # Código sem descrição, descartado como nas demais agregações
+        for j, medida in enumerate(MEDIDAS):
+            notas = int(contagens[i, j].sum())
+            if notas:
+                linhas.append([grupo, medida, notas] + [round(float(v), 1) for v in estimados[i, j]])
+    return pd.DataFrame(linhas, columns=["Grupo", "Medida", "Notas"] + list(QUANTIS))
@@ -0,0 +1,349 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+# Dimensões filtráveis pelo sidebar
+DIMENSOES_FILTRO = ["TP_FAIXA_ETARIA", "TP_SEXO", "SG_UF_ESC", "TP_ESCOLA"]
+
+COLUNAS_NOTAS = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
+
+# Valor do radio "Notas" do sidebar que restringe às notas válidas
+FILTRO_NOTAS_VALIDAS = "Notas Válidas (0-1000)"
+
+# Combinações de filtros cujo resultado é guardado por FiltroIncremental
+MAX_COMBINACOES = 8
+
+
+def notas_validas(data):
+    """
+    Calcula, de forma vetorizada, se todas as notas da linha estão entre 0 e 1000.
+
+    Args:
+    - data (pd.DataFrame): Tabela com as colunas NU_NOTA_*.
+
+    Returns:
+    - np.ndarray: Máscara booleana (notas nulas contam como inválidas).
+    """
+    notas = data[COLUNAS_NOTAS]
+    return (notas.ge(0) & notas.le(1000)).all(axis=1).to_numpy()
+
+
+def _indexar_dimensao(serie):
+    # Ids de linha ordenados por código: os ids de cada valor ficam contíguos (e em ordem)
+    codigos, valores = pd.factorize(serie)  # nulos recebem o código -1
+    tipo = np.int16 if len(valores) < np.iinfo(np.int16).max else np.int32
+    codigos = codigos.astype(tipo)
+    ordem = np.argsort(codigos, kind="stable").astype(np.int32 if len(serie) < 2**31 else np.int64)
+    contagens = np.bincount(codigos.astype(np.int64) + 1, minlength=len(valores) + 1)
+    return {
+        "codigos": codigos,
+        "valores": {valor: codigo for codigo, valor in enumerate(valores)},
+        "ordem": ordem,
+        "fronteiras": np.concatenate([[0], np.cumsum(contagens)]),
+    }
+
+
+def construir_indices(data):
+    """
+    Precomputa os índices usados na filtragem: para cada dimensão, os ids de linha de
+    cada valor e os códigos por linha, além da máscara de notas válidas.
+
+    Args:
+    - data (pd.DataFrame): Tabela com as dimensões do sidebar e as notas ou NOTAS_VALIDAS.
+
+    Returns:
+    - dict: Índices da tabela, a serem passados para selecionar_linhas.
+    """
+    if "NOTAS_VALIDAS" in data:
+        validas = data["NOTAS_VALIDAS"].to_numpy(dtype=bool)
+    else:
+        validas = notas_validas(data)
+    return {
+        "total": len(data),
+        "dimensoes": {dimensao: _indexar_dimensao(data[dimensao]) for dimensao in DIMENSOES_FILTRO},
+        "validas": validas,
+        "ids_validas": np.flatnonzero(validas),
+    }
+
+
+def _codigos_selecionados(indice, selecao):
+    # Converte os valores selecionados em códigos; None/NaN representa "não informado" (-1)
+    codigos = set()
+    for valor in selecao:
+        if pd.isna(valor):
+            codigos.add(-1)
+        elif valor in indice["valores"]:
+            codigos.add(indice["valores"][valor])
+    return np.array(sorted(codigos), dtype=np.int64)
+
+
+def _restricoes(faixa_etaria, sexo, uf, rede):
+    # Mesma semântica dos filtros originais: "TODOS" ou lista vazia não restringem
+    return {
+        "TP_FAIXA_ETARIA": None if faixa_etaria == ["TODOS"] else faixa_etaria,
+        "TP_SEXO": sexo if sexo else None,
+        "SG_UF_ESC": None if uf == ["TODOS"] else uf,
+        "TP_ESCOLA": rede if rede else None,
+    }
+
+
+def canonizar_filtros(indices, faixa_etaria, sexo, uf, rede, filtro_notas):
+    """
+    Reduz os filtros do sidebar a uma forma canônica: seleções equivalentes (em outra
+    ordem, com valores ausentes da tabela, "TODOS" ou todos os valores marcados) geram
+    a mesma chave.
+
+    Args:
+    - indices (dict): Índices gerados por construir_indices.
+    - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+    Returns:
+    - tuple: Por dimensão, "TODOS" ou a tupla ordenada dos valores presentes (None para
+      "não informado"), seguida da restrição às notas válidas.
+    """
+    chave = []
+    for dimensao, selecao in _restricoes(faixa_etaria, sexo, uf, rede).items():
+        if selecao is not None:
+            indice = indices["dimensoes"][dimensao]
+            codigos = _codigos_selecionados(indice, selecao)
+            presentes = np.flatnonzero(np.diff(indice["fronteiras"])) - 1
+            if not np.all(np.isin(presentes, codigos)):
+                # Só os valores com linhas na tabela contam; o nulo (-1) vira None
+                valores = {codigo: valor for valor, codigo in indice["valores"].items()}
+                selecao = sorted(
+                    (valores.get(int(c)) for c in codigos if c in presentes),
+                    key=lambda valor: (valor is not None, valor),
+                )
+                chave.append((dimensao, tuple(selecao)))
+                continue
+        chave.append((dimensao, "TODOS"))
+    return tuple(chave) + (filtro_notas == FILTRO_NOTAS_VALIDAS,)
+
+
+def selecionar_linhas(indices, faixa_etaria, sexo, uf, rede, filtro_notas):
+    """
+    Combina os índices para obter as linhas que atendem aos filtros do sidebar.
+
+    A dimensão mais seletiva fornece os ids candidatos (união das listas dos valores
+    escolhidos) e as demais dimensões e a máscara de notas válidas são aplicadas só
+    sobre esses candidatos, de modo que o custo acompanha o número de linhas
+    selecionadas e não o tamanho da tabela.
+
+    Args:
+    - indices (dict): Índices gerados por construir_indices.
+    - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+    Returns:
+    - np.ndarray | None: Ids ordenados das linhas selecionadas, ou None se nenhum filtro restringe a tabela.
+    """
+    candidatas = []
+    for dimensao, selecao in _restricoes(faixa_etaria, sexo, uf, rede).items():
+        if selecao is None:
+            continue
+        indice = indices["dimensoes"][dimensao]
+        codigos = _codigos_selecionados(indice, selecao)
+        tamanhos = np.diff(indice["fronteiras"])
+        if np.all(np.isin(np.flatnonzero(tamanhos) - 1, codigos)):
+            continue  # A seleção cobre todos os valores presentes na tabela
+        candidatas.append((int(tamanhos[codigos + 1].sum()), indice, codigos))
+
+    validas = filtro_notas == FILTRO_NOTAS_VALIDAS
+    if not candidatas:
+        return indices["ids_validas"] if validas else None
+
+    # OR: união dos ids dos valores escolhidos na dimensão mais seletiva
+    candidatas.sort(key=lambda item: item[0])
+    _, indice, codigos = candidatas[0]
+    fronteiras = indice["fronteiras"]
+    partes = [indice["ordem"][fronteiras[c + 1]:fronteiras[c + 2]] for c in codigos]
+    ids = np.sort(np.concatenate(partes)) if partes else indice["ordem"][:0]
+
+    # AND: demais dimensões testadas apenas nas linhas candidatas
+    for _, indice, codigos in candidatas[1:]:
+        permitido = np.zeros(len(indice["valores"]) + 1, dtype=bool)
+        permitido[codigos + 1] = True
+        ids = ids[permitido[indice["codigos"][ids] + 1]]
+
+    if validas:
+        ids = ids[indices["validas"][ids]]
+    return ids
+
+
+class FiltroIncremental:
+    """
+    Filtro com memória, mantido por sessão: guarda a máscara de cada dimensão com a
+    seleção que a gerou e, entre um rerun e outro, recalcula apenas as dimensões cuja
+    seleção mudou. Os resultados das últimas MAX_COMBINACOES combinações também ficam
+    guardados, então voltar a uma seleção anterior não recalcula nada. A memória é
+    limitada a uma máscara por dimensão e aos ids dessas combinações.
+    """
+
+    def __init__(self, indices, max_combinacoes=MAX_COMBINACOES):
+        self.indices = indices
+        self.max_combinacoes = max_combinacoes
+        self._mascaras = {}  # dimensão -> (códigos selecionados, máscara ou None)
+        self._combinacoes = OrderedDict()  # chave dos filtros -> ids selecionados
+        self.contadores = {"combinacoes_reaproveitadas": 0, "mascaras_reaproveitadas": 0, "mascaras_calculadas": 0}
+
+    def _mascara(self, dimensao, codigos):
+        # None quando a seleção não restringe a dimensão
+        anterior = self._mascaras.get(dimensao)
+        if anterior is not None and np.array_equal(anterior[0], codigos):
+            self.contadores["mascaras_reaproveitadas"] += 1
+            return anterior[1]
+        self.contadores["mascaras_calculadas"] += 1
+        indice = self.indices["dimensoes"][dimensao]
+        permitido = np.zeros(len(indice["valores"]) + 1, dtype=bool)
+        permitido[codigos + 1] = True
+        presentes = np.diff(indice["fronteiras"]) > 0
+        mascara = None if np.all(permitido[presentes]) else permitido[indice["codigos"] + 1]
+        self._mascaras[dimensao] = (codigos, mascara)
+        return mascara
+
+    def selecionar(self, faixa_etaria, sexo, uf, rede, filtro_notas):
+        """
+        Retorna as linhas que atendem aos filtros, com o mesmo resultado de selecionar_linhas.
+
+        Args:
+        - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+        Returns:
+        - np.ndarray | None: Ids ordenados das linhas selecionadas, ou None se nenhum filtro restringe a tabela.
+        """
+        selecoes = {}
+        for dimensao, selecao in _restricoes(faixa_etaria, sexo, uf, rede).items():
+            if selecao is not None:
+                selecoes[dimensao] = _codigos_selecionados(self.indices["dimensoes"][dimensao], selecao)
+        validas = filtro_notas == FILTRO_NOTAS_VALIDAS
+        chave = (tuple((d, tuple(c)) for d, c in selecoes.items()), validas)
+        if chave in self._combinacoes:
+            self.contadores["combinacoes_reaproveitadas"] += 1
+            self._combinacoes.move_to_end(chave)
+            return self._combinacoes[chave]
+
+        mascara = None
+        for dimensao, codigos in selecoes.items():
+            parcial = self._mascara(dimensao, codigos)
+            if parcial is not None:
+                mascara = parcial.copy() if mascara is None else np.logical_and(mascara, parcial, out=mascara)
+
+        if mascara is None:
+            ids = self.indices["ids_validas"] if validas else None
+        else:
+            if validas:
+                mascara &= self.indices["validas"]
+            ids = np.flatnonzero(mascara)
+
+        self._combinacoes[chave] = ids
+        while len(self._combinacoes) > self.max_combinacoes:
+            self._combinacoes.popitem(last=False)
+        return ids
+
+
+def filtrar(tabela, indices, faixa_etaria, sexo, uf, rede, filtro_notas):
+    """
+    Aplica os filtros do sidebar a uma tabela usando seus índices precomputados.
+
+    Args:
+    - tabela (pd.DataFrame): Tabela indexada por construir_indices (microdados ou cubo).
+    - indices (dict): Índices da tabela.
+    - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+    Returns:
+    - pd.DataFrame: Linhas selecionadas (a própria tabela quando nada é filtrado).
+    """
+    ids = selecionar_linhas(indices, faixa_etaria, sexo, uf, rede, filtro_notas)
+    return tabela if ids is None else tabela.iloc[ids]
+
+
+def _selecao_por_valores(selecao):
+    # Separa os valores selecionados dos nulos ("não informado")
+    valores = [valor for valor in selecao if not pd.isna(valor)]
+    return valores, len(valores) < len(selecao)
+
+
+def mascara_filtros(data, faixa_etaria, sexo, uf, rede, filtro_notas):
+    """
+    Calcula a máscara dos filtros do sidebar diretamente sobre as colunas, para
+    tabelas sem índices precomputados.
+
+    Args:
+    - data (pd.DataFrame): Microdados com as dimensões do sidebar e as notas.
+    - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+    Returns:
+    - np.ndarray: Máscara booleana das linhas selecionadas.
+    """
+    mascara = np.ones(len(data), dtype=bool)
+    for dimensao, selecao in _restricoes(faixa_etaria, sexo, uf, rede).items():
+        if selecao is None:
+            continue
+        valores, nulos = _selecao_por_valores(selecao)
+        coluna = data[dimensao]
+        permitido = coluna.isin(valores).to_numpy(dtype=bool)
+        if nulos:
+            permitido |= coluna.isna().to_numpy()
+        mascara &= permitido
+    if filtro_notas == FILTRO_NOTAS_VALIDAS:
+        mascara &= data["NOTAS_VALIDAS"].to_numpy(dtype=bool) if "NOTAS_VALIDAS" in data else notas_validas(data)
+    return mascara
+
+
+def expressao_filtros(faixa_etaria, sexo, uf, rede, filtro_notas):
+    """
+    Traduz os filtros do sidebar em uma expressão do pyarrow.dataset. Na leitura de
+    um dataset particionado, a expressão descarta as partições (UF, rede) e os row
+    groups (pelas estatísticas de mínimo e máximo) que não podem ter linhas selecionadas.
+
+    Args:
+    - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+    Returns:
+    - pyarrow.dataset.Expression | None: Expressão dos filtros, ou None se nada é filtrado.
+    """
+    termos = []
+    for dimensao, selecao in _restricoes(faixa_etaria, sexo, uf, rede).items():
+        if selecao is None:
+            continue
+        valores, nulos = _selecao_por_valores(selecao)
+        if not valores:
+            # isin([]) não tem tipo (null) e falha contra a coluna: só os nulos, ou nenhuma linha
+            termos.append(ds.field(dimensao).is_null() if nulos else ds.scalar(False))
+            continue
+        termo = ds.field(dimensao).isin(valores)
+        termos.append(termo | ds.field(dimensao).is_null() if nulos else termo)
+    if filtro_notas == FILTRO_NOTAS_VALIDAS:
+        # Comparações com nulo resultam em nulo, e a linha é descartada (nota nula é inválida)
+        termos += [(ds.field(coluna) >= 0) & (ds.field(coluna) <= 1000) for coluna in COLUNAS_NOTAS]
+
+    expressao = None
+    for termo in termos:
+        expressao = termo if expressao is None else expressao & termo
+    return expressao
+
+
+def clausula_sql(faixa_etaria, sexo, uf, rede, filtro_notas):
+    """
+    Traduz os filtros do sidebar em uma cláusula WHERE com parâmetros posicionais,
+    para os motores de consulta SQL.
+
+    Args:
+    - faixa_etaria, sexo, uf, rede, filtro_notas: Valores retornados por render_sidebar.
+
+    Returns:
+    - tuple: Texto da cláusula ("" se nada é filtrado) e lista de parâmetros.
+    """
+    condicoes, parametros = [], []
+    for dimensao, selecao in _restricoes(faixa_etaria, sexo, uf, rede).items():
+        if selecao is None:
+            continue
+        valores, nulos = _selecao_por_valores(selecao)
+        condicao = f"list_contains(?, {dimensao})"
+        condicoes.append(f"({condicao} OR {dimensao} IS NULL)" if nulos else condicao)
+        parametros.append(valores)
+    if filtro_notas == FILTRO_NOTAS_VALIDAS:
+        # Comparações com nulo resultam em nulo, e a linha é descartada (nota nula é inválida)
+        condicoes += [f"{coluna} BETWEEN 0 AND 1000" for coluna in COLUNAS_NOTAS]
+    return ("WHERE " + " AND ".join(condicoes) if condicoes else ""), parametros
@@ -0,0 +1,184 @@
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+from rastreamento import span
+
+# Os gráficos recebem apenas tabelas agregadas (uma linha por categoria)
+MAX_LINHAS_AGREGADAS = 500
+
+# Limite para o JSON de cada figura enviada ao navegador
+LIMITE_PAYLOAD_BYTES = 100 * 1024
+
+
+def _verificar_agregado(tabela):
+    # Impede que microdados cheguem ao Plotly por engano
+    if len(tabela) > MAX_LINHAS_AGREGADAS:
+        raise ValueError(
+            f"Os gráficos esperam dados agregados; recebida tabela com {len(tabela)} linhas."
+        )
+
+
+def tamanho_payload(fig):
+    """
+    Retorna o tamanho, em bytes, do JSON da figura enviado ao navegador.
+    """
+    return len(fig.to_json().encode("utf-8"))
+
+
+def grafico_pizza(tabela, nomes, valores, titulo, cores, rotulo, textinfo=None, erro=None):
+    """
+    Cria um gráfico de rosca a partir de contagens já agregadas.
+
+    Args:
+    - tabela (pd.DataFrame): Tabela agregada com uma linha por categoria.
+    - nomes (str): Coluna com as categorias.
+    - valores (str): Coluna com as quantidades.
+    - titulo (str): Título do gráfico.
+    - cores (list): Sequência de cores.
+    - rotulo (str): Nome da categoria exibido no hover.
+    - textinfo (str): Informação exibida nas fatias (padrão do Plotly se None).
+    - erro (array): Meia-largura do intervalo de confiança de cada porcentagem, em pontos
+      percentuais, exibida no hover (valores estimados pela amostra).
+
+    Returns:
+    - go.Figure: Figura do gráfico.
+    """
+    _verificar_agregado(tabela)
+    hover = f"<b>{rotulo}</b>: %{{label}}<br><b>Porcentagem</b>: %{{percent}}"
+    if erro is not None:
+        hover += " ± %{customdata:.1f} p.p."
+    fig = go.Figure(
+        go.Pie(
+            labels=tabela[nomes],
+            values=tabela[valores],
+            hole=0.4,
+            marker=dict(colors=cores),
+            sort=False,
+            customdata=erro,
+            hovertemplate=f"{hover}<extra></extra>",
+        )
+    )
+    if textinfo:
+        fig.update_traces(textinfo=textinfo)
+    fig.update_layout(
+        title=titulo,
+        font=dict(color="white"),
+    )
+    return fig
+
+
+def grafico_contagem(tabela, categoria, valores, titulo, cor, rotulo, ordem=None, erro=None):
+    """
+    Cria um gráfico de barras a partir de contagens já agregadas (substitui o histograma
+    sobre os microdados).
+
+    Args:
+    - tabela (pd.DataFrame): Tabela agregada com uma linha por categoria.
+    - categoria (str): Coluna com as categorias (eixo x).
+    - valores (str): Coluna com as quantidades (eixo y).
+    - titulo (str): Título do gráfico.
+    - cor (str): Cor das barras.
+    - rotulo (str): Título do eixo x e nome da categoria exibido no hover.
+    - ordem (list): Ordem opcional das categorias no eixo x.
+    - erro (array): Meia-largura do intervalo de confiança de cada quantidade, exibida
+      como barra de erro (valores estimados pela amostra).
+
+    Returns:
+    - go.Figure: Figura do gráfico.
+    """
+    _verificar_agregado(tabela)
+    hover = f"<b>{rotulo}</b>: %{{x}}<br><b>Quantidade</b>: %{{y}}"
+    if erro is not None:
+        tabela = tabela.assign(Intervalo=erro)
+        hover = f"<b>{rotulo}</b>: %{{x}}<br><b>Quantidade</b>: %{{y:,.0f}} ± %{{customdata[0]:,.0f}}"
+    fig = px.bar(
+        tabela,
+        x=categoria,
+        y=valores,
+        title=titulo,
+        color_discrete_sequence=[cor],
+        error_y="Intervalo" if erro is not None else None,
+        custom_data=["Intervalo"] if erro is not None else None,
+    )
+    fig.update_layout(
+        xaxis_title=rotulo,
+        yaxis_title="Quantidade",
+        font=dict(color="white"),
+    )
+    if ordem is not None:
+        fig.update_layout(xaxis=dict(categoryorder="array", categoryarray=ordem))
+    fig.update_traces(hovertemplate=hover)
+    return fig
+
+
+def grafico_percentis(tabela, categoria, titulo, cor, rotulo, ordem=None):
+    """
+    Cria um gráfico da faixa entre o P10 e o P90 (barra) com a mediana (marcador) de
+    cada categoria, a partir de percentis já calculados.
+
+    Args:
+    - tabela (pd.DataFrame): Tabela agregada com uma linha por categoria e as colunas
+      P10, Mediana e P90.
+    - categoria (str): Coluna com as categorias (eixo x).
+    - titulo (str): Título do gráfico.
+    - cor (str): Cor das barras.
+    - rotulo (str): Título do eixo x e nome da categoria exibido no hover.
+    - ordem (list): Ordem opcional das categorias no eixo x.
+
+    Returns:
+    - go.Figure: Figura do gráfico.
+    """
+    _verificar_agregado(tabela)
+    fig = go.Figure([
+        go.Bar(
+            x=tabela[categoria],
+            y=tabela["P90"] - tabela["P10"],
+            base=tabela["P10"],
+            name="P10 a P90",
+            marker=dict(color=cor),
+            customdata=tabela[["P10", "P90"]],
+            hovertemplate=(
+                f"<b>{rotulo}</b>: %{{x}}<br><b>P10</b>: %{{customdata[0]:.1f}}"
+                "<br><b>P90</b>: %{customdata[1]:.1f}<extra></extra>"
+            ),
+        ),
+        go.Scatter(
+            x=tabela[categoria],
+            y=tabela["Mediana"],
+            name="Mediana",
+            mode="markers",
+            marker=dict(color="white", size=9, symbol="diamond"),
+            hovertemplate=f"<b>{rotulo}</b>: %{{x}}<br><b>Mediana</b>: %{{y:.1f}}<extra></extra>",
+        ),
+    ])
+    fig.update_layout(
+        title=titulo,
+        xaxis_title=rotulo,
+        yaxis_title="Nota",
+        font=dict(color="white"),
+    )
+    if ordem is not None:
+        fig.update_layout(xaxis=dict(categoryorder="array", categoryarray=ordem))
+    return fig
+
+
+def exibir_grafico(fig, key):
+    """
+    Exibe a figura no Streamlit, avisando quando o payload ultrapassa LIMITE_PAYLOAD_BYTES.
+
+    Args:
+    - fig (go.Figure): Figura a ser exibida.
+    - key (str): Chave única do gráfico.
+
+    Returns:
+    - int: Tamanho do payload da figura em bytes.
+    """
+    with span(f"grafico.{key}"):
+        tamanho = tamanho_payload(fig)
+        if tamanho > LIMITE_PAYLOAD_BYTES:
+            st.warning(
+                f"O gráfico '{key}' gerou {tamanho / 1024:.0f} KB, acima do limite de "
+                f"{LIMITE_PAYLOAD_BYTES / 1024:.0f} KB."
+            )
+        st.plotly_chart(fig, use_container_width=True, key=key)
+    return tamanho
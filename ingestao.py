@@ -0,0 +1,167 @@
+"""
+Converte o CSV dos microdados do INEP (latin-1, separado por ";") no parquet lido pelo
+dashboard, em memória limitada: o CSV é lido em blocos, apenas com as colunas usadas,
+com tipos reduzidos e com as colunas derivadas das notas (NOTAS_VALIDAS e
+MEDIA_SIMPLES) já calculadas. Ao final, grava também o catálogo de metadados lido
+pelo sidebar (catalogo.py).
+
+O parquet final é ordenado por UF da escola (e por rede dentro de cada UF), com row
+groups que não misturam UFs, de modo que as estatísticas de cada row group permitem
+descartar a leitura das UFs não selecionadas. A ordenação é feita em duas passadas:
+os blocos são gravados em partições temporárias por UF, que depois são lidas e
+gravadas uma a uma. O pico de memória é o de um bloco ou o da maior UF.
+
+Uso:
+    python ingestao.py --origem database/MICRODADOS_ENEM_2023.csv
+"""
+import argparse
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from catalogo import construir_catalogo, salvar_catalogo
+from cubo import combinar_cubos, construir_cubo
+from data_loader import (COLUNAS_CATEGORICAS, COLUNAS_CODIGOS, COLUNAS_DASHBOARD,
+                         DATASET_ARQUIVO_PATH, derivar_notas, reduzir_tipos)
+from filtros import COLUNAS_NOTAS
+from particionar import LINHAS_POR_GRUPO
+
+CSV_PATH = "./database/MICRODADOS_ENEM_2023.csv"
+CSV_ENCODING = "latin-1"
+CSV_SEPARADOR = ";"
+
+# Linhas lidas do CSV por vez (cerca de 60 MB por bloco com as colunas do dashboard)
+LINHAS_POR_BLOCO = 500_000
+
+COMPRESSAO = "zstd"
+
+# Esquema do parquet gerado: códigos em int8, notas e média em float32 e textos em
+# string (gravados com codificação de dicionário e lidos como categóricos na carga)
+ESQUEMA = pa.schema(
+    [(coluna, pa.int8()) for coluna in COLUNAS_CODIGOS]
+    + [(coluna, pa.string()) for coluna in COLUNAS_CATEGORICAS]
+    + [(coluna, pa.float32()) for coluna in COLUNAS_NOTAS]
+    + [("NOTAS_VALIDAS", pa.bool_()), ("MEDIA_SIMPLES", pa.float32())]
+)
+
+# Partição temporária da primeira passada
+PARTICAO_UF = ds.partitioning(pa.schema([ESQUEMA.field("SG_UF_ESC")]), flavor="hive")
+
+
+def ler_blocos(origem, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Lê o CSV em blocos, apenas com as colunas do dashboard e já nos tipos do parquet.
+
+    Args:
+    - origem (str): CSV dos microdados.
+    - linhas_por_bloco (int): Linhas por bloco.
+
+    Returns:
+    - generator of pa.Table: Blocos no esquema ESQUEMA.
+    """
+    tipos = {coluna: "Int8" for coluna in COLUNAS_CODIGOS}
+    tipos.update({coluna: "float32" for coluna in COLUNAS_NOTAS})
+    tipos.update({coluna: "string" for coluna in COLUNAS_CATEGORICAS})
+    leitor = pd.read_csv(
+        origem,
+        sep=CSV_SEPARADOR,
+        encoding=CSV_ENCODING,
+        usecols=COLUNAS_DASHBOARD,
+        dtype=tipos,
+        chunksize=linhas_por_bloco,
+    )
+    with leitor:
+        for bloco in leitor:
+            bloco = bloco.assign(**derivar_notas(bloco))
+            yield pa.Table.from_pandas(bloco, schema=ESQUEMA, preserve_index=False)
+
+
+def _gravar_particoes(blocos, temporario):
+    # Primeira passada: cada bloco é distribuído nas partições por UF
+    shutil.rmtree(temporario, ignore_errors=True)
+    linhas = 0
+    for i, tabela in enumerate(blocos):
+        ds.write_dataset(
+            tabela,
+            temporario,
+            format="parquet",
+            partitioning=PARTICAO_UF,
+            basename_template=f"bloco-{i}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        linhas += tabela.num_rows
+    return linhas
+
+
+def _fragmentos_por_uf(temporario):
+    # Arquivos de cada UF, com as UFs em ordem alfabética e a UF não informada no fim
+    fonte = ds.dataset(temporario, format="parquet", partitioning=PARTICAO_UF)
+    grupos = {}
+    for fragmento in fonte.get_fragments():
+        uf = ds.get_partition_keys(fragmento.partition_expression).get("SG_UF_ESC")
+        grupos.setdefault(uf, []).append(fragmento)
+    ordem = sorted(grupos, key=lambda uf: (uf is None, uf or ""))
+    return fonte, [(uf, grupos[uf]) for uf in ordem]
+
+
+def ingerir_csv(origem, destino=DATASET_ARQUIVO_PATH, linhas_por_bloco=LINHAS_POR_BLOCO,
+                linhas_por_grupo=LINHAS_POR_GRUPO):
+    """
+    Gera o parquet do dashboard a partir do CSV do INEP.
+
+    Args:
+    - origem (str): CSV dos microdados.
+    - destino (str): Parquet de saída (substituído ao final, de forma atômica).
+    - linhas_por_bloco (int): Linhas lidas do CSV por vez.
+    - linhas_por_grupo (int): Máximo de linhas por row group.
+
+    Returns:
+    - dict: Caminho gravado, total de linhas, número de row groups e tamanho em bytes.
+    """
+    temporario = f"{destino}.particoes.tmp"
+    arquivo_temporario = f"{destino}.tmp"
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    try:
+        linhas = _gravar_particoes(ler_blocos(origem, linhas_por_bloco), temporario)
+
+        # Segunda passada: uma UF por vez, ordenada por rede, em row groups próprios. O
+        # cubo de cada UF alimenta o catálogo, sem reler o parquet gravado.
+        fonte, grupos = _fragmentos_por_uf(temporario)
+        cubos = []
+        with pq.ParquetWriter(arquivo_temporario, ESQUEMA, compression=COMPRESSAO,
+                              write_statistics=True) as escritor:
+            for _, fragmentos in grupos:
+                tabela = pa.concat_tables(
+                    fragmento.to_table(schema=fonte.schema).select(ESQUEMA.names)
+                    for fragmento in fragmentos
+                )
+                tabela = tabela.sort_by([("TP_ESCOLA", "ascending")]).cast(ESQUEMA)
+                escritor.write_table(tabela, row_group_size=linhas_por_grupo)
+                cubos.append(construir_cubo(reduzir_tipos(tabela.to_pandas())))
+        os.replace(arquivo_temporario, destino)
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+        if os.path.exists(arquivo_temporario):
+            os.remove(arquivo_temporario)
+
+    salvar_catalogo(construir_catalogo(combinar_cubos(cubos), destino), destino)
+    metadados = pq.ParquetFile(destino).metadata
+    return {
+        "destino": destino,
+        "linhas": linhas,
+        "row_groups": metadados.num_row_groups,
+        "bytes": os.path.getsize(destino),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte o CSV dos microdados do ENEM no parquet do dashboard.")
+    parser.add_argument("--origem", default=CSV_PATH)
+    parser.add_argument("--destino", default=DATASET_ARQUIVO_PATH)
+    parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO)
+    args = parser.parse_args()
+    print(ingerir_csv(args.origem, args.destino, args.linhas_por_bloco))
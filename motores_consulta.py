@@ -0,0 +1,206 @@
+import os
+import threading
+
+import duckdb
+import pandas as pd
+from cliente_llm import obter_config
+from cubo import MEDIDAS
+from filtros import COLUNAS_NOTAS, clausula_sql, construir_indices, filtrar
+
+# Motor usado quando o config.toml não define MOTOR_CONSULTAS
+MOTOR_PADRAO = "pandas"
+
+# Tolerância relativa da verificação de paridade: o caminho em pandas soma notas em
+# float32 e o DuckDB lê as notas do parquet em precisão dupla
+TOLERANCIA_PARIDADE = 1e-5
+
+
+class MotorPandas:
+    """
+    Motor de referência: filtra as células do cubo em memória com os índices
+    precomputados. As células já estão agrupadas por todas as dimensões do sidebar,
+    então servem para qualquer agrupamento pedido.
+    """
+
+    nome = "pandas"
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def agrupar(self, filtros, dimensoes, filtro_sessao=None):
+        """
+        Retorna as células do cubo que atendem aos filtros.
+
+        Args:
+        - filtros (tuple): faixa_etaria, sexo, uf, rede e filtro_notas do sidebar.
+        - dimensoes (list of str): Dimensões usadas pela agregação (todas já presentes no cubo).
+        - filtro_sessao (FiltroIncremental): Filtro com as máscaras da sessão, se houver.
+
+        Returns:
+        - pd.DataFrame: Células com QTD e as colunas _N, _SOMA e _SOMA_Q de cada medida.
+        """
+        if filtro_sessao is None:
+            return filtrar(self.dataset.cubo, self.dataset.indices_cubo, *filtros)
+        ids = filtro_sessao.selecionar(*filtros)
+        return self.dataset.cubo if ids is None else self.dataset.cubo.iloc[ids]
+
+
+class MotorAmostra:
+    """
+    Motor da prévia: filtra as células do cubo da amostra estratificada (amostra.py),
+    cujas contagens e somas já estão ponderadas para estimar as da população. As
+    agregações saem no mesmo formato das exatas, em uma fração do tempo.
+    """
+
+    nome = "amostra"
+
+    def __init__(self, cubo_amostra):
+        self.cubo = cubo_amostra
+        self.indices = construir_indices(cubo_amostra)
+
+    def agrupar(self, filtros, dimensoes, filtro_sessao=None):
+        """
+        Retorna as células do cubo da amostra que atendem aos filtros.
+
+        Args:
+        - filtros (tuple): faixa_etaria, sexo, uf, rede e filtro_notas do sidebar.
+        - dimensoes (list of str): Dimensões usadas pela agregação (todas já presentes no cubo).
+        - filtro_sessao (FiltroIncremental): Ignorado (as máscaras da sessão são do cubo completo).
+
+        Returns:
+        - pd.DataFrame: Células com as colunas do cubo ponderadas, PESO, POP_ESTRATO e N_ESTRATO.
+        """
+        return filtrar(self.cubo, self.indices, *filtros)
+
+
+class MotorDuckDB:
+    """
+    Motor SQL embutido: executa o filtro e o agrupamento direto sobre o parquet (ou o
+    dataset particionado), com leitura colunar, execução vetorizada em todos os
+    núcleos e sem carregar os microdados em memória. Devolve as mesmas colunas do cubo,
+    agrupadas apenas pelas dimensões pedidas.
+    """
+
+    nome = "duckdb"
+
+    def __init__(self, caminho):
+        if os.path.isdir(caminho):
+            origem = f"read_parquet('{self._escapar(caminho)}/**/*.parquet', hive_partitioning = true)"
+        else:
+            origem = f"read_parquet('{self._escapar(caminho)}')"
+        # MEDIA_SIMPLES: média das notas não nulas da linha (nula se todas são nulas)
+        presentes = " + ".join(f"CAST({c} IS NOT NULL AS INTEGER)" for c in COLUNAS_NOTAS)
+        soma = " + ".join(f"COALESCE({c}, 0)" for c in COLUNAS_NOTAS)
+        self._conexao = duckdb.connect()
+        self._conexao.execute(f"""
+            CREATE VIEW microdados AS
+            SELECT
+                CAST(TP_FAIXA_ETARIA AS INTEGER) AS TP_FAIXA_ETARIA,
+                CAST(TP_SEXO AS VARCHAR) AS TP_SEXO,
+                CAST(SG_UF_ESC AS VARCHAR) AS SG_UF_ESC,
+                CAST(TP_ESCOLA AS INTEGER) AS TP_ESCOLA,
+                {", ".join(COLUNAS_NOTAS)},
+                ({soma}) / NULLIF({presentes}, 0) AS MEDIA_SIMPLES
+            FROM {origem}
+        """)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _escapar(texto):
+        return texto.replace("'", "''")
+
+    def agrupar(self, filtros, dimensoes, filtro_sessao=None):
+        """
+        Agrupa os microdados filtrados pelas dimensões pedidas.
+
+        Args:
+        - filtros (tuple): faixa_etaria, sexo, uf, rede e filtro_notas do sidebar.
+        - dimensoes (list of str): Colunas do GROUP BY (vazia para o total).
+        - filtro_sessao (FiltroIncremental): Ignorado (o filtro é aplicado na consulta).
+
+        Returns:
+        - pd.DataFrame: Uma linha por grupo, com QTD e as colunas _N, _SOMA e _SOMA_Q de cada medida.
+        """
+        where, parametros = clausula_sql(*filtros)
+        agregados = ["COUNT(*) AS QTD"]
+        for medida in MEDIDAS:
+            agregados += [
+                f"COUNT({medida}) AS {medida}_N",
+                f"SUM({medida}) AS {medida}_SOMA",
+                f"SUM({medida} * {medida}) AS {medida}_SOMA_Q",
+            ]
+        grupo = f"GROUP BY {', '.join(dimensoes)}" if dimensoes else ""
+        consulta = f"SELECT {', '.join(list(dimensoes) + agregados)} FROM microdados {where} {grupo}"
+        # Cada thread usa seu próprio cursor: a conexão não aceita consultas simultâneas
+        with self._lock:
+            cursor = self._conexao.cursor()
+        try:
+            return cursor.execute(consulta, parametros).df()
+        finally:
+            cursor.close()
+
+
+def criar_motor(dataset, nome=None):
+    """
+    Cria o motor de consultas configurado em MOTOR_CONSULTAS no config.toml
+    ("pandas" ou "duckdb"; o arquivo é lido uma única vez por processo).
+
+    Args:
+    - dataset (DatasetEnem): Dataset carregado (o DuckDB lê o arquivo de origem).
+    - nome (str): Motor a usar, no lugar do configurado.
+
+    Returns:
+    - MotorPandas | MotorDuckDB: Motor de consultas.
+    """
+    if nome is None:
+        try:
+            nome = obter_config().get("MOTOR_CONSULTAS", MOTOR_PADRAO)
+        except OSError:
+            nome = MOTOR_PADRAO
+    if nome == "pandas":
+        return MotorPandas(dataset)
+    if nome == "duckdb":
+        return MotorDuckDB(dataset.caminho)
+    raise ValueError(f"Motor de consultas desconhecido: {nome}")
+
+
+def _comparar_resultados(referencia, resultado):
+    # Retorna a descrição da diferença, ou None se os resultados são equivalentes
+    tabelas = isinstance(referencia, pd.DataFrame), isinstance(resultado, pd.DataFrame)
+    if tabelas == (True, True):
+        try:
+            pd.testing.assert_frame_equal(
+                referencia.reset_index(drop=True), resultado.reset_index(drop=True),
+                check_dtype=False, check_categorical=False, rtol=TOLERANCIA_PARIDADE,
+            )
+        except AssertionError as e:
+            return str(e)
+        return None
+    if tabelas == (False, False) and referencia == resultado:
+        return None
+    return f"{referencia!r} != {resultado!r}"
+
+
+def verificar_paridade(motor, referencia, agregacoes, dimensoes, cenarios):
+    """
+    Compara as agregações calculadas por um motor com as do motor de referência.
+
+    Args:
+    - motor: Motor verificado.
+    - referencia: Motor de referência (em geral, MotorPandas).
+    - agregacoes (dict): Nome da agregação -> função sobre as células agrupadas.
+    - dimensoes (dict): Nome da agregação -> dimensões usadas por ela.
+    - cenarios (dict): Nome do cenário -> filtros do sidebar.
+
+    Returns:
+    - list of dict: Divergências encontradas (vazia quando os motores concordam).
+    """
+    divergencias = []
+    for cenario, filtros in cenarios.items():
+        for nome, agregar in agregacoes.items():
+            esperado = agregar(referencia.agrupar(filtros, dimensoes[nome]))
+            obtido = agregar(motor.agrupar(filtros, dimensoes[nome]))
+            diferenca = _comparar_resultados(esperado, obtido)
+            if diferenca is not None:
+                divergencias.append({"cenario": cenario, "agregacao": nome, "diferenca": diferenca})
+    return divergencias
@@ -0,0 +1,65 @@
+"""
+Converte o parquet dos microdados em um dataset particionado no formato Hive
+(uma pasta por UF e, opcionalmente, por rede de ensino), lido pelo dashboard com
+os filtros de UF e rede aplicados na leitura.
+
+Uso:
+    python particionar.py
+    python particionar.py --por SG_UF_ESC TP_ESCOLA
+"""
+import argparse
+import shutil
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from data_loader import DATASET_ARQUIVO_PATH, DATASET_PARTICIONADO_PATH, colunas_leitura
+
+# Colunas aceitas como chave de partição (dimensões com poucos valores distintos)
+COLUNAS_PARTICAO = ["SG_UF_ESC", "TP_ESCOLA"]
+
+# Linhas por row group: grupos menores tornam o descarte pelas estatísticas mais fino,
+# mas grupos pequenos demais (um por lote lido da origem) deixam a leitura lenta
+LINHAS_POR_GRUPO = 256_000
+MIN_LINHAS_POR_GRUPO = 64_000
+
+
+def particionar_parquet(origem, destino, por=("SG_UF_ESC",), colunas=None):
+    """
+    Grava o dataset particionado lendo a origem em lotes (sem carregá-la inteira).
+
+    Args:
+    - origem (str): Parquet (ou diretório de parquets) dos microdados.
+    - destino (str): Diretório do dataset particionado (substituído se existir).
+    - por (tuple of str): Colunas de partição, na ordem das pastas.
+    - colunas (list of str): Colunas gravadas (None grava as do dashboard, com as derivadas
+      das notas quando a origem as tem).
+
+    Returns:
+    - str: Diretório gravado.
+    """
+    invalidas = [coluna for coluna in por if coluna not in COLUNAS_PARTICAO]
+    if invalidas:
+        raise ValueError(f"Colunas de partição não suportadas: {invalidas}")
+
+    fonte = ds.dataset(origem, format="parquet")
+    esquema_particao = ds.partitioning(pa.schema([fonte.schema.field(coluna) for coluna in por]), flavor="hive")
+    shutil.rmtree(destino, ignore_errors=True)
+    ds.write_dataset(
+        fonte.scanner(columns=colunas or colunas_leitura(fonte.schema.names)),
+        destino,
+        format="parquet",
+        partitioning=esquema_particao,
+        max_rows_per_group=LINHAS_POR_GRUPO,
+        min_rows_per_group=MIN_LINHAS_POR_GRUPO,
+    )
+    return destino
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Particiona os microdados do ENEM por UF e rede.")
+    parser.add_argument("--origem", default=DATASET_ARQUIVO_PATH)
+    parser.add_argument("--destino", default=DATASET_PARTICIONADO_PATH)
+    parser.add_argument("--por", nargs="+", default=["SG_UF_ESC"], choices=COLUNAS_PARTICAO)
+    args = parser.parse_args()
+    print(particionar_parquet(args.origem, args.destino, tuple(args.por)))
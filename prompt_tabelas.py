@@ -0,0 +1,95 @@
+import numpy as np
+
+# Estimativa conservadora de caracteres por token para textos em português com números
+CARACTERES_POR_TOKEN = 3.5
+
+# Orçamento padrão de tokens para o conjunto de tabelas de um prompt
+ORCAMENTO_TOKENS = 1500
+
+# Casas decimais usadas para os números das tabelas
+CASAS_DECIMAIS = 1
+
+# Número mínimo de linhas mantidas quando uma tabela é truncada
+MIN_LINHAS = 5
+
+
+def estimar_tokens(texto):
+    """
+    Estima o número de tokens de um texto a partir do número de caracteres.
+
+    Args:
+    - texto (str): Texto do prompt.
+
+    Returns:
+    - int: Quantidade estimada de tokens.
+    """
+    return int(np.ceil(len(texto) / CARACTERES_POR_TOKEN))
+
+
+def _coluna_ordenacao(tabela):
+    # Primeira coluna numérica: usada para manter as linhas mais relevantes
+    numericas = tabela.select_dtypes("number").columns
+    return numericas[0] if len(numericas) else None
+
+
+def _truncar(tabela, linhas):
+    # Mantém as maiores linhas pela primeira coluna numérica e resume as demais
+    coluna = _coluna_ordenacao(tabela)
+    ordenada = tabela.sort_values(coluna, ascending=False) if coluna is not None else tabela
+    mantidas, omitidas = ordenada.iloc[:linhas], ordenada.iloc[linhas:]
+    resumo = f"... {len(omitidas)} linhas omitidas"
+    medias = omitidas.select_dtypes("number").mean().round(CASAS_DECIMAIS)
+    if len(medias):
+        resumo += " (médias: " + ", ".join(f"{c}={v:g}" for c, v in medias.items()) + ")"
+    return mantidas, resumo
+
+
+def serializar_tabela(nome, tabela, linhas=None):
+    """
+    Converte uma tabela em texto compacto: colunas separadas por "|" e números
+    arredondados, sem o preenchimento com espaços do to_string.
+
+    Args:
+    - nome (str): Nome da tabela.
+    - tabela (pd.DataFrame): Tabela agregada.
+    - linhas (int): Se informado e menor que a tabela, mantém apenas esse número de
+      linhas (as maiores) e resume as omitidas.
+
+    Returns:
+    - str: Tabela serializada.
+    """
+    resumo = None
+    if linhas is not None and linhas < len(tabela):
+        tabela, resumo = _truncar(tabela, linhas)
+    texto = f"Tabela: {nome}\n" + tabela.round(CASAS_DECIMAIS).to_csv(
+        sep="|", index=False, lineterminator="\n", float_format=f"%.{CASAS_DECIMAIS}f"
+    )
+    if resumo:
+        texto += resumo + "\n"
+    return texto
+
+
+def serializar_tabelas(tabelas, orcamento_tokens=ORCAMENTO_TOKENS):
+    """
+    Serializa as tabelas de um prompt respeitando o orçamento de tokens. Enquanto o
+    total estimado passar do orçamento, a maior tabela tem suas linhas reduzidas pela
+    metade (até MIN_LINHAS), mantendo as linhas de maior valor.
+
+    Args:
+    - tabelas (list of tuples): Lista de tabelas no formato [(nome_tabela, df), ...].
+    - orcamento_tokens (int): Máximo estimado de tokens para as tabelas.
+
+    Returns:
+    - str: Texto das tabelas, separadas por linha em branco.
+    """
+    linhas = [len(tabela) for _, tabela in tabelas]
+    textos = [serializar_tabela(nome, tabela) for nome, tabela in tabelas]
+    while sum(estimar_tokens(texto) for texto in textos) > orcamento_tokens:
+        candidatas = [i for i, n in enumerate(linhas) if n > MIN_LINHAS]
+        if not candidatas:
+            break  # Nada mais a truncar: o prompt segue acima do orçamento
+        maior = max(candidatas, key=lambda i: estimar_tokens(textos[i]))
+        linhas[maior] = max(MIN_LINHAS, linhas[maior] // 2)
+        nome, tabela = tabelas[maior]
+        textos[maior] = serializar_tabela(nome, tabela, linhas[maior])
+    return "\n".join(textos)
@@ -0,0 +1,133 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Se definida, cada rerun é gravado como uma linha JSON neste arquivo
+ARQUIVO_JSONL = os.environ.get("RASTREAMENTO_JSONL")
+
+# Coleta do rerun atual. Cada sessão do Streamlit roda em sua própria thread, então
+# as coletas não se misturam. Sem coleta ativa, spans e contadores não fazem nada.
+_coleta = contextvars.ContextVar("coleta_rastreamento", default=None)
+_lock_arquivo = threading.Lock()
+
+
+class Coleta:
+    """
+    Spans e contadores registrados durante um rerun.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.spans = []
+        self.contadores = {}
+        self.nivel = 0
+
+    def duracao_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+
+def iniciar_coleta():
+    """
+    Ativa a coleta de spans para o rerun atual.
+
+    Returns:
+    - Coleta: Coleta ativa.
+    """
+    coleta = Coleta()
+    _coleta.set(coleta)
+    return coleta
+
+
+def encerrar_coleta():
+    """
+    Desativa a coleta e retorna o que foi registrado (None se não havia coleta ativa).
+    """
+    coleta = _coleta.get()
+    _coleta.set(None)
+    return coleta
+
+
+@contextmanager
+def span(nome):
+    """
+    Mede a duração do bloco e a registra na coleta ativa, com o nível de aninhamento.
+
+    Args:
+    - nome (str): Nome da etapa.
+    """
+    coleta = _coleta.get()
+    if coleta is None:
+        yield
+        return
+    registro = {"nome": nome, "nivel": coleta.nivel, "inicio_ms": coleta.duracao_ms()}
+    coleta.spans.append(registro)
+    coleta.nivel += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro["duracao_ms"] = (time.perf_counter() - inicio) * 1000
+        coleta.nivel -= 1
+
+
+def rastrear(nome):
+    """
+    Decorador que registra cada chamada da função como um span.
+
+    Args:
+    - nome (str): Nome da etapa.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def funcao_rastreada(*args, **kwargs):
+            if _coleta.get() is None:
+                return funcao(*args, **kwargs)
+            with span(nome):
+                return funcao(*args, **kwargs)
+        return funcao_rastreada
+    return decorador
+
+
+def contar(nome, quantidade=1):
+    """
+    Incrementa um contador da coleta ativa (por exemplo, acertos de cache).
+    """
+    coleta = _coleta.get()
+    if coleta is not None:
+        coleta.contadores[nome] = coleta.contadores.get(nome, 0) + quantidade
+
+
+def exportar_jsonl(coleta, caminho=None, **contexto):
+    """
+    Acrescenta a coleta como uma linha JSON ao arquivo (ARQUIVO_JSONL por padrão).
+
+    Args:
+    - coleta (Coleta): Coleta encerrada.
+    - caminho (str): Arquivo de destino.
+    - contexto: Campos adicionais da linha (por exemplo, a sessão e a aba).
+
+    Returns:
+    - None
+    """
+    caminho = caminho or ARQUIVO_JSONL
+    if not caminho:
+        return
+    linha = json.dumps(
+        {
+            "timestamp": time.time(),
+            **contexto,
+            "duracao_ms": coleta.duracao_ms(),
+            "spans": coleta.spans,
+            "contadores": coleta.contadores,
+        },
+        ensure_ascii=False,
+        default=str,
+    )
+    with _lock_arquivo:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with open(caminho, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
@@ -0,0 +1,226 @@
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from cubo import medias_por
+from data_loader import iterar_microdados, load_dataset
+from filtros import COLUNAS_NOTAS
+from constants import (FAIXA_ETARIA_MAP, SEXO_MAP, REDE_ENSINO_MAP, PROVA_MAP,
+                       UF_NOME_MAP)
+
+# Dimensão dos vetores do embedder (potência de 2, para o hashing)
+DIMENSAO_EMBEDDING = 2 ** 14
+
+# Número de fatos incluídos no prompt de cada pergunta
+TOP_K = 8
+
+# Palavras sem conteúdo, ignoradas pelo embedder (já sem acentos)
+STOPWORDS = {
+    "a", "o", "as", "os", "e", "de", "da", "do", "das", "dos", "em", "na", "no", "nas",
+    "nos", "um", "uma", "para", "por", "com", "que", "qual", "quais", "como", "quem",
+    "tem", "se", "ao", "aos", "entre", "sobre", "ou", "foi", "sao", "esta", "estao",
+}
+
+# Recortes socioeconômicos: coluna de descrição e texto usado nos fatos
+RECORTES_SOCIOECONOMICOS = {
+    "Q006_DESC": "renda familiar mensal",
+    "Q025_DESC": "acesso à internet em casa",
+    "Q001_DESC": "escolaridade do pai",
+    "Q002_DESC": "escolaridade da mãe",
+}
+
+
+# ---------------------------------------------------------------------------
+# Fatos: frases curtas com os números agregados do dataset completo
+# ---------------------------------------------------------------------------
+
+def _frase_medias(medias):
+    # "média simples 512.3; Matemática 530.1, ..." a partir de uma linha de médias
+    partes = [f"{PROVA_MAP[coluna]} {medias[coluna]:.1f}" for coluna in COLUNAS_NOTAS if pd.notna(medias[coluna])]
+    frase = f"média simples das notas {medias['MEDIA_SIMPLES']:.1f}" if pd.notna(medias["MEDIA_SIMPLES"]) else "sem notas"
+    return frase + ("; " + ", ".join(partes) if partes else "")
+
+
+def _fatos_cubo(cubo, dimensao, rotulos, descricao, total):
+    quantidades = cubo.groupby(dimensao, observed=True)["QTD"].sum()
+    medias = medias_por(cubo, dimensao)
+    fatos = []
+    for valor, linha in medias.iterrows():
+        if rotulos is not None and valor not in rotulos:
+            continue
+        qtd = int(quantidades[valor])
+        fatos.append(
+            f"{descricao(valor)}: {qtd} participantes ({qtd / total:.1%} do total), {_frase_medias(linha)}."
+        )
+    return fatos
+
+
+def _nome_uf(uf):
+    if pd.isna(uf):
+        return "UF da escola Não informado"  # Mesmo rótulo dos nulos no sidebar
+    return f"Estado {UF_NOME_MAP[uf]} ({uf})" if uf in UF_NOME_MAP else f"UF {uf}"
+
+
+def gerar_fatos(dataset):
+    """
+    Gera os fatos textuais usados na recuperação: totais e médias por UF, rede de
+    ensino, faixa etária, sexo, UF x rede e pelos recortes socioeconômicos
+    (Q001, Q002, Q006 e Q025).
+
+    Args:
+    - dataset (DatasetEnem): Dataset carregado.
+
+    Returns:
+    - list of str: Fatos, um por frase.
+    """
+    cubo = dataset.cubo
+    total = int(cubo["QTD"].sum())
+    geral = medias_por(cubo.assign(GERAL="Brasil"), "GERAL").iloc[0]
+    fatos = [f"Brasil, todos os participantes do ENEM 2023: {total} participantes, {_frase_medias(geral)}."]
+
+    fatos += _fatos_cubo(cubo, "SG_UF_ESC", None, _nome_uf, total)
+    fatos += _fatos_cubo(cubo, "TP_ESCOLA", REDE_ENSINO_MAP,
+                         lambda v: f"Rede de ensino {REDE_ENSINO_MAP[v]}", total)
+    fatos += _fatos_cubo(cubo, "TP_FAIXA_ETARIA", FAIXA_ETARIA_MAP,
+                         lambda v: f"Faixa etária {FAIXA_ETARIA_MAP[v]}", total)
+    fatos += _fatos_cubo(cubo, "TP_SEXO", SEXO_MAP, lambda v: f"Sexo {SEXO_MAP[v]}", total)
+
+    # UF x rede: a chave composta vira uma única dimensão
+    uf_rede = cubo.assign(UF_REDE=list(zip(cubo["SG_UF_ESC"], cubo["TP_ESCOLA"])))
+    fatos += _fatos_cubo(
+        uf_rede[uf_rede["TP_ESCOLA"].isin(list(REDE_ENSINO_MAP))], "UF_REDE", None,
+        lambda v: f"{_nome_uf(v[0])}, rede de ensino {REDE_ENSINO_MAP[v[1]]}", total,
+    )
+
+    # Recortes socioeconômicos, calculados sobre os microdados parte a parte (somas e
+    # contagens acumuladas, para não exigir os microdados inteiros em memória)
+    medidas = COLUNAS_NOTAS + ["MEDIA_SIMPLES"]
+    parciais = {coluna: [] for coluna in RECORTES_SOCIOECONOMICOS}
+    for parte in iterar_microdados(dataset):
+        for coluna in RECORTES_SOCIOECONOMICOS:
+            grupos = parte.groupby(coluna, observed=True)
+            parciais[coluna].append(
+                pd.concat([grupos[medidas].sum(), grupos[medidas].count().add_suffix("_N"),
+                           grupos.size().rename("QTD")], axis=1)
+            )
+    for coluna, descricao in RECORTES_SOCIOECONOMICOS.items():
+        somas = pd.concat(parciais[coluna]).groupby(level=0, observed=True).sum()
+        quantidades = somas["QTD"]
+        medias = pd.DataFrame({m: somas[m] / somas[f"{m}_N"].where(somas[f"{m}_N"] > 0) for m in medidas})
+        for valor, linha in medias.iterrows():
+            qtd = int(quantidades[valor])
+            fatos.append(
+                f"Participantes com {descricao} \"{valor}\": {qtd} participantes "
+                f"({qtd / total:.1%} do total), {_frase_medias(linha)}."
+            )
+    return fatos
+
+
+# ---------------------------------------------------------------------------
+# Embedder e índice vetorial
+# ---------------------------------------------------------------------------
+
+def _termos(texto):
+    # Minúsculas e sem acentos; palavras e pares de palavras consecutivas. Os números
+    # dos fatos ficam de fora: não identificam o fato e, espalhados pelo hashing,
+    # colidem com os termos que identificam (UF, rede, recorte)
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    palavras = [p for p in re.findall(r"\w+", texto) if p not in STOPWORDS and not p.isdigit()]
+    return palavras + [f"{a} {b}" for a, b in zip(palavras, palavras[1:])]
+
+
+class EmbedderHash:
+    """
+    Embedder offline: TF-IDF sobre termos (palavras e bigramas) mapeados por hashing
+    para DIMENSAO_EMBEDDING posições. Não depende de modelos nem de acesso à rede.
+    """
+
+    def __init__(self, dimensao=DIMENSAO_EMBEDDING):
+        self.dimensao = dimensao
+        self.idf = np.ones(dimensao, dtype=np.float32)
+
+    def _posicoes(self, texto):
+        return np.array([zlib.crc32(t.encode("utf-8")) % self.dimensao for t in _termos(texto)], dtype=np.int64)
+
+    def ajustar(self, textos):
+        """
+        Calcula o IDF de cada posição a partir dos textos indexados.
+        """
+        documentos = np.zeros(self.dimensao, dtype=np.float32)
+        for texto in textos:
+            documentos[np.unique(self._posicoes(texto))] += 1
+        self.idf = (np.log((1 + len(textos)) / (1 + documentos)) + 1).astype(np.float32)
+        return self
+
+    def transformar(self, textos):
+        """
+        Converte os textos em vetores TF-IDF normalizados (norma L2).
+
+        Args:
+        - textos (list of str): Textos a converter.
+
+        Returns:
+        - np.ndarray: Matriz float32 com um vetor por texto.
+        """
+        vetores = np.zeros((len(textos), self.dimensao), dtype=np.float32)
+        for i, texto in enumerate(textos):
+            posicoes, contagens = np.unique(self._posicoes(texto), return_counts=True)
+            vetores[i, posicoes] = (1 + np.log(contagens)) * self.idf[posicoes]
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        return vetores / np.where(normas > 0, normas, 1)
+
+
+class IndiceVetorial:
+    """
+    Índice em memória com busca dos k vetores mais próximos por similaridade de cosseno.
+    """
+
+    def __init__(self, textos, embedder):
+        self.textos = list(textos)
+        self.embedder = embedder.ajustar(self.textos)
+        self.vetores = embedder.transformar(self.textos)
+
+    def buscar(self, consulta, k=TOP_K):
+        """
+        Retorna os k textos mais similares à consulta.
+
+        Args:
+        - consulta (str): Texto da consulta.
+        - k (int): Número de resultados.
+
+        Returns:
+        - list of tuples: Pares (texto, similaridade), do mais para o menos similar.
+        """
+        similaridades = self.vetores @ self.embedder.transformar([consulta])[0]
+        k = min(k, len(self.textos))
+        melhores = np.argpartition(-similaridades, k - 1)[:k]
+        melhores = melhores[np.argsort(-similaridades[melhores])]
+        return [(self.textos[i], float(similaridades[i])) for i in melhores if similaridades[i] > 0]
+
+
+@st.cache_resource(show_spinner="Indexando os fatos do dataset...")
+def carregar_indice_fatos():
+    """
+    Gera os fatos do dataset e monta o índice uma única vez, compartilhado entre as sessões.
+
+    Returns:
+    - IndiceVetorial: Índice dos fatos.
+    """
+    return IndiceVetorial(gerar_fatos(load_dataset()), EmbedderHash())
+
+
+def buscar_fatos(pergunta, k=TOP_K):
+    """
+    Recupera os fatos mais relevantes para uma pergunta em texto livre.
+
+    Args:
+    - pergunta (str): Pergunta do usuário.
+    - k (int): Número de fatos.
+
+    Returns:
+    - list of tuples: Pares (fato, similaridade).
+    """
+    return carregar_indice_fatos().buscar(pergunta, k)
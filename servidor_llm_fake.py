@@ -0,0 +1,142 @@
+"""
+Servidor local compatível com a API de chat completions da OpenAI, com respostas
+determinísticas, para testar e medir o caminho da IA sem acesso à rede.
+
+Uso:
+    python servidor_llm_fake.py --porta 8765 --latencia 0.5 --tokens-por-segundo 50
+
+E no config.toml:
+    LLM_BACKEND = "local"
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORTA_PADRAO = 8765
+LATENCIA_PADRAO = 0.5
+TOKENS_POR_SEGUNDO_PADRAO = 50.0
+TOKENS_RESPOSTA_PADRAO = 120
+
+
+def resposta_deterministica(prompt, n_tokens=TOKENS_RESPOSTA_PADRAO):
+    """
+    Gera uma resposta fixa para o prompt: o mesmo prompt sempre produz o mesmo texto.
+
+    Args:
+    - prompt (str): Prompt recebido.
+    - n_tokens (int): Número de palavras da resposta.
+
+    Returns:
+    - list of str: Trechos (palavras seguidas de espaço) da resposta.
+    """
+    semente = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    cabecalho = [f"Análise {semente[:8]}:", f"prompt com {len(prompt)} caracteres."]
+    corpo = [f"insight-{semente[i % 64]}{i}" for i in range(max(0, n_tokens - len(cabecalho)))]
+    return [palavra + " " for palavra in cabecalho + corpo]
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clientes que fecham a conexão no meio (fim de um benchmark) não são erros
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def _criar_handler(latencia, tokens_por_segundo, n_tokens):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Mantém as conexões abertas para o pool do cliente
+
+        def log_message(self, *args):
+            pass  # Sem log por requisição: o servidor também é usado em medições
+
+        def _json(self, status, corpo):
+            dados = json.dumps(corpo).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self._json(404, {"error": {"message": "rota não encontrada"}})
+                return
+            pedido = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt = "\n".join(m.get("content", "") for m in pedido.get("messages", []))
+            trechos = resposta_deterministica(prompt, n_tokens)
+            modelo = pedido.get("model", "fake")
+
+            time.sleep(latencia)  # Tempo até o primeiro token
+            if not pedido.get("stream"):
+                time.sleep(len(trechos) / tokens_por_segundo)
+                self._json(200, {
+                    "object": "chat.completion",
+                    "model": modelo,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(trechos)}}],
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for trecho in trechos:
+                evento = {"object": "chat.completion.chunk", "model": modelo,
+                          "choices": [{"index": 0, "delta": {"content": trecho}}]}
+                self._enviar_trecho(f"data: {json.dumps(evento)}\n\n")
+                time.sleep(1 / tokens_por_segundo)
+            self._enviar_trecho("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _enviar_trecho(self, texto):
+            dados = texto.encode("utf-8")
+            self.wfile.write(f"{len(dados):x}\r\n".encode() + dados + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def iniciar_servidor(porta=PORTA_PADRAO, latencia=LATENCIA_PADRAO,
+                     tokens_por_segundo=TOKENS_POR_SEGUNDO_PADRAO,
+                     n_tokens=TOKENS_RESPOSTA_PADRAO):
+    """
+    Inicia o servidor em uma thread em segundo plano (para benchmarks e testes).
+
+    Args:
+    - porta (int): Porta local (0 escolhe uma porta livre).
+    - latencia (float): Segundos até o primeiro token.
+    - tokens_por_segundo (float): Velocidade de geração dos trechos.
+    - n_tokens (int): Número de trechos de cada resposta.
+
+    Returns:
+    - ThreadingHTTPServer: Servidor em execução (encerrar com shutdown()).
+    """
+    servidor = _Servidor(("127.0.0.1", porta), _criar_handler(latencia, tokens_por_segundo, n_tokens))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de LLM para testes.")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--latencia", type=float, default=LATENCIA_PADRAO)
+    parser.add_argument("--tokens-por-segundo", type=float, default=TOKENS_POR_SEGUNDO_PADRAO)
+    parser.add_argument("--tokens", type=int, default=TOKENS_RESPOSTA_PADRAO)
+    args = parser.parse_args()
+
+    servidor = _Servidor(
+        ("127.0.0.1", args.porta),
+        _criar_handler(args.latencia, args.tokens_por_segundo, args.tokens),
+    )
+    print(f"Servidor de LLM local em http://127.0.0.1:{args.porta}/v1")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
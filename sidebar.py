@@ -1,7 +1,15 @@
+import pandas as pd
 import streamlit as st
+from cache_llm import cache_respostas
+from cache_resultados import cache_resultados
+from chatbot import cliente_llm
 from constants import FAIXA_ETARIA_MAP, REDE_ENSINO_MAP  # Importar os mapeamentos do arquivo constants.py
+from rastreamento import rastrear
 
-def render_sidebar(data):
+@rastrear("render_sidebar")
+def render_sidebar(catalogo):
+    # As opções vêm do catálogo do dataset: o custo depende do número de opções, não de linhas
+    dimensoes = catalogo["dimensoes"]
     st.sidebar.header("Filtros")
     
     # Filtro por faixa etária com descrição
@@ -30,13 +38,12 @@ def render_sidebar(data):
             faixa_etaria_numeros.append(None)
 
     # Filtro por sexo
-    sexos = sorted(data["TP_SEXO"].unique())
     sexo_opcoes = ["Masculino", "Feminino"]
     sexo_selecionado = st.sidebar.multiselect("Sexo", sexo_opcoes, default=sexo_opcoes)
     sexo = [s[0] for s in sexo_selecionado]  # Converter para "M" ou "F"
 
     # Filtro por UF (Estado) com "TODOS"
-    uf_opcoes = ["TODOS"] + list(data["SG_UF_ESC"].fillna("Não informado").unique())
+    uf_opcoes = ["TODOS"] + ["Não informado" if u is None else u for u in dimensoes["SG_UF_ESC"]["valores"]]
     uf_selecionado = st.sidebar.multiselect(
         "Estado (UF)",
         uf_opcoes,
@@ -54,13 +61,15 @@ def render_sidebar(data):
 
     # Ajustar os valores selecionados para o filtro
     if "TODOS" in uf_selecionado:
-        uf = list(data["SG_UF_ESC"].unique())  # Inclui todos os estados, incluindo NaN
+        uf = list(dimensoes["SG_UF_ESC"]["valores"])  # Inclui todos os estados, incluindo None
     else:
-        uf = [u for u in uf_selecionado]
+        uf = [None if u == "Não informado" else u for u in uf_selecionado]  # Nulos no filtro
 
     # Filtro por rede de ensino com descrição
-    redes_numeros = data["TP_ESCOLA"].fillna("Não informado").unique()
-    redes_opcoes = [REDE_ENSINO_MAP.get(rede, f"Não informado ({rede})") for rede in redes_numeros]
+    redes_opcoes = [
+        "Não informado" if rede is None else REDE_ENSINO_MAP.get(rede, f"Não informado ({rede})")
+        for rede in dimensoes["TP_ESCOLA"]["valores"]
+    ]
     redes_selecionadas = st.sidebar.multiselect("Rede de Ensino", redes_opcoes, default=redes_opcoes)
 
     # Converter as descrições de volta para os números
@@ -77,3 +86,60 @@ def render_sidebar(data):
 
     # Retornar os filtros
     return faixa_etaria_numeros, sexo, uf, redes_numeros_selecionados, filtro_notas
+
+
+def render_painel_desempenho(coleta):
+    """
+    Exibe no sidebar o tempo de cada etapa do último rerun e as taxas de acerto dos caches.
+
+    Args:
+    - coleta (Coleta): Spans e contadores registrados no rerun.
+
+    Returns:
+    - None
+    """
+    with st.sidebar.expander("Desempenho do rerun", expanded=True):
+        st.caption(f"Tempo total: {coleta.duracao_ms():.0f} ms")
+        etapas = pd.DataFrame(
+            {
+                "Etapa": ["\u2003" * s["nivel"] + s["nome"] for s in coleta.spans],
+                "ms": [round(s.get("duracao_ms", 0.0), 1) for s in coleta.spans],
+            }
+        )
+        st.dataframe(etapas, hide_index=True, use_container_width=True)
+
+        # Agregações: pedidas fora da memória do rerun x calculadas fora do cache
+        pedidas = coleta.contadores.get("agregacoes.pedidas", 0)
+        calculadas = coleta.contadores.get("agregacoes.calculadas", 0)
+        if pedidas:
+            st.caption(f"Cache de agregações: {pedidas - calculadas}/{pedidas} acertos")
+        pedidos = coleta.contadores.get("graficos.pedidos", 0)
+        construidos = coleta.contadores.get("graficos.construidos", 0)
+        if pedidos:
+            st.caption(f"Cache de gráficos: {pedidos - construidos}/{pedidos} acertos")
+
+        # Cache compartilhado entre as sessões (tabelas e figuras)
+        resultados = cache_resultados.estatisticas()
+        st.caption(
+            f"Cache compartilhado: {resultados['taxa_acerto']:.0%} de acertos "
+            f"({resultados['entradas']} resultados, {resultados['bytes'] / 2**20:.1f} MB, "
+            f"{resultados['remocoes']} removidos)"
+        )
+
+        filtro = st.session_state.get("filtro_incremental")
+        if filtro is not None:
+            st.caption(
+                f"Máscaras de filtro: {filtro.contadores['mascaras_calculadas']} calculadas, "
+                f"{filtro.contadores['mascaras_reaproveitadas']} reaproveitadas"
+            )
+
+        cache = cache_respostas.estatisticas()
+        cliente = cliente_llm.estatisticas()
+        st.caption(
+            f"Cache da IA: {cache['taxa_acerto']:.0%} de acertos "
+            f"({cache['hits_memoria']} memória, {cache['hits_disco']} disco, {cache['misses']} falhas)"
+        )
+        st.caption(
+            f"Requisições à IA: {cliente['requisicoes']} "
+            f"(espera média na fila {cliente['espera_media']:.2f} s)"
+        )
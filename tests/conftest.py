@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do dashboard ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.gerar_dados import gerar_parquet  # noqa: E402
+from data_loader import load_dataset  # noqa: E402
+
+# Linhas do parquet sintético dos testes
+LINHAS_TESTE = 20_000
+
+
+@pytest.fixture(scope="session")
+def caminho_parquet(tmp_path_factory):
+    """
+    Parquet sintético pequeno, com UF da escola e notas nulas como nos microdados.
+    """
+    return gerar_parquet(LINHAS_TESTE, str(tmp_path_factory.mktemp("dados") / "enem.parquet"))
+
+
+@pytest.fixture(scope="session")
+def dataset(caminho_parquet):
+    """
+    Dataset carregado do parquet sintético (sem o cache do Streamlit).
+    """
+    return load_dataset.__wrapped__(caminho=caminho_parquet, compartilhado=False)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agrupamento import agrupar_por
+from cubo import MEDIDAS
+
+DIMENSOES = ["Q006_DESC", "TP_ESCOLA_DESC", "SG_UF_ESC"]
+
+
+def _ordenar(tabela):
+    # Dimensões como texto (nulos com marcador), para comparar grupos de origens diferentes
+    tabela = tabela.copy()
+    for dimensao in DIMENSOES:
+        tabela[dimensao] = tabela[dimensao].astype(object).where(tabela[dimensao].notna(), "<nulo>").astype(str)
+    return tabela.sort_values(DIMENSOES).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("nulos", [False, True])
+def test_agrupar_por_igual_ao_groupby(dataset, nulos):
+    dados = dataset.dados
+    grupos = dados.groupby(DIMENSOES, observed=True, dropna=not nulos)
+    esperado = grupos.size().rename("QTD").to_frame()
+    for medida in MEDIDAS:
+        esperado[f"{medida}_N"] = grupos[medida].count()
+        esperado[f"{medida}_SOMA"] = grupos[medida].sum().astype(np.float64)
+    esperado = _ordenar(esperado[esperado["QTD"] > 0].reset_index())
+
+    obtido = _ordenar(agrupar_por(dados, DIMENSOES, MEDIDAS, nulos=nulos))
+    pd.testing.assert_frame_equal(obtido, esperado[obtido.columns], check_dtype=False, rtol=1e-5)
+    assert obtido["QTD"].sum() == (len(dados) if nulos else dados[DIMENSOES].notna().all(axis=1).sum())
+
+
+def test_agrupar_por_sem_linhas(dataset):
+    vazio = agrupar_por(dataset.dados.iloc[:0], DIMENSOES, MEDIDAS)
+    assert vazio.empty
+    assert list(vazio.columns[:4]) == DIMENSOES + ["QTD"]
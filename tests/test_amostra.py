@@ -0,0 +1,30 @@
+import glob
+import os
+
+import pyarrow.parquet as pq
+
+from amostra import caminho_amostra, carregar_amostra
+from data_loader import load_dataset
+from particionar import particionar_parquet
+
+
+def _linhas(destino):
+    arquivos = glob.glob(os.path.join(destino, "**", "*.parquet"), recursive=True)
+    return sum(pq.ParquetFile(arquivo).metadata.num_rows for arquivo in arquivos)
+
+
+def test_amostra_de_dataset_particionado_refeita_apos_regravar_particao(caminho_parquet, tmp_path):
+    destino = particionar_parquet(caminho_parquet, str(tmp_path / "particionado"))
+    amostra = carregar_amostra(load_dataset.__wrapped__(caminho=destino))
+    assert round(amostra["QTD"].sum()) == _linhas(destino)
+
+    # Regrava um arquivo de uma partição com metade das linhas, mais novo que a amostra
+    # (o mtime do diretório do dataset não muda)
+    parte = sorted(glob.glob(os.path.join(destino, "SG_UF_ESC=SP", "**", "*.parquet"), recursive=True))[0]
+    tabela = pq.read_table(parte)
+    pq.write_table(tabela.slice(0, tabela.num_rows // 2), parte)
+    instante = os.path.getmtime(caminho_amostra(destino)) + 10
+    os.utime(parte, (instante, instante))
+
+    amostra = carregar_amostra(load_dataset.__wrapped__(caminho=destino))
+    assert round(amostra["QTD"].sum()) == _linhas(destino)
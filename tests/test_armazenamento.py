@@ -0,0 +1,32 @@
+import os
+
+from armazenamento import arquivo_atualizado
+
+
+def _tocar(caminho, instante):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "w") as f:
+        f.write("x")
+    os.utime(caminho, (instante, instante))
+
+
+def test_arquivo_atualizado_em_relacao_a_arquivo(tmp_path):
+    _tocar(str(tmp_path / "dados.parquet"), 1000)
+    _tocar(str(tmp_path / "dados.catalogo.json"), 2000)
+    assert arquivo_atualizado(str(tmp_path / "dados.catalogo.json"), str(tmp_path / "dados.parquet"))
+    assert not arquivo_atualizado(str(tmp_path / "ausente.json"), str(tmp_path / "dados.parquet"))
+
+
+def test_arquivo_atualizado_em_relacao_a_diretorio_particionado(tmp_path):
+    origem = tmp_path / "particionado"
+    parte = str(origem / "SG_UF_ESC=SP" / "TP_ESCOLA=2" / "parte-0.parquet")
+    _tocar(parte, 1000)
+    for diretorio in [origem / "SG_UF_ESC=SP" / "TP_ESCOLA=2", origem / "SG_UF_ESC=SP", origem]:
+        os.utime(diretorio, (1000, 1000))
+    _tocar(str(tmp_path / "particionado.catalogo.json"), 2000)
+    assert arquivo_atualizado(str(tmp_path / "particionado.catalogo.json"), str(origem))
+
+    # Regravar um arquivo profundo não altera o mtime do diretório de origem
+    os.utime(parte, (3000, 3000))
+    assert os.path.getmtime(origem) == 1000
+    assert not arquivo_atualizado(str(tmp_path / "particionado.catalogo.json"), str(origem))
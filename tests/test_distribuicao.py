@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from cubo import MEDIDAS
+from distribuicao import LARGURA_FAIXA, NUM_FAIXAS, QUANTIS, histogramas_por, percentis
+from filtros import selecionar_linhas
+
+
+def _notas(dados, medida, linhas):
+    notas = dados.loc[linhas, medida].to_numpy(dtype=np.float64, na_value=np.nan)
+    return notas[~np.isnan(notas)]
+
+
+@pytest.mark.parametrize("dimensao", ["TP_ESCOLA", "SG_UF_ESC"])
+def test_percentis_dos_histogramas_proximos_dos_exatos(dataset, dimensao):
+    valores, contagens = histogramas_por(dataset.histogramas, dataset.indices_cubo, None, dimensao)
+    estimados = percentis(contagens, list(QUANTIS.values()))
+    coluna = dataset.dados[dimensao]
+    for i, valor in enumerate(valores):
+        linhas = coluna.isna() if valor is None else coluna == valor
+        for j, medida in enumerate(MEDIDAS):
+            notas = _notas(dataset.dados, medida, linhas)
+            assert contagens[i, j].sum() == len(notas)
+            if len(notas) == 0:
+                continue
+            # O histograma acha a faixa da nota de posição ceil(q * n), como o método inverted_cdf,
+            # com as notas fora de [0, 1000) nas faixas das pontas
+            notas = np.clip(notas, 0, LARGURA_FAIXA * NUM_FAIXAS - 1e-6)
+            exatos = np.percentile(notas, [100 * q for q in QUANTIS.values()], method="inverted_cdf")
+            assert np.all(np.abs(estimados[i, j] - exatos) <= LARGURA_FAIXA), (valor, medida)
+
+
+def test_histogramas_da_selecao_somam_as_notas_selecionadas(dataset):
+    filtros = ([3, 4], ["F"], ["SP", "RJ", None], [2, 3], "Todos")
+    ids = selecionar_linhas(dataset.indices_cubo, *filtros)
+    _, contagens = histogramas_por(dataset.histogramas, dataset.indices_cubo, ids)
+    dados = dataset.dados
+    linhas = (
+        dados["TP_FAIXA_ETARIA"].isin([3, 4]) & dados["TP_SEXO"].eq("F")
+        & (dados["SG_UF_ESC"].isin(["SP", "RJ"]) | dados["SG_UF_ESC"].isna()) & dados["TP_ESCOLA"].isin([2, 3])
+    ).fillna(False).to_numpy(dtype=bool)
+    for j, medida in enumerate(MEDIDAS):
+        assert contagens[0, j].sum() == len(_notas(dados, medida, linhas))
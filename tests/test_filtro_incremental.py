@@ -0,0 +1,39 @@
+import numpy as np
+
+from constants import FAIXA_ETARIA_MAP
+from filtros import FILTRO_NOTAS_VALIDAS, FiltroIncremental, selecionar_linhas
+
+TODAS_FAIXAS = list(FAIXA_ETARIA_MAP) + [None]  # "TODOS" no sidebar
+
+# Seleções sucessivas do sidebar, cada uma alterando uma dimensão, com voltas a seleções
+# anteriores (resultados guardados) e seleções de nulos
+SEQUENCIA = [
+    (TODAS_FAIXAS, ["M", "F"], ["TODOS"], [1, 2, 3], "Todos"),
+    (TODAS_FAIXAS, ["M", "F"], ["SP"], [1, 2, 3], "Todos"),
+    (TODAS_FAIXAS, ["M", "F"], ["SP", "RJ"], [1, 2, 3], "Todos"),
+    (TODAS_FAIXAS, ["F"], ["SP", "RJ"], [1, 2, 3], "Todos"),
+    (TODAS_FAIXAS, ["F"], ["SP", "RJ"], [2], "Todos"),
+    ([3], ["F"], ["SP", "RJ"], [2], "Todos"),
+    ([3], ["F"], ["SP", "RJ"], [2], FILTRO_NOTAS_VALIDAS),
+    ([3], ["F"], [None], [2], FILTRO_NOTAS_VALIDAS),
+    ([3, None], ["F"], [None, "BA"], [None, 1], FILTRO_NOTAS_VALIDAS),
+    ([3], ["F"], ["SP", "RJ"], [2], "Todos"),
+    (TODAS_FAIXAS, ["M", "F"], ["TODOS"], [1, 2, 3], "Todos"),
+    (TODAS_FAIXAS, [], ["TODOS"], [], FILTRO_NOTAS_VALIDAS),
+]
+
+
+def _ids(indices, ids):
+    # None significa todas as linhas
+    return np.arange(len(indices["validas"])) if ids is None else np.asarray(ids)
+
+
+def test_filtro_incremental_igual_a_selecionar_linhas(dataset):
+    indices = dataset.indices_cubo
+    filtro = FiltroIncremental(indices)
+    for filtros in SEQUENCIA:
+        esperado = _ids(indices, selecionar_linhas(indices, *filtros))
+        obtido = _ids(indices, filtro.selecionar(*filtros))
+        np.testing.assert_array_equal(np.sort(obtido), np.sort(esperado), err_msg=str(filtros))
+    assert filtro.contadores["mascaras_reaproveitadas"] > 0
+    assert filtro.contadores["combinacoes_reaproveitadas"] > 0
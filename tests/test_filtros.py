@@ -0,0 +1,25 @@
+import duckdb
+import pyarrow.dataset as ds
+import pytest
+
+from filtros import clausula_sql, expressao_filtros, mascara_filtros
+
+# Seleções com nulos ("não informado"), sozinhos ou junto de valores, e seleções vazias
+CENARIOS = {
+    "uf_so_nula": (["TODOS"], ["M", "F"], [None], [], "Todas"),
+    "uf_e_rede_nulas": (["TODOS"], ["M", "F"], [None], [None, 1], "Todas"),
+    "uf_com_nula": (["TODOS"], ["F"], ["SP", None], [2], "Todas"),
+    "faixa_vazia": ([], ["M"], ["TODOS"], [], "Todas"),
+}
+
+
+@pytest.mark.parametrize("filtros", CENARIOS.values(), ids=CENARIOS.keys())
+def test_caminhos_de_filtro_concordam(caminho_parquet, dataset, filtros):
+    esperado = int(mascara_filtros(dataset.dados, *filtros).sum())
+
+    expressao = expressao_filtros(*filtros)
+    assert ds.dataset(caminho_parquet).count_rows(filter=expressao) == esperado
+
+    where, parametros = clausula_sql(*filtros)
+    consulta = f"SELECT COUNT(*) FROM read_parquet('{caminho_parquet}') {where}"
+    assert duckdb.connect().execute(consulta, parametros).fetchone()[0] == esperado
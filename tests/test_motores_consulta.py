@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.executar import _cenarios_filtro
+from dashboard import AGREGACOES, DIMENSOES_AGREGACOES
+from data_loader import load_dataset
+from motores_consulta import MotorDuckDB, MotorPandas, verificar_paridade
+from sidebar import render_sidebar
+
+# Fração das linhas com nulos em cada dimensão do filtro
+FRACAO_NULOS = 0.02
+
+
+@pytest.fixture(scope="module")
+def dataset_com_nulos(caminho_parquet, tmp_path_factory):
+    # Além da UF da escola e das notas, nulos em sexo, faixa etária e rede
+    dados = pd.read_parquet(caminho_parquet)
+    rng = np.random.default_rng(0)
+    for coluna in ["TP_SEXO", "TP_FAIXA_ETARIA", "TP_ESCOLA"]:
+        dados[coluna] = dados[coluna].where(rng.random(len(dados)) >= FRACAO_NULOS)
+    caminho = str(tmp_path_factory.mktemp("nulos") / "enem.parquet")
+    dados.to_parquet(caminho, index=False)
+    return load_dataset.__wrapped__(caminho=caminho, compartilhado=False)
+
+
+def test_duckdb_igual_ao_pandas(dataset_com_nulos):
+    padrao = render_sidebar(dataset_com_nulos.catalogo)
+    faixa_etaria, sexo, _, _, filtro_notas = padrao
+    cenarios = {
+        **_cenarios_filtro(padrao),
+        "uf_e_rede_nulas": (faixa_etaria, sexo, [None], [None], filtro_notas),
+    }
+    divergencias = verificar_paridade(
+        MotorDuckDB(dataset_com_nulos.caminho), MotorPandas(dataset_com_nulos),
+        AGREGACOES, DIMENSOES_AGREGACOES, cenarios,
+    )
+    assert divergencias == []
@@ -0,0 +1,26 @@
+import pytest
+
+from constants import UF_NOME_MAP
+from recuperacao import EmbedderHash, IndiceVetorial, gerar_fatos
+
+
+@pytest.fixture(scope="module")
+def indice(dataset):
+    return IndiceVetorial(gerar_fatos(dataset), EmbedderHash())
+
+
+def test_fatos_sem_uf_nula(dataset):
+    fatos = gerar_fatos(dataset)
+    assert not [fato for fato in fatos if "nan" in fato.lower().split()]
+    assert any(fato.startswith("UF da escola Não informado, rede de ensino") for fato in fatos)
+
+
+@pytest.mark.parametrize("uf", ["PE", "SP", "BA", "RR", "AC"])
+def test_pergunta_por_uf_recupera_fatos_da_uf(indice, uf):
+    resultados = indice.buscar(f"Qual a média da rede pública em {UF_NOME_MAP[uf]}?")
+    assert resultados[0][0].startswith(f"Estado {UF_NOME_MAP[uf]} ({uf}), rede de ensino Pública:")
+
+    # Todos os fatos da UF vêm antes dos demais
+    fatos_uf = [fato for fato in indice.textos if f"({uf})" in fato]
+    resultados = indice.buscar(f"Quantos participantes em {UF_NOME_MAP[uf]}?", k=len(fatos_uf) + 1)
+    assert sorted(fato for fato, _ in resultados[:len(fatos_uf)]) == sorted(fatos_uf)